@@ -0,0 +1,36 @@
+from backend.core.registry import get_or_create
+
+# Service providers for route handlers. Services are imported and built on
+# first use (or during background warm-up) rather than when the route modules
+# are imported, so the app can bind and answer /health before the embedding
+# model, Chroma and the LLM SDKs are loaded.
+
+def get_document_service():
+    """Get the shared DocumentService."""
+    from backend.services.document_service import DocumentService
+    return get_or_create("document_service", DocumentService)
+
+def get_chat_service():
+    """Get the shared ChatService."""
+    from backend.services.chat_service import ChatService
+    return get_or_create("chat_service", ChatService)
+
+def get_highlight_service():
+    """Get the shared HighlightService."""
+    from backend.services.highlight_service import HighlightService
+    return get_or_create("highlight_service", HighlightService)
+
+def get_summary_service():
+    """Get the shared SummaryService."""
+    from backend.services.summary_service import SummaryService
+    return get_or_create("summary_service", SummaryService)
+
+def get_study_guide_service():
+    """Get the shared StudyGuideService."""
+    from backend.services.study_guide_service import StudyGuideService
+    return get_or_create("study_guide_service", StudyGuideService)
+
+def get_ingestion_service():
+    """Get the shared IngestionService."""
+    from backend.services.ingestion_service import IngestionService
+    return get_or_create("ingestion_service", lambda: IngestionService(get_document_service()))
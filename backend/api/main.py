@@ -1,15 +1,47 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
+from backend.core import registry
 from backend.core.config import settings
+from backend.core.startup import startup_state
+from backend.db.database import engine
+from backend.db.models import ChatSessionState, DocumentArtifact
 from backend.api.routes import documents, chat, highlights, summaries, study_guides
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Load heavy components according to STARTUP_MODE."""
+    # Create tables added after the database was first initialized
+    DocumentArtifact.__table__.create(bind=engine, checkfirst=True)
+    ChatSessionState.__table__.create(bind=engine, checkfirst=True)
+
+    if settings.STARTUP_MODE == "eager":
+        startup_state.warm_up()
+        startup_state.start_retries()
+    elif settings.STARTUP_MODE == "background":
+        # Models load after the server binds; /health answers immediately
+        startup_state.start_background()
+    else:
+        # Lazy: components are built on first use
+        startup_state.status = "ready"
+    yield
+
+    # Write out chat messages still buffered by a write-behind session store
+    if registry.is_loaded("session_store"):
+        store = registry.get_session_store()
+        if hasattr(store, "flush"):
+            store.flush()
+
 # Create FastAPI app
 app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description=settings.APP_DESCRIPTION,
-    debug=settings.DEBUG
+    debug=settings.DEBUG,
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -39,5 +71,12 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint."""
+    """Liveness check endpoint."""
     return {"status": "ok"}
+
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness check endpoint, with a profile of where startup time went."""
+    report = startup_state.report()
+    status_code = status.HTTP_200_OK if startup_state.ready else status.HTTP_503_SERVICE_UNAVAILABLE
+    return JSONResponse(status_code=status_code, content=report)
@@ -1,25 +1,27 @@
+import json
+
 from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from backend.db.database import get_db
-from backend.schemas.chat import ChatRequest, ChatResponse
-from backend.services.chat_service import ChatService
-from backend.services.document_service import DocumentService
+from backend.core.concurrency import run_io_bound
+from backend.api.dependencies import get_chat_service, get_document_service
+from backend.schemas.chat import ChatRequest, ChatResponse, ChatHistoryResponse
 
 router = APIRouter(prefix="/chat", tags=["chat"])
 
-chat_service = ChatService()
-document_service = DocumentService()
-
 @router.post("/query", response_model=ChatResponse)
 async def query_document(
     request: ChatRequest,
     session_id: str = Query(None, description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    chat_service=Depends(get_chat_service),
+    document_service=Depends(get_document_service)
 ):
     """Query a document and get a response."""
     # Check if document exists
-    document = document_service.get_document(db, request.document_id)
+    document = await run_io_bound(document_service.get_document, db, request.document_id)
 
     if not document:
         raise HTTPException(
@@ -35,10 +37,11 @@ async def query_document(
         if not request.session_id and session_id:
             request.session_id = session_id
 
-        result = chat_service.process_query(
+        result = await chat_service.aprocess_query(
             query=request.query,
             document_id=request.document_id,
-            session_id=request.session_id
+            session_id=request.session_id,
+            incremental=bool(request.incremental)
         )
         return result
     except Exception as e:
@@ -47,15 +50,76 @@ async def query_document(
             detail=f"Error processing query: {str(e)}"
         )
 
+@router.post("/query/stream")
+async def stream_query_document(
+    request: ChatRequest,
+    session_id: str = Query(None, description="Unique session ID"),
+    db: Session = Depends(get_db),
+    chat_service=Depends(get_chat_service),
+    document_service=Depends(get_document_service)
+):
+    """Query a document and stream the response as server-sent events."""
+    # Check if document exists
+    document = await run_io_bound(document_service.get_document, db, request.document_id)
+
+    if not document:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Document with ID {request.document_id} not found"
+        )
+
+    # Use the session_id from the query parameter if not provided in the request
+    if not request.session_id and session_id:
+        request.session_id = session_id
+
+    async def event_stream():
+        try:
+            async for event in chat_service.astream_query(
+                query=request.query,
+                document_id=request.document_id,
+                session_id=request.session_id,
+                incremental=bool(request.incremental)
+            ):
+                name = event.pop("event")
+                yield f"event: {name}\ndata: {json.dumps(event)}\n\n"
+        except Exception as e:
+            detail = json.dumps({"detail": f"Error processing query: {str(e)}"})
+            yield f"event: error\ndata: {detail}\n\n"
+
+    # Ask proxies not to buffer the stream
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/history/{session_id}", response_model=ChatHistoryResponse)
+async def get_chat_history(
+    session_id: str,
+    cursor: int = Query(0, ge=0, description="Index of the first message to return"),
+    limit: int = Query(50, ge=1, le=500, description="Maximum number of messages to return"),
+    chat_service=Depends(get_chat_service)
+):
+    """Get a page of a session's chat history."""
+    try:
+        return await run_io_bound(chat_service.get_history, session_id, cursor, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Error getting chat history: {str(e)}"
+        )
+
 @router.post("/create-session", response_model=dict)
 async def create_chat_session(
     document_id: str,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    chat_service=Depends(get_chat_service),
+    document_service=Depends(get_document_service)
 ):
     """Create a new chat session."""
     # Check if document exists
-    document = document_service.get_document(db, document_id)
+    document = await run_io_bound(document_service.get_document, db, document_id)
 
     if not document:
         raise HTTPException(
@@ -78,14 +142,22 @@ async def create_chat_session(
 @router.post("/reset-session", response_model=dict)
 async def reset_chat_session(
     session_id: str,
-    user_session_id: str = Query(..., description="Unique user session ID")
+    user_session_id: str = Query(..., description="Unique user session ID"),
+    chat_service=Depends(get_chat_service)
 ):
     """Reset a chat session."""
     try:
-        result = chat_service.reset_session(session_id)
+        result = await run_io_bound(chat_service.reset_session, session_id)
         return result
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Error resetting chat session: {str(e)}"
         )
+
+@router.get("/cache-stats", response_model=dict)
+async def get_cache_stats(chat_service=Depends(get_chat_service)):
+    """Get hit-rate metrics for the semantic answer cache."""
+    if chat_service.answer_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **chat_service.answer_cache.stats()}
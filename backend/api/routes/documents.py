@@ -4,20 +4,20 @@ from typing import List, Optional, Dict
 from pydantic import BaseModel
 
 from backend.db.database import get_db
+from backend.core.concurrency import run_io_bound
+from backend.api.dependencies import get_document_service, get_ingestion_service
 from backend.schemas.documents import DocumentResponse, DocumentDetail
-from backend.services.document_service import DocumentService
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
-document_service = DocumentService()
-
-@router.post("/upload-pdf", response_model=dict, status_code=status.HTTP_201_CREATED)
+@router.post("/upload-pdf", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def upload_pdf(
     file: UploadFile = File(...),
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    ingestion_service=Depends(get_ingestion_service)
 ):
-    """Upload a PDF document."""
+    """Upload a PDF document and queue it for processing."""
     if not file.filename.endswith(".pdf"):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -27,7 +27,7 @@ async def upload_pdf(
     try:
         # Use session_id as user_id for simplicity
         user_id = 1  # Default user ID since we removed authentication
-        result = document_service.process_pdf(file.file, file.filename, db, user_id)
+        result = await run_io_bound(ingestion_service.submit_pdf, file.file, file.filename, db, user_id)
         return result
     except Exception as e:
         raise HTTPException(
@@ -38,15 +38,16 @@ async def upload_pdf(
 class WebArticleRequest(BaseModel):
     url: str
 
-@router.post("/add-web-article", response_model=dict, status_code=status.HTTP_201_CREATED)
+@router.post("/add-web-article", response_model=dict, status_code=status.HTTP_202_ACCEPTED)
 async def add_web_article(
     url: Optional[str] = Form(None),
     session_id: str = Query(..., description="Unique session ID"),
     db: Session = Depends(get_db),
     url_query: Optional[str] = Query(None, alias="url"),
-    body: Optional[WebArticleRequest] = None
+    body: Optional[WebArticleRequest] = None,
+    ingestion_service=Depends(get_ingestion_service)
 ):
-    """Add a web article."""
+    """Add a web article and queue it for processing."""
     # Get URL from form data, query parameter, or request body
     article_url = url or url_query
 
@@ -63,7 +64,7 @@ async def add_web_article(
     try:
         # Use session_id as user_id for simplicity
         user_id = 1  # Default user ID since we removed authentication
-        result = document_service.process_web_article(article_url, db, user_id)
+        result = await run_io_bound(ingestion_service.submit_web_article, article_url, db, user_id)
         return result
     except Exception as e:
         raise HTTPException(
@@ -71,24 +72,43 @@ async def add_web_article(
             detail=f"Error processing web article: {str(e)}"
         )
 
+@router.get("/jobs/{job_id}", response_model=dict)
+async def get_ingestion_job(
+    job_id: str,
+    session_id: str = Query(..., description="Unique session ID"),
+    ingestion_service=Depends(get_ingestion_service)
+):
+    """Get the status and progress of an ingestion job."""
+    job = await run_io_bound(ingestion_service.get_job, job_id)
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with ID {job_id} not found"
+        )
+
+    return job
+
 @router.get("/", response_model=List[DocumentResponse])
 async def get_user_documents(
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    document_service=Depends(get_document_service)
 ):
     """Get all documents."""
     # Use session_id as user_id for simplicity
     user_id = 1  # Default user ID since we removed authentication
-    return document_service.get_user_documents(db, user_id)
+    return await run_io_bound(document_service.get_user_documents, db, user_id)
 
 @router.get("/{document_id}", response_model=DocumentDetail)
 async def get_document(
     document_id: str,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    document_service=Depends(get_document_service)
 ):
     """Get a document by ID."""
-    document = document_service.get_document(db, document_id)
+    document = await run_io_bound(document_service.get_document, db, document_id)
 
     if not document:
         raise HTTPException(
@@ -103,10 +123,11 @@ async def get_document(
 async def get_document_chunks(
     document_id: str,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    document_service=Depends(get_document_service)
 ):
     """Get all chunks for a document."""
-    document = document_service.get_document(db, document_id)
+    document = await run_io_bound(document_service.get_document, db, document_id)
 
     if not document:
         raise HTTPException(
@@ -115,16 +136,17 @@ async def get_document_chunks(
         )
 
     # No authorization check since we removed authentication
-    return document_service.get_document_chunks(document_id)
+    return await run_io_bound(document_service.get_document_chunks, document_id)
 
 @router.delete("/{document_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_document(
     document_id: str,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    document_service=Depends(get_document_service)
 ):
     """Delete a document by ID."""
-    document = document_service.get_document(db, document_id)
+    document = await run_io_bound(document_service.get_document, db, document_id)
 
     if not document:
         raise HTTPException(
@@ -133,4 +155,4 @@ async def delete_document(
         )
 
     # No authorization check since we removed authentication
-    document_service.delete_document(db, document_id)
+    await run_io_bound(document_service.delete_document, db, document_id)
@@ -3,24 +3,23 @@ from sqlalchemy.orm import Session
 from typing import List
 
 from backend.db.database import get_db
+from backend.core.concurrency import run_io_bound
+from backend.api.dependencies import get_highlight_service, get_document_service
 from backend.schemas.highlights import HighlightCreate, HighlightResponse, SmartHighlightRequest, SmartHighlightResponse
-from backend.services.highlight_service import HighlightService
-from backend.services.document_service import DocumentService
 
 router = APIRouter(prefix="/highlights", tags=["highlights"])
 
-highlight_service = HighlightService()
-document_service = DocumentService()
-
 @router.post("/", response_model=HighlightResponse, status_code=status.HTTP_201_CREATED)
 async def create_highlight(
     highlight: HighlightCreate,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    highlight_service=Depends(get_highlight_service),
+    document_service=Depends(get_document_service)
 ):
     """Create a new highlight."""
     # Check if document exists
-    document = document_service.get_document(db, highlight.document_id)
+    document = await run_io_bound(document_service.get_document, db, highlight.document_id)
 
     if not document:
         raise HTTPException(
@@ -35,7 +34,8 @@ async def create_highlight(
         # Use a default user ID since we removed authentication
         user_id = 1
 
-        db_highlight = highlight_service.create_highlight(
+        db_highlight = await run_io_bound(
+            highlight_service.create_highlight,
             db=db,
             text=highlight.text,
             document_id=highlight.document_id,
@@ -54,11 +54,12 @@ async def create_highlight(
 @router.post("/smart", response_model=SmartHighlightResponse)
 async def get_smart_highlight(
     request: SmartHighlightRequest,
-    session_id: str = Query(..., description="Unique session ID")
+    session_id: str = Query(..., description="Unique session ID"),
+    highlight_service=Depends(get_highlight_service)
 ):
     """Generate a smart highlight."""
     try:
-        result = highlight_service.get_smart_highlight(request.text)
+        result = await highlight_service.aget_smart_highlight(request.text)
         return result
     except Exception as e:
         raise HTTPException(
@@ -69,22 +70,25 @@ async def get_smart_highlight(
 @router.get("/", response_model=List[HighlightResponse])
 async def get_user_highlights(
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    highlight_service=Depends(get_highlight_service)
 ):
     """Get all highlights."""
     # Use a default user ID since we removed authentication
     user_id = 1
-    return highlight_service.get_user_highlights(db, user_id)
+    return await run_io_bound(highlight_service.get_user_highlights, db, user_id)
 
 @router.get("/document/{document_id}", response_model=List[HighlightResponse])
 async def get_document_highlights(
     document_id: str,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    highlight_service=Depends(get_highlight_service),
+    document_service=Depends(get_document_service)
 ):
     """Get all highlights for a document."""
     # Check if document exists
-    document = document_service.get_document(db, document_id)
+    document = await run_io_bound(document_service.get_document, db, document_id)
 
     if not document:
         raise HTTPException(
@@ -96,18 +100,19 @@ async def get_document_highlights(
 
     # Use a default user ID since we removed authentication
     user_id = 1
-    return highlight_service.get_document_highlights(db, document_id, user_id)
+    return await run_io_bound(highlight_service.get_document_highlights, db, document_id, user_id)
 
 @router.delete("/{highlight_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_highlight(
     highlight_id: int,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    highlight_service=Depends(get_highlight_service)
 ):
     """Delete a highlight."""
     # Use a default user ID since we removed authentication
     user_id = 1
-    result = highlight_service.delete_highlight(db, highlight_id, user_id)
+    result = await run_io_bound(highlight_service.delete_highlight, db, highlight_id, user_id)
 
     if not result:
         raise HTTPException(
@@ -2,24 +2,23 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from backend.db.database import get_db
+from backend.core.concurrency import run_io_bound
+from backend.api.dependencies import get_study_guide_service, get_document_service
 from backend.schemas.study_guides import StudyGuideRequest, StudyGuideResponse
-from backend.services.study_guide_service import StudyGuideService
-from backend.services.document_service import DocumentService
 
 router = APIRouter(prefix="/study-guides", tags=["study-guides"])
 
-study_guide_service = StudyGuideService()
-document_service = DocumentService()
-
 @router.post("/generate", response_model=StudyGuideResponse)
 async def generate_study_guide(
     request: StudyGuideRequest,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    study_guide_service=Depends(get_study_guide_service),
+    document_service=Depends(get_document_service)
 ):
     """Generate a study guide for a document."""
     # Check if document exists
-    document = document_service.get_document(db, request.document_id)
+    document = await run_io_bound(document_service.get_document, db, request.document_id)
 
     if not document:
         raise HTTPException(
@@ -31,9 +30,13 @@ async def generate_study_guide(
 
     # Generate study guide
     try:
-        result = study_guide_service.generate_study_guide(
+        result = await run_io_bound(
+            study_guide_service.generate_study_guide,
             document_id=request.document_id,
-            format=request.format
+            format=request.format,
+            mode=request.mode,
+            db=db,
+            force=bool(request.force)
         )
         return result
     except Exception as e:
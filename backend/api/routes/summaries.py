@@ -2,24 +2,23 @@ from fastapi import APIRouter, Depends, HTTPException, status, Query
 from sqlalchemy.orm import Session
 
 from backend.db.database import get_db
+from backend.core.concurrency import run_io_bound
+from backend.api.dependencies import get_summary_service, get_document_service
 from backend.schemas.summaries import SummaryRequest, SummaryResponse, SemanticSummaryRequest, SemanticSummaryResponse
-from backend.services.summary_service import SummaryService
-from backend.services.document_service import DocumentService
 
 router = APIRouter(prefix="/summaries", tags=["summaries"])
 
-summary_service = SummaryService()
-document_service = DocumentService()
-
 @router.post("/document", response_model=SummaryResponse)
 async def generate_document_summary(
     request: SummaryRequest,
     session_id: str = Query(..., description="Unique session ID"),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    summary_service=Depends(get_summary_service),
+    document_service=Depends(get_document_service)
 ):
     """Generate a summary for a document."""
     # Check if document exists
-    document = document_service.get_document(db, request.document_id)
+    document = await run_io_bound(document_service.get_document, db, request.document_id)
 
     if not document:
         raise HTTPException(
@@ -31,9 +30,12 @@ async def generate_document_summary(
 
     # Generate summary
     try:
-        result = summary_service.generate_document_summary(
+        result = await run_io_bound(
+            summary_service.generate_document_summary,
             document_id=request.document_id,
-            max_length=request.max_length
+            max_length=request.max_length,
+            db=db,
+            force=bool(request.force)
         )
         return result
     except Exception as e:
@@ -45,11 +47,12 @@ async def generate_document_summary(
 @router.post("/semantic", response_model=SemanticSummaryResponse)
 async def generate_semantic_summary(
     request: SemanticSummaryRequest,
-    session_id: str = Query(..., description="Unique session ID")
+    session_id: str = Query(..., description="Unique session ID"),
+    summary_service=Depends(get_summary_service)
 ):
     """Generate a semantic summary from highlights."""
     try:
-        result = summary_service.generate_semantic_summary(request.highlights)
+        result = await summary_service.agenerate_semantic_summary(request.highlights)
         return result
     except Exception as e:
         raise HTTPException(
@@ -0,0 +1,111 @@
+import asyncio
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from backend.core.config import settings
+
+# Bounded executors for blocking work called from async route handlers.
+# CPU-bound work (embedding, parsing, chunking) gets a small pool sized to the
+# machine; the embedding model lives in this process and torch/tokenizers
+# release the GIL, so threads are enough here. I/O-bound work (database
+# queries, vector store lookups, sync SDK calls) gets a wider pool.
+cpu_executor = ThreadPoolExecutor(max_workers=settings.CPU_WORKERS, thread_name_prefix="cpu-worker")
+io_executor = ThreadPoolExecutor(max_workers=settings.IO_WORKERS, thread_name_prefix="io-worker")
+# Fan-out of vector store searches. Kept separate from the pools above because
+# searches are themselves started from work running in those pools.
+search_executor = ThreadPoolExecutor(max_workers=settings.VECTORDB_SEARCH_WORKERS, thread_name_prefix="search-worker")
+# Fan-out of independent blocking LLM calls, for the same reason
+llm_executor = ThreadPoolExecutor(max_workers=settings.LLM_MAX_CONCURRENCY, thread_name_prefix="llm-worker")
+
+class RateLimiter:
+    """Thread-safe limiter that allows at most ``per_minute`` calls in any 60 seconds.
+
+    Up to ``burst`` calls go out at once; after that callers wait for their
+    slot. The burst counts against the limit, so slots are spaced by
+    60 / (per_minute - burst + 1) seconds. A rate of 0 disables limiting.
+    The limit applies per process: with N workers the total rate is N times
+    ``per_minute``.
+    """
+
+    def __init__(self, per_minute: float, burst: int = 1):
+        burst = max(1, min(burst, int(per_minute)))
+        self.interval = 60.0 / (per_minute - burst + 1) if per_minute > 0 else 0.0
+        self.burst_window = self.interval * (burst - 1)
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def _reserve(self) -> float:
+        """Claim the next slot and return how long to wait for it."""
+        if not self.interval:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.interval
+            return max(0.0, slot - now - self.burst_window)
+
+    def acquire(self):
+        """Block until a call is allowed."""
+        delay = self._reserve()
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self):
+        """Wait until a call is allowed without blocking the event loop."""
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+# Provider rate limits, shared by every caller in this worker process
+together_rate_limiter = RateLimiter(settings.TOGETHER_REQUESTS_PER_MINUTE, burst=settings.LLM_MAX_CONCURRENCY)
+groq_rate_limiter = RateLimiter(settings.GROQ_REQUESTS_PER_MINUTE, burst=settings.LLM_MAX_CONCURRENCY)
+
+_llm_semaphore: Optional[asyncio.Semaphore] = None
+
+async def run_cpu_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a CPU-bound callable in the CPU pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(cpu_executor, functools.partial(func, *args, **kwargs))
+
+async def run_io_bound(func: Callable[..., Any], *args, **kwargs) -> Any:
+    """Run a blocking I/O callable in the I/O pool without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+def scatter_gather(func: Callable[[Any], Any], items: Iterable[Any], timeout: Optional[float] = None,
+                   executor: ThreadPoolExecutor = search_executor) -> Tuple[List[Any], int]:
+    """Call ``func`` on every item concurrently and collect what finishes before the deadline.
+
+    Returns the results that completed in time, in no particular order, and
+    the number of calls that failed or missed the deadline. Calls that have
+    not started by the deadline are cancelled.
+    """
+    items = list(items)
+    started = time.monotonic()
+    futures = [executor.submit(func, item) for item in items]
+    done, pending = wait(futures, timeout=timeout or None)
+    for future in pending:
+        future.cancel()
+
+    results = []
+    failed = len(pending)
+    for future in done:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            print(f"Error in task: {e}")
+            failed += 1
+    if pending:
+        print(f"Deadline of {timeout}s hit after {time.monotonic() - started:.2f}s: "
+              f"{len(pending)} of {len(futures)} tasks returned no results")
+    return results, failed
+
+def llm_semaphore() -> asyncio.Semaphore:
+    """Limit the number of concurrent async LLM calls in this worker."""
+    global _llm_semaphore
+    if _llm_semaphore is None:
+        _llm_semaphore = asyncio.Semaphore(settings.LLM_MAX_CONCURRENCY)
+    return _llm_semaphore
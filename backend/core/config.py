@@ -24,6 +24,10 @@ class Settings(BaseSettings):
 
     # API settings
     API_PREFIX: str = "/api/v1"
+    # background: load models after the server binds; eager: load before serving; lazy: load on first use
+    STARTUP_MODE: str = os.getenv("STARTUP_MODE", "background")
+    STARTUP_RETRY_DELAY: float = float(os.getenv("STARTUP_RETRY_DELAY", 5.0))  # seconds, doubled after each failed retry
+    STARTUP_RETRY_MAX_DELAY: float = float(os.getenv("STARTUP_RETRY_MAX_DELAY", 300.0))
 
     # Security settings
     SECRET_KEY: str = os.getenv("SECRET_KEY", "supersecretkey")
@@ -36,14 +40,87 @@ class Settings(BaseSettings):
 
     # Vector database settings
     VECTORDB_PATH: str = os.getenv("VECTORDB_PATH", "data/chroma_db")
+    VECTORDB_WRITE_BATCH_SIZE: int = int(os.getenv("VECTORDB_WRITE_BATCH_SIZE", 512))
+    VECTORDB_LAYOUT: str = os.getenv("VECTORDB_LAYOUT", "per_document")  # per_document, shared or sharded
+    VECTORDB_SHARDS: int = int(os.getenv("VECTORDB_SHARDS", 8))
+    VECTORDB_SEARCH_WORKERS: int = int(os.getenv("VECTORDB_SEARCH_WORKERS", 16))
+    VECTORDB_METADATA_CACHE_TTL: float = float(os.getenv("VECTORDB_METADATA_CACHE_TTL", 30.0))  # seconds
+    VECTORDB_QUERY_TIMEOUT: float = float(os.getenv("VECTORDB_QUERY_TIMEOUT", 2.0))  # seconds, 0 for no deadline
+    HYBRID_VECTOR_WEIGHT: float = float(os.getenv("HYBRID_VECTOR_WEIGHT", 1.0))
+    HYBRID_LEXICAL_WEIGHT: float = float(os.getenv("HYBRID_LEXICAL_WEIGHT", 1.0))
+    HYBRID_RRF_K: int = int(os.getenv("HYBRID_RRF_K", 60))
+    HYBRID_CANDIDATES: int = int(os.getenv("HYBRID_CANDIDATES", 20))
+    BM25_K1: float = float(os.getenv("BM25_K1", 1.5))
+    BM25_B: float = float(os.getenv("BM25_B", 0.75))
+
+    # Embedding settings
+    EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+    EMBEDDING_BATCH_SIZE: int = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "True").lower() == "true"
+    EMBEDDING_CACHE_PATH: str = os.getenv("EMBEDDING_CACHE_PATH", "data/cache/embeddings.sqlite3")
+    EMBEDDING_CACHE_MEMORY_ITEMS: int = int(os.getenv("EMBEDDING_CACHE_MEMORY_ITEMS", 10000))
+    EMBEDDING_CACHE_MAX_MB: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", 512))
 
     # LLM settings
     TOGETHER_API_KEY: str = os.getenv("TOGETHER_API_KEY", "")
     GROQ_API_KEY: str = os.getenv("GROQ_API_KEY", "")
+    TOGETHER_MODEL: str = os.getenv("TOGETHER_MODEL", "meta-llama/Llama-3.3-70B-Instruct-Turbo-Free")
+    GROQ_MODEL: str = os.getenv("GROQ_MODEL", "mistral-saba-24b")
+    TOGETHER_REQUESTS_PER_MINUTE: float = float(os.getenv("TOGETHER_REQUESTS_PER_MINUTE", 60))  # per worker process, 0 for no limit
+    GROQ_REQUESTS_PER_MINUTE: float = float(os.getenv("GROQ_REQUESTS_PER_MINUTE", 30))
+    LLM_CALL_TIMEOUT: float = float(os.getenv("LLM_CALL_TIMEOUT", 60.0))  # seconds, for fanned-out calls
+    STUDY_GUIDE_STRUCTURED: bool = os.getenv("STUDY_GUIDE_STRUCTURED", "False").lower() == "true"
+    STUDY_GUIDE_MAX_CHUNKS: int = int(os.getenv("STUDY_GUIDE_MAX_CHUNKS", 24))  # chunks summarized by the full pipeline
+    STUDY_GUIDE_TIMEOUT: float = float(os.getenv("STUDY_GUIDE_TIMEOUT", 300.0))  # seconds, for chunk summarization
+    SUMMARY_GROUP_CHARS: int = int(os.getenv("SUMMARY_GROUP_CHARS", 8000))  # text per map call
+    SUMMARY_CONTEXT_CHARS: int = int(os.getenv("SUMMARY_CONTEXT_CHARS", 12000))  # text the final reduce accepts
+    LLM_CACHE_ENABLED: bool = os.getenv("LLM_CACHE_ENABLED", "True").lower() == "true"
+    LLM_CACHE_PATH: str = os.getenv("LLM_CACHE_PATH", "data/cache/llm_completions.sqlite3")
+    LLM_CACHE_MEMORY_ITEMS: int = int(os.getenv("LLM_CACHE_MEMORY_ITEMS", 2000))
+    LLM_CACHE_MAX_MB: int = int(os.getenv("LLM_CACHE_MAX_MB", 256))
+
+    # Semantic answer cache settings
+    SEMANTIC_CACHE_ENABLED: bool = os.getenv("SEMANTIC_CACHE_ENABLED", "True").lower() == "true"
+    SEMANTIC_CACHE_THRESHOLD: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", 0.95))  # cosine similarity
+    SEMANTIC_CACHE_TTL: float = float(os.getenv("SEMANTIC_CACHE_TTL", 3600.0))  # seconds
+    SEMANTIC_CACHE_MAX_ENTRIES: int = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", 5000))
+    # History at least this similar to the query counts as relevant, so the cache is skipped
+    SEMANTIC_CACHE_HISTORY_SIMILARITY: float = float(os.getenv("SEMANTIC_CACHE_HISTORY_SIMILARITY", 0.5))
+
+    # Concurrency settings
+    CPU_WORKERS: int = int(os.getenv("CPU_WORKERS", min(4, os.cpu_count() or 1)))
+    IO_WORKERS: int = int(os.getenv("IO_WORKERS", 32))
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", 8))
 
     # Redis settings
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 
+    # Ingestion settings
+    INGESTION_QUEUE_BACKEND: str = os.getenv("INGESTION_QUEUE_BACKEND", "memory")  # memory or redis
+    INGESTION_WORKERS: int = int(os.getenv("INGESTION_WORKERS", 2))
+    INGESTION_JOB_STALE_SECONDS: float = float(os.getenv("INGESTION_JOB_STALE_SECONDS", 900))  # no progress for this long
+    INGESTION_WINDOW_CHUNKS: int = int(os.getenv("INGESTION_WINDOW_CHUNKS", 256))
+    PDF_PARSE_WORKERS: int = int(os.getenv("PDF_PARSE_WORKERS", 1))  # >1 extracts pages in a process pool
+    PDF_PAGES_PER_TASK: int = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+    PDF_SLOW_PAGE_SECONDS: float = float(os.getenv("PDF_SLOW_PAGE_SECONDS", 5.0))
+
+    # Chat session settings
+    SESSION_STORE_BACKEND: str = os.getenv("SESSION_STORE_BACKEND", "memory")  # memory, sql or redis
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", 1000))  # memory backend only
+    SESSION_TTL: float = float(os.getenv("SESSION_TTL", 7 * 24 * 3600.0))  # seconds; memory and redis
+    SESSION_WRITE_BEHIND: bool = os.getenv("SESSION_WRITE_BEHIND", "True").lower() == "true"
+    SESSION_FLUSH_INTERVAL: float = float(os.getenv("SESSION_FLUSH_INTERVAL", 0.5))  # seconds
+    SESSION_MAX_PENDING: int = int(os.getenv("SESSION_MAX_PENDING", 10000))  # buffered messages per worker
+
+    # Chat history settings
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", 1500))  # approximate tokens
+    HISTORY_RECENT_TURNS: int = int(os.getenv("HISTORY_RECENT_TURNS", 4))  # kept verbatim
+    HISTORY_SUMMARY_BLOCK: int = int(os.getenv("HISTORY_SUMMARY_BLOCK", 4))  # older turns folded per summary call
+    HISTORY_RELEVANT_TURNS: int = int(os.getenv("HISTORY_RELEVANT_TURNS", 0))  # earlier turns recalled by similarity
+    HISTORY_RELEVANT_SCAN: int = int(os.getenv("HISTORY_RELEVANT_SCAN", 50))  # earlier turns searched
+    HISTORY_SUMMARY_SESSIONS: int = int(os.getenv("HISTORY_SUMMARY_SESSIONS", 1000))
+    HISTORY_MAX_FOLDS_PER_TURN: int = int(os.getenv("HISTORY_MAX_FOLDS_PER_TURN", 2))  # summary calls per turn at most
+
     # File storage settings
     UPLOAD_DIR: str = os.getenv("UPLOAD_DIR", "data")
 
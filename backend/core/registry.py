@@ -0,0 +1,147 @@
+import os
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+from backend.core.config import settings
+
+# Process-wide registry of heavy, shareable objects (embedding models, vector
+# store clients, LLM clients). Each one is built lazily on first use and then
+# reused by every service, so a worker loads one copy no matter how many
+# services it creates. Heavy third-party imports live inside the factories so
+# importing this module stays cheap.
+
+_instances: Dict[Hashable, Any] = {}
+_locks: Dict[Hashable, threading.Lock] = {}
+_registry_lock = threading.Lock()
+
+def get_or_create(key: Hashable, factory: Callable[[], Any]) -> Any:
+    """Return the shared instance for a key, building it once with the factory."""
+    instance = _instances.get(key)
+    if instance is not None:
+        return instance
+
+    # Per-key locks so loading one model does not block unrelated lookups
+    with _registry_lock:
+        lock = _locks.setdefault(key, threading.Lock())
+
+    with lock:
+        if key not in _instances:
+            _instances[key] = factory()
+        return _instances[key]
+
+def is_loaded(key: Hashable) -> bool:
+    """Check whether a shared instance has already been built."""
+    return key in _instances
+
+def get_embedder(model_name: str = settings.EMBEDDING_MODEL):
+    """Get the shared sentence-transformer embedder for a model."""
+    def factory():
+        from backend.utils.embeddings import Embedder
+        return Embedder(model_name)
+
+    return get_or_create(("embedder", model_name), factory)
+
+def get_vector_client(persist_dir: str = settings.VECTORDB_PATH):
+    """Get the shared Chroma client for a persistence directory."""
+    def factory():
+        import chromadb
+        return chromadb.PersistentClient(path=persist_dir)
+
+    return get_or_create(("vector_client", os.path.abspath(persist_dir)), factory)
+
+def get_collection_cache(persist_dir: str = settings.VECTORDB_PATH):
+    """Get the shared collection metadata cache for a persistence directory."""
+    def factory():
+        from backend.utils.collection_cache import CollectionCache
+        return CollectionCache(ttl=settings.VECTORDB_METADATA_CACHE_TTL)
+
+    return get_or_create(("collection_cache", os.path.abspath(persist_dir)), factory)
+
+def get_answer_cache():
+    """Get the shared semantic answer cache, or None when it is disabled."""
+    if not settings.SEMANTIC_CACHE_ENABLED:
+        return None
+
+    def factory():
+        from backend.utils.answer_cache import SemanticAnswerCache
+        return SemanticAnswerCache(
+            threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+            ttl=settings.SEMANTIC_CACHE_TTL,
+            max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES
+        )
+
+    return get_or_create("answer_cache", factory)
+
+def get_session_store():
+    """Get the chat session store selected by SESSION_STORE_BACKEND."""
+    def factory():
+        from backend.utils.session_store import create_session_store
+        return create_session_store(settings.SESSION_STORE_BACKEND)
+
+    return get_or_create("session_store", factory)
+
+def get_corpus_index(persist_dir: str = settings.VECTORDB_PATH):
+    """Get the shared corpus keyword index stored next to the Chroma data."""
+    path = os.path.join(os.path.abspath(persist_dir), "corpus_index.sqlite3")
+
+    def factory():
+        from backend.utils.corpus_index import CorpusIndex
+        return CorpusIndex(path)
+
+    return get_or_create(("corpus_index", path), factory)
+
+def get_together_client():
+    """Get the shared Together AI client."""
+    def factory():
+        from together import Together
+        return Together(api_key=settings.TOGETHER_API_KEY)
+
+    return get_or_create("together_client", factory)
+
+def get_groq_client():
+    """Get the shared Groq client."""
+    def factory():
+        from groq import Groq
+        return Groq(api_key=settings.GROQ_API_KEY)
+
+    return get_or_create("groq_client", factory)
+
+def get_async_together_client():
+    """Get the shared async Together AI client."""
+    def factory():
+        from together import AsyncTogether
+        return AsyncTogether(api_key=settings.TOGETHER_API_KEY)
+
+    return get_or_create("async_together_client", factory)
+
+def get_async_groq_client():
+    """Get the shared async Groq client."""
+    def factory():
+        from groq import AsyncGroq
+        return AsyncGroq(api_key=settings.GROQ_API_KEY)
+
+    return get_or_create("async_groq_client", factory)
+
+def get_together_chat():
+    """Get the shared LangChain chat model for Together AI."""
+    def factory():
+        from langchain_together import ChatTogether
+        return ChatTogether(
+            model=settings.TOGETHER_MODEL,
+            temperature=0.5,
+            top_p=0.9,
+            together_api_key=settings.TOGETHER_API_KEY
+        )
+
+    return get_or_create("together_chat", factory)
+
+def get_redis_client(url: str = settings.REDIS_URL):
+    """Get the shared Redis client (``fakeredis://`` URLs use an in-process fake)."""
+    def factory():
+        if url.startswith("fakeredis://"):
+            import fakeredis
+            return fakeredis.FakeRedis(decode_responses=True)
+        import redis
+        return redis.from_url(url, decode_responses=True)
+
+    return get_or_create(("redis_client", url), factory)
@@ -0,0 +1,143 @@
+import functools
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+
+# Third-party modules that dominate startup time, imported explicitly during
+# warm-up so their cost shows up in the profile instead of inside whichever
+# component happens to import them first.
+HEAVY_MODULES = [
+    "numpy",
+    "sklearn.feature_extraction.text",
+    "sentence_transformers",
+    "chromadb",
+    "langchain_core",
+    "langchain",
+    "together",
+    "groq",
+]
+
+class StartupState:
+    """Tracks background warm-up of heavy components for the readiness probe.
+
+    Components that fail to load are retried with backoff, so a transient
+    error doesn't keep the process unready for good.
+    """
+
+    def __init__(self):
+        self.started_at = time.time()
+        self.status = "pending"  # pending, loading, ready, failed
+        self.current: Optional[str] = None
+        self.imports: Dict[str, float] = {}
+        self.components: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        # name -> (timings, loader) of what failed, for the retries
+        self._failed: Dict[str, Tuple[Dict[str, float], Callable[[], Any]]] = {}
+        self._thread: Optional[threading.Thread] = None
+        self._retry_thread: Optional[threading.Thread] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.status == "ready"
+
+    def _timed(self, timings: Dict[str, float], name: str, func: Callable[[], Any]):
+        self.current = name
+        start = time.perf_counter()
+        try:
+            func()
+            self.errors.pop(name, None)
+            self._failed.pop(name, None)
+        except Exception as e:
+            self.errors[name] = str(e)
+            self._failed[name] = (timings, func)
+            print(f"Error loading {name} during startup: {e}")
+        finally:
+            timings[name] = round(time.perf_counter() - start, 3)
+            self.current = None
+
+    def warm_up(self, components: Optional[List[Tuple[str, Callable[[], Any]]]] = None):
+        """Import heavy modules and build shared components, recording how long each takes."""
+        self.status = "loading"
+        for module in HEAVY_MODULES:
+            self._timed(self.imports, module, functools.partial(importlib.import_module, module))
+        for name, build in components if components is not None else default_components():
+            self._timed(self.components, name, build)
+        self.status = "failed" if self.errors else "ready"
+
+    def retry_failed(self) -> bool:
+        """Load the components that failed once more; return whether all are loaded now."""
+        for name, (timings, func) in list(self._failed.items()):
+            self._timed(timings, name, func)
+        self.status = "failed" if self.errors else "ready"
+        return self.ready
+
+    def _retry_loop(self):
+        delay = settings.STARTUP_RETRY_DELAY
+        while self._failed:
+            time.sleep(delay)
+            print(f"Retrying startup components: {', '.join(self._failed)}")
+            if self.retry_failed():
+                print("Startup components loaded after retrying")
+            delay = min(delay * 2, settings.STARTUP_RETRY_MAX_DELAY)
+
+    def start_retries(self):
+        """Keep retrying failed components in a daemon thread until they load."""
+        if not self._failed or self._retry_thread is not None:
+            return
+        self._retry_thread = threading.Thread(target=self._retry_loop, name="startup-retry", daemon=True)
+        self._retry_thread.start()
+
+    def _warm_up_and_retry(self, components: Optional[List[Tuple[str, Callable[[], Any]]]] = None):
+        self.warm_up(components)
+        self._retry_loop()
+
+    def start_background(self, components: Optional[List[Tuple[str, Callable[[], Any]]]] = None):
+        """Warm up in a daemon thread so the server can answer liveness probes right away."""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._warm_up_and_retry, args=(components,),
+                                        name="startup-warm-up", daemon=True)
+        self._thread.start()
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize readiness and where startup time went, slowest first."""
+        return {
+            "status": self.status,
+            "loading": self.current,
+            "uptime_seconds": round(time.time() - self.started_at, 3),
+            "imports": dict(sorted(self.imports.items(), key=lambda item: -item[1])),
+            "components": dict(sorted(self.components.items(), key=lambda item: -item[1])),
+            "errors": dict(self.errors),
+        }
+
+def default_components() -> List[Tuple[str, Callable[[], Any]]]:
+    """Shared components to build during warm-up, in dependency order."""
+    from backend.core import registry
+    from backend.api import dependencies
+
+    return [
+        ("embedder", registry.get_embedder),
+        ("vector_client", registry.get_vector_client),
+        ("together_client", registry.get_together_client),
+        ("groq_client", registry.get_groq_client),
+        ("together_chat", registry.get_together_chat),
+        ("document_service", dependencies.get_document_service),
+        ("ingestion_service", dependencies.get_ingestion_service),
+        ("chat_service", dependencies.get_chat_service),
+        ("highlight_service", dependencies.get_highlight_service),
+        ("summary_service", dependencies.get_summary_service),
+        ("study_guide_service", dependencies.get_study_guide_service),
+    ]
+
+startup_state = StartupState()
+
+if __name__ == "__main__":
+    # Print an import-time profile: python -m backend.core.startup
+    import json
+
+    state = StartupState()
+    state.warm_up()
+    print(json.dumps(state.report(), indent=2))
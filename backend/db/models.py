@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, ForeignKey, Text, UniqueConstraint
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 
@@ -32,6 +32,7 @@ class Document(Base):
     
     owner = relationship("User", back_populates="documents")
     highlights = relationship("Highlight", back_populates="document")
+    artifacts = relationship("DocumentArtifact", back_populates="document", cascade="all, delete-orphan")
     
 class Highlight(Base):
     __tablename__ = "highlights"
@@ -73,3 +74,30 @@ class ChatMessage(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     session = relationship("ChatSession", back_populates="messages")
+
+class ChatSessionState(Base):
+    __tablename__ = "chat_session_state"
+    __table_args__ = (UniqueConstraint("session_id", "key"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    session_id = Column(Integer, ForeignKey("chat_sessions.id"), index=True)
+    key = Column(String)  # e.g. history_summary
+    value = Column(Text)  # JSON
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+class DocumentArtifact(Base):
+    __tablename__ = "document_artifacts"
+    __table_args__ = (UniqueConstraint("document_id", "artifact_type", "variant"),)
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(String, ForeignKey("documents.document_id"), index=True)
+    artifact_type = Column(String)  # summary, study_guide, study_guide_full
+    variant = Column(String, default="")  # generation options, e.g. the summary length
+    content_hash = Column(String)  # hash of the document chunks it was generated from
+    prompt_version = Column(String)
+    model = Column(String)
+    content = Column(Text)  # JSON
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    
+    document = relationship("Document", back_populates="artifacts")
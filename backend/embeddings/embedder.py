@@ -2,11 +2,18 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import WebBaseLoader
 from sklearn.feature_extraction.text import TfidfVectorizer
 from langchain_community.document_loaders import PyPDFLoader
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from backend.core.registry import get_embedder
+from backend.utils.embedding_cache import encode_with_cache, get_embedding_cache
+from backend.utils.keywords import top_terms_per_row
 
 class Embedder:
     def __init__(self, model_name="BAAI/bge-m3"):
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        # The sentence-transformer is loaded once per process and shared
+        self.model = get_embedder(model_name).model
+        self.cache = get_embedding_cache()
         self.vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
         self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
 
@@ -15,21 +22,32 @@ class Embedder:
         cleaned_text = text.strip()
         if len(cleaned_text) < 5:  # Ignore very short texts
             return None
-        return self.model.encode(cleaned_text).tolist()
+        embeddings = encode_with_cache(self.cache, self.model_name, [cleaned_text], self.model.encode)
+        return np.asarray(embeddings[0]).tolist()
 
+    def embed_batch(self, texts, batch_size=64):
+        """Embed a list of texts in mini-batches, returning a contiguous float32 matrix."""
+        if not texts:
+            return np.empty((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        texts = [text.strip() for text in texts]
+        embeddings = encode_with_cache(
+            self.cache,
+            self.model_name,
+            texts,
+            lambda batch: self.model.encode(
+                batch,
+                batch_size=batch_size,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ),
+        )
+        return np.ascontiguousarray(np.stack(embeddings), dtype=np.float32)
 
     def extract_keywords(self, chunks):
         """Extracts top TF-IDF keywords for each chunk."""
         tfidf_matrix = self.vectorizer.fit_transform(chunks)
         feature_names = self.vectorizer.get_feature_names_out()
-        keywords_per_chunk = []
-        
-        for row in tfidf_matrix:
-            top_indices = row.toarray().flatten().argsort()[-5:][::-1]  # Top 5 keywords
-            keywords = [feature_names[i] for i in top_indices]
-            keywords_per_chunk.append(keywords)
-        
-        return keywords_per_chunk
+        return top_terms_per_row(tfidf_matrix, feature_names, 5)  # Top 5 keywords
     
     def load_pdf(self, pdf_path):
         """
@@ -48,12 +66,15 @@ class Embedder:
         # Extract keywords for hybrid search
         keywords_list = self.extract_keywords(text_chunks)
 
+        # Embed all chunks in mini-batches
+        embeddings = self.embed_batch(text_chunks).tolist()
+
         # Prepare structured output
         chunk_data = []
         for i, chunk_text in enumerate(text_chunks):
             chunk_data.append({
                 "text": chunk_text,
-                "embedding": self.get_embedding(chunk_text),
+                "embedding": embeddings[i],
                 "keywords": keywords_list[i],
             })
         
@@ -80,12 +101,15 @@ class Embedder:
         # Extract keywords for hybrid search
         keywords_list = self.extract_keywords(text_chunks)
 
+        # Embed all chunks in mini-batches
+        embeddings = self.embed_batch(text_chunks).tolist()
+
         # Prepare structured output
         chunk_data = []
         for i, chunk_text in enumerate(text_chunks):
             chunk_data.append({
                 "text": chunk_text,
-                "embedding": self.get_embedding(chunk_text),
+                "embedding": embeddings[i],
                 "keywords": keywords_list[i]
             })
 
@@ -1,5 +1,12 @@
 from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 
+# Bump a version when its prompts change so stored artifacts are regenerated
+PROMPT_VERSIONS = {
+    "summary": "1",
+    "study_guide": "1",
+    "study_guide_full": "1",
+}
+
 #######################################
 # For Llama 3.3 Main chat functioning #
 #######################################
@@ -168,3 +175,190 @@ chat_prompt = ChatPromptTemplate.from_messages([
     ("human", "### Relevant Document Context:\n{context}"),
 ])
 
+
+########################
+# Study Guide Workflow #
+########################
+def chunk_summary_prompt(chunk: str) -> str:
+    """Summarize one document chunk in 2-3 sentences."""
+    return f"""
+    You are an expert academic summarizer helping students quickly understand complex material. 
+    Your task is to summarize the following text chunk clearly and concisely in 2–3 sentences.
+
+    Follow these principles:
+    - Focus only on the **core concepts**, **key points**, and **essential arguments**
+    - Keep the original **intent**, but **simplify the language** to aid understanding
+    - Remove repetition, tangents, or overly detailed explanations
+    - If a definition, statistic, or example is central, include it briefly
+    - Structure your summary logically so it flows and stands on its own
+
+    Text:
+    {chunk}
+    """
+
+def concept_prompt(text: str) -> str:
+    """Extract and explain the key concepts of a text."""
+    return f"""
+    You are an expert knowledge mapper. Extract and explain the key concepts from the following academic text chunk.
+
+    Follow these guidelines:
+    - Identify the most important concepts, principles, theories, or terms.
+    - For each concept:
+      - Provide a clear, concise definition.
+      - Explain its role or importance in the topic.
+      - Mention any relationships with other concepts (e.g., cause-effect, hierarchy).
+      - Include formulas, models, or frameworks if discussed.
+      - If there are debates or alternative views, mention them briefly.
+    - Format: Use headings for each concept followed by a short explanation (2–4 sentences).
+
+    Text:
+    {text}
+
+    Output: A structured list of key concepts with clear explanations.
+    """
+
+def review_question_prompt(text: str) -> str:
+    """Create review questions with answers for a text."""
+    return f"""
+    You are an expert educational assessment designer. Create thoughtful review questions based on the following academic text chunk.
+
+    Guidelines:
+    - Generate 3 to 5 questions that test understanding of core ideas and concepts
+    - Use a variety of question types:
+    - Recall (basic understanding)
+    - Application (using ideas in new contexts)
+    - Analysis (exploring relationships between concepts)
+    - Evaluation (critical thinking or critique)
+    - Each question should be clear, focused, and meaningful
+    - For every question, provide a detailed answer explanation
+    - Avoid yes/no or overly simplistic questions
+    - Encourage deeper learning and reflection
+
+    Text:
+    {text}
+
+    Output: A list of review questions with comprehensive answer explanations.
+    """
+
+def analogy_prompt(text: str) -> str:
+    """Create analogies for the hardest concepts in a text."""
+    return f"""
+    You are an expert in making complex concepts accessible. Create illuminating analogies for the key concepts in the provided text chunk.
+
+    Follow these guidelines:
+    - Identify 2-3 challenging or abstract concepts from the text
+    - For each concept, create an analogy that:
+    * Uses familiar, everyday scenarios or objects
+    * Accurately represents the key relationships or properties of the concept
+    * Helps bridge the gap between the unfamiliar and the familiar
+    - Explain how the analogy maps to the original concept
+    - Note any limitations of the analogy (where it breaks down)
+    - Ensure analogies are culturally inclusive and widely accessible
+    - When possible, use diverse domains for analogies (e.g., sports, cooking, nature)
+
+    Input:
+    {text}
+
+    Output: Helpful analogies that make complex concepts more intuitive and memorable.
+    """
+
+def faq_prompt(text: str) -> str:
+    """Create an FAQ section for a text."""
+    return f"""
+    You are an expert educational content developer who specializes in creating helpful FAQ sections. Generate a comprehensive FAQ section based on the provided text chunk that resembles those found in high-quality reference books.
+
+    Follow these guidelines:
+    - Identify 4-6 questions that students or readers genuinely struggle with when learning this material
+    - Create questions that:
+    * Address common misconceptions or points of confusion
+    * Cover practical applications of theoretical concepts
+    * Clarify boundaries between similar or easily confused concepts
+    * Address "why" questions that explain underlying principles or rationale
+    * Include questions about exceptions to rules or special cases
+    - Format questions as natural, conversational inquiries a student might actually ask
+    - Craft detailed, clear answers that:
+    * Directly address the core confusion
+    * Provide illuminating examples where helpful
+    * Reference specific sections or content from the original material
+    * Anticipate and address follow-up questions
+    - Include at least one question that addresses how this content connects to broader themes or topics
+    - Ensure the FAQ section feels like a genuine resource, not a quiz or assessment
+
+    Input: {text}
+
+    Output: An authentic FAQ section that addresses real learning challenges with thoughtful, illuminating responses.
+    """
+
+def integrative_guide_prompt(concept: str, question: str, analogy: str, faq: str) -> str:
+    """Combine the study guide sections into one personalized guide."""
+    return f"""
+    You are an expert educational consultant designing personalized study plans. Integrate the information from the document chunks to create an optimal, intelligent study guide.
+
+    Follow these guidelines:
+    - Review all information from the summarization, concept mapping, review questions, and analogies
+    - Create a cohesive study plan that:
+    * Presents a logical learning progression from foundational to advanced concepts
+    * Identifies the 3-5 most critical areas to focus on based on complexity and importance
+    * Suggests specific study techniques suited to the material (e.g., spaced repetition, concept mapping)
+    * Recommends time allocation for different topics based on difficulty and significance
+    - Include metacognitive prompts that encourage the student to reflect on their understanding
+    - Suggest connections to prior knowledge or related fields when relevant
+    - Provide a brief "quick reference" section for essential formulas, definitions, or principles
+    - Adapt language and approach based on apparent complexity of the material
+
+    Input:
+    Concepts:
+    {concept}
+
+    Review Questions:
+    {question}
+
+    Analogies:
+    {analogy}
+
+    FAQs:
+    {faq}
+    Output: A personalized, intelligent study guide that maximizes understanding and retention while being genuinely helpful and accessible.
+    """
+
+###########################
+# Document Summarization  #
+###########################
+def section_summary_prompt(text: str) -> str:
+    """Summarize one section of a longer document for a later reduce step."""
+    return f"""
+    You are an expert summarizer. The text below is one section of a longer document.
+    Summarize it in at most 200 words, keeping every key point, definition, finding and conclusion
+    so the section can later be combined with summaries of the other sections.
+    Do not add an introduction or commentary.
+
+    Section:
+    {text}
+    """
+
+def document_summary_prompt(text: str, max_length: int) -> str:
+    """Write the final document summary from its text or section summaries."""
+    return f"""
+    You are an expert summarizer. Create a concise summary of this document (or of the summaries of its sections):
+
+    {text}
+
+    Capture the key points and main ideas. Keep the summary under {max_length} words.
+    """
+
+#########################
+# Conversation History  #
+#########################
+def conversation_summary_prompt(summary: str, turns: str) -> str:
+    """Fold the next exchanges of a chat into its running summary."""
+    return f"""
+    You are maintaining a running summary of a conversation between a user and a document QA assistant.
+    Update the summary with the new exchanges below. Keep the topics covered, questions asked, key answers,
+    definitions and any preferences the user stated. Keep it under 200 words and write it as plain prose.
+
+    Current summary:
+    {summary or "(none yet)"}
+
+    New exchanges:
+    {turns}
+    """
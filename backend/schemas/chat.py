@@ -34,6 +34,8 @@ class ChatRequest(BaseModel):
     query: str
     document_id: str
     session_id: Optional[str] = None
+    # Return only the new turn and a history cursor instead of the full history
+    incremental: Optional[bool] = False
 
 class ChatMessage(BaseModel):
     user: Optional[str] = None
@@ -44,3 +46,12 @@ class ChatResponse(BaseModel):
     response: str
     session_id: str
     chat_history: Optional[List[ChatMessage]] = None
+    # Number of messages in the session after this turn
+    history_cursor: Optional[int] = None
+
+class ChatHistoryResponse(BaseModel):
+    session_id: str
+    messages: List[ChatMessage]
+    cursor: int
+    next_cursor: Optional[int] = None
+    total: int
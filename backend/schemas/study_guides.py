@@ -5,9 +5,12 @@ from datetime import datetime
 class StudyGuideRequest(BaseModel):
     document_id: str
     format: Optional[str] = "markdown"  # markdown, html, text
+    mode: Optional[str] = "quick"  # quick or full
+    force: Optional[bool] = False  # regenerate even if a stored copy is current
 
 class StudyGuideResponse(BaseModel):
     document_id: str
     study_guide: str
     key_concepts: List[str]
     review_questions: List[str]
+    sections: Optional[Dict[str, str]] = None
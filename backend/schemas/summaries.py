@@ -5,6 +5,7 @@ from datetime import datetime
 class SummaryRequest(BaseModel):
     document_id: str
     max_length: Optional[int] = 500
+    force: Optional[bool] = False  # regenerate even if a stored copy is current
 
 class SummaryResponse(BaseModel):
     document_id: str
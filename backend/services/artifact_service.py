@@ -0,0 +1,76 @@
+import hashlib
+import json
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.db.models import DocumentArtifact
+from backend.llm.prompts import PROMPT_VERSIONS
+from backend.services.llm_service import ERROR_RESPONSE
+
+class ArtifactService:
+    """Stores generated summaries and study guides next to their document.
+
+    An artifact is reused while the document's chunks, the prompt version
+    and the model are unchanged; otherwise it is regenerated and replaced.
+    Results that report ``errors`` are returned but not stored, so a failed
+    call is retried on the next request instead of being served for good.
+    """
+
+    def content_hash(self, chunks: List[str]) -> str:
+        """Hash the chunks an artifact is generated from."""
+        digest = hashlib.sha256()
+        for chunk in chunks:
+            digest.update(chunk.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get_artifact(self, db: Session, document_id: str, artifact_type: str, variant: str = "") -> Optional[DocumentArtifact]:
+        """Get the stored artifact for a document, if any."""
+        return db.query(DocumentArtifact).filter(
+            DocumentArtifact.document_id == document_id,
+            DocumentArtifact.artifact_type == artifact_type,
+            DocumentArtifact.variant == variant
+        ).first()
+
+    def get_or_generate(self, db: Optional[Session], document_id: str, artifact_type: str, chunks: List[str],
+                        generate: Callable[[], Dict[str, Any]], variant: str = "", force: bool = False) -> Dict[str, Any]:
+        """Return the stored artifact if its inputs are unchanged, otherwise generate and store it.
+
+        ``generate`` returns the artifact, with a non-empty ``errors`` list if it is incomplete.
+        """
+        if db is None:
+            return generate()
+
+        content_hash = self.content_hash(chunks)
+        prompt_version = PROMPT_VERSIONS[artifact_type]
+        model = settings.TOGETHER_MODEL
+
+        artifact = self.get_artifact(db, document_id, artifact_type, variant)
+        if (not force and artifact is not None and artifact.content_hash == content_hash
+                and artifact.prompt_version == prompt_version and artifact.model == model):
+            return json.loads(artifact.content)
+
+        result = generate()
+
+        # Don't keep a partial result or a provider error around as if it were the artifact
+        if result.get("errors") or ERROR_RESPONSE in json.dumps(result):
+            print(f"Not storing {artifact_type} for document {document_id}: {result.get('errors') or 'provider error'}")
+            return result
+
+        if artifact is None:
+            artifact = DocumentArtifact(document_id=document_id, artifact_type=artifact_type, variant=variant)
+            db.add(artifact)
+        artifact.content_hash = content_hash
+        artifact.prompt_version = prompt_version
+        artifact.model = model
+        artifact.content = json.dumps(result)
+
+        try:
+            db.commit()
+        except IntegrityError:
+            # Another request stored the same artifact first
+            db.rollback()
+        return result
@@ -1,15 +1,25 @@
 import uuid
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional, Tuple
 
+import numpy as np
+from langchain_core.messages import HumanMessage, AIMessage
+
+from backend.core.config import settings
+from backend.core.concurrency import run_cpu_bound, run_io_bound
+from backend.core.registry import get_answer_cache, get_session_store
 from backend.services.vectordb_service import VectorDBService
-from backend.services.llm_service import LLMService
-from backend.utils.chat_memory import get_session_memory, reset_session_memory
+from backend.services.llm_service import LLMService, ERROR_RESPONSE
+from backend.services.history_window import HistoryWindow
+from backend.utils.chat_memory import get_session_memory, get_session_page, reset_session_memory
 from backend.schemas.chat import ChatMessage
 
 class ChatService:
     def __init__(self):
         self.vectordb_service = VectorDBService()
         self.llm_service = LLMService()
+        self.answer_cache = get_answer_cache()
+        self.history_window = HistoryWindow(self.llm_service, embedder=self.vectordb_service.embedder,
+                                            store=get_session_store())
 
     def create_session(self, document_id: str) -> Dict[str, Any]:
         """Create a new chat session."""
@@ -24,8 +34,8 @@ class ChatService:
             "message": "Chat session created successfully."
         }
 
-    def process_query(self, query: str, document_id: str, session_id: Optional[str] = None) -> Dict[str, Any]:
-        """Process a query and generate a response."""
+    def _open_session(self, document_id: str, session_id: Optional[str]):
+        """Get (or create) the session and load its messages, once per turn."""
         # Create session if not provided
         if not session_id:
             session_data = self.create_session(document_id)
@@ -33,54 +43,215 @@ class ChatService:
 
         # Get memory
         memory_instance = get_session_memory(session_id)
-        previous_context = memory_instance.load_memory_variables({}).get("history", [])
+        messages = memory_instance.load_memory_variables({}).get("history", [])
+        # Copy, as the memory returns its own list, which save_context extends
+        messages = list(messages) if isinstance(messages, list) else []
 
-        if isinstance(previous_context, list):
-            previous_context = "\n".join(
-                [msg.content for msg in previous_context if hasattr(msg, "content")]
-            )
+        return session_id, memory_instance, messages
 
-        # Retrieve relevant documents
+    def _load_session(self, document_id: str, session_id: Optional[str], query: str = ""):
+        """Get (or create) the session and its history, windowed to the token budget."""
+        session_id, memory_instance, messages = self._open_session(document_id, session_id)
+        previous_context = self.history_window.build(session_id, messages, query)
+        return session_id, memory_instance, messages, previous_context
+
+    async def _aload_session(self, document_id: str, session_id: Optional[str], query: str = ""):
+        """Async version of ``_load_session``; summary updates use the async client."""
+        # The session store may be SQL or Redis, so read it off the event loop
+        session_id, memory_instance, messages = await run_io_bound(self._open_session, document_id, session_id)
+        previous_context = await self.history_window.abuild(session_id, messages, query)
+        return session_id, memory_instance, messages, previous_context
+
+    def _retrieve_context(self, query: str, document_id: str) -> str:
+        """Retrieve relevant chunks and format them as prompt context."""
         retrieved_docs, retrieved_metadata = self.vectordb_service.hybrid_query(
             query_text=query,
             document_id=document_id,
             top_k=5
         )
 
-        # Format context
-        context = "\n".join([
+        return "\n".join([
             f"{doc}\n[Keywords: {', '.join(metadata.get('keywords', []))}]"
             for doc, metadata in zip(retrieved_docs, retrieved_metadata or [{}])
         ])
 
-        # Generate response
-        response = self.llm_service.generate_rag_response(
-            query=query,
-            context=context,
-            previous_context=previous_context
-        )
+    def _check_answer_cache(self, query: str, document_id: str, previous_context: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """Look up a cached answer for a standalone question.
 
-        # Update memory
-        memory_instance.save_context({"input": query}, {"output": response})
+        Returns the cached response (or None) and the query embedding to store
+        the new answer under. The embedding is None when the cache does not
+        apply: it is disabled, or the question follows on from the history.
+        """
+        if self.answer_cache is None:
+            return None, None
 
-        # Get chat history and convert to the expected format
-        chat_history = memory_instance.load_memory_variables({}).get("history", [])
-        formatted_history = []
+        embedder = self.vectordb_service.embedder
+        query_embedding = np.asarray(embedder.get_embedding(query), dtype=np.float32)
+
+        if previous_context and previous_context.strip():
+            # Compare against the latest part of the conversation only
+            history_embedding = np.asarray(embedder.get_embedding(previous_context[-1000:]), dtype=np.float32)
+            norms = np.linalg.norm(query_embedding) * np.linalg.norm(history_embedding)
+            if norms and float(query_embedding @ history_embedding) / norms >= settings.SEMANTIC_CACHE_HISTORY_SIMILARITY:
+                return None, None
+
+        return self.answer_cache.lookup(document_id, query_embedding), query_embedding
 
-        # Convert LangChain message objects to ChatMessage objects
-        for message in chat_history:
+    def _store_answer(self, document_id: str, query: str, query_embedding: Optional[np.ndarray], response: str):
+        """Cache an answer for similar questions, unless it is a provider error."""
+        if query_embedding is None or not response or response == ERROR_RESPONSE:
+            return
+        self.answer_cache.store(document_id, query, query_embedding, response)
+
+    def _format_history(self, messages) -> List[ChatMessage]:
+        """Convert LangChain message objects to ChatMessage objects."""
+        formatted_history = []
+        for message in messages:
             if hasattr(message, "content") and message.content:
                 if hasattr(message, "type") and message.type == "human":
                     formatted_history.append(ChatMessage(user=message.content))
                 else:
                     formatted_history.append(ChatMessage(bot=message.content))
+        return formatted_history
 
-        # Return response with properly formatted chat history
-        return {
+    def _save_turn(self, query: str, response: str, session_id: str, memory_instance, messages,
+                   incremental: bool = False) -> Dict[str, Any]:
+        """Save the turn to memory and build the response payload.
+
+        ``messages`` is the history loaded at the start of the turn, so the
+        session is not read again. In incremental mode the payload carries
+        only the new turn and a cursor (the session's message count), and
+        clients fetch older messages from the history endpoint.
+        """
+        # Update memory
+        memory_instance.save_context({"input": query}, {"output": response})
+
+        result = {
             "query": query,
             "response": response,
             "session_id": session_id,
-            "chat_history": formatted_history
+            "history_cursor": len(messages) + 2
+        }
+        if incremental:
+            result["chat_history"] = None
+        else:
+            result["chat_history"] = self._format_history(messages) + self._format_history([
+                HumanMessage(content=query), AIMessage(content=response)
+            ])
+        return result
+
+    def process_query(self, query: str, document_id: str, session_id: Optional[str] = None,
+                      incremental: bool = False) -> Dict[str, Any]:
+        """Process a query and generate a response."""
+        session_id, memory_instance, messages, previous_context = self._load_session(document_id, session_id, query)
+
+        # Reuse the answer to an equivalent question if there is one
+        cached, query_embedding = self._check_answer_cache(query, document_id, previous_context)
+        if cached is not None:
+            return self._save_turn(query, cached, session_id, memory_instance, messages, incremental)
+
+        # Retrieve relevant documents
+        context = self._retrieve_context(query, document_id)
+
+        # Generate response
+        response = self.llm_service.generate_rag_response(
+            query=query,
+            context=context,
+            previous_context=previous_context
+        )
+
+        self._store_answer(document_id, query, query_embedding, response)
+
+        return self._save_turn(query, response, session_id, memory_instance, messages, incremental)
+
+    async def aprocess_query(self, query: str, document_id: str, session_id: Optional[str] = None,
+                             incremental: bool = False) -> Dict[str, Any]:
+        """Process a query without blocking the event loop.
+
+        Retrieval (embedding + vector search) runs in the CPU pool and the LLM
+        call goes through the async client, so one slow generation does not
+        stall other requests on the same worker.
+        """
+        session_id, memory_instance, messages, previous_context = await self._aload_session(document_id, session_id, query)
+
+        # Reuse the answer to an equivalent question if there is one
+        cached, query_embedding = await run_cpu_bound(self._check_answer_cache, query, document_id, previous_context)
+        if cached is not None:
+            return await run_io_bound(self._save_turn, query, cached, session_id, memory_instance, messages, incremental)
+
+        # Retrieve relevant documents
+        context = await run_cpu_bound(self._retrieve_context, query, document_id)
+
+        # Generate response
+        response = await self.llm_service.agenerate_rag_response(
+            query=query,
+            context=context,
+            previous_context=previous_context
+        )
+
+        self._store_answer(document_id, query, query_embedding, response)
+
+        return await run_io_bound(self._save_turn, query, response, session_id, memory_instance, messages, incremental)
+
+    async def astream_query(self, query: str, document_id: str, session_id: Optional[str] = None,
+                            incremental: bool = False) -> AsyncIterator[Dict[str, Any]]:
+        """Process a query and stream the response as it is generated.
+
+        Yields a ``start`` event with the session ID, ``token`` events with
+        text deltas, and a ``done`` event carrying the same payload as
+        ``aprocess_query`` once the full answer is saved to memory. If the
+        stream fails, an ``error`` event ends it and the turn is not saved.
+        """
+        session_id, memory_instance, messages, previous_context = await self._aload_session(document_id, session_id, query)
+        yield {"event": "start", "session_id": session_id}
+
+        # Reuse the answer to an equivalent question if there is one
+        cached, query_embedding = await run_cpu_bound(self._check_answer_cache, query, document_id, previous_context)
+        if cached is not None:
+            yield {"event": "token", "text": cached}
+            response = cached
+        else:
+            # Retrieve relevant documents
+            context = await run_cpu_bound(self._retrieve_context, query, document_id)
+
+            # Stream the response
+            parts = []
+            try:
+                async for delta in self.llm_service.astream_rag_response(
+                    query=query,
+                    context=context,
+                    previous_context=previous_context
+                ):
+                    parts.append(delta)
+                    yield {"event": "token", "text": delta}
+            except Exception as e:
+                # A truncated answer is not saved to memory or cached; the
+                # client discards the partial text and can ask again
+                yield {"event": "error", "detail": f"Error processing query: {str(e)}"}
+                return
+            response = "".join(parts).strip()
+
+            self._store_answer(document_id, query, query_embedding, response)
+
+        result = await run_io_bound(self._save_turn, query, response, session_id, memory_instance, messages, incremental)
+        if result["chat_history"] is not None:
+            result["chat_history"] = [message.model_dump() for message in result["chat_history"]]
+        yield {"event": "done", **result}
+
+    def get_history(self, session_id: str, cursor: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """Get one page of a session's chat history, starting at ``cursor``."""
+        messages, total = get_session_page(session_id, cursor, limit)
+        next_cursor = cursor + len(messages)
+
+        return {
+            "session_id": session_id,
+            "messages": [
+                ChatMessage(user=m["content"]) if m["role"] == "user" else ChatMessage(bot=m["content"])
+                for m in messages
+            ],
+            "cursor": cursor,
+            "next_cursor": next_cursor if next_cursor < total else None,
+            "total": total
         }
 
     def reset_session(self, session_id: str) -> Dict[str, Any]:
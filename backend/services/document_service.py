@@ -3,6 +3,7 @@ import uuid
 from typing import Dict, Any, List, Optional, BinaryIO
 from sqlalchemy.orm import Session
 
+from backend.core.registry import get_answer_cache
 from backend.db.models import Document, User
 from backend.services.vectordb_service import VectorDBService
 
@@ -11,6 +12,13 @@ class DocumentService:
         self.vectordb_service = VectorDBService()
         self.upload_dir = "data"
 
+    def _invalidate_caches(self, document_id: str) -> None:
+        """Drop cached vector store metadata and chat answers for a document."""
+        self.vectordb_service.invalidate_cache(document_id)
+        answer_cache = get_answer_cache()
+        if answer_cache is not None:
+            answer_cache.invalidate(document_id)
+
     def save_uploaded_file(self, file: BinaryIO, filename: str) -> str:
         """Save an uploaded file to disk."""
         # Create a unique document ID
@@ -26,29 +34,50 @@ class DocumentService:
 
         return document_id, file_path
 
-    def process_pdf(self, file: BinaryIO, filename: str, db: Session, user_id: int) -> Dict[str, Any]:
-        """Process a PDF file and store it in the database."""
-        # Save the file
-        document_id, file_path = self.save_uploaded_file(file, filename)
-
-        # Process the PDF
-        chunk_count = self.vectordb_service.add_pdf(file_path, document_id)
-
-        # Create a document record
+    def create_document_record(self, db: Session, document_id: str, title: str, file_path: str,
+                               file_type: str, user_id: int, chunk_count: int = 0) -> Document:
+        """Create the database record for a document."""
         db_document = Document(
-            title=filename,
+            title=title,
             document_id=document_id,
             file_path=file_path,
-            file_type="pdf",
+            file_type=file_type,
             chunk_count=chunk_count,
             owner_id=user_id
         )
 
-        # Save to database
         db.add(db_document)
         db.commit()
         db.refresh(db_document)
 
+        return db_document
+
+    def finalize_document(self, db: Session, document_id: str, chunk_count: int, title: Optional[str] = None) -> None:
+        """Record the outcome of background ingestion on the document record."""
+        document = self.get_document(db, document_id)
+        if not document:
+            return
+
+        document.chunk_count = chunk_count
+        if title:
+            document.title = title
+        db.commit()
+        
+        # The document's collection and chunk count just changed
+        self._invalidate_caches(document_id)
+
+    def process_pdf(self, file: BinaryIO, filename: str, db: Session, user_id: int) -> Dict[str, Any]:
+        """Process a PDF file and store it in the database."""
+        # Save the file
+        document_id, file_path = self.save_uploaded_file(file, filename)
+
+        # Process the PDF
+        chunk_count = self.vectordb_service.add_pdf(file_path, document_id, owner_id=user_id)
+        self._invalidate_caches(document_id)
+
+        # Create a document record
+        self.create_document_record(db, document_id, filename, file_path, "pdf", user_id, chunk_count)
+
         return {
             "message": f"PDF '{filename}' uploaded successfully!",
             "document_id": document_id,
@@ -61,26 +90,15 @@ class DocumentService:
         document_id = uuid.uuid4().hex[:8]
 
         # Process the web article
-        result = self.vectordb_service.add_web_article(url, document_id)
+        result = self.vectordb_service.add_web_article(url, document_id, owner_id=user_id)
+        self._invalidate_caches(document_id)
 
         # Extract metadata
         metadata = result["metadata"]
         title = metadata.get("title", url)
 
         # Create a document record
-        db_document = Document(
-            title=title,
-            document_id=document_id,
-            file_path=url,
-            file_type="web",
-            chunk_count=result["chunk_count"],
-            owner_id=user_id
-        )
-
-        # Save to database
-        db.add(db_document)
-        db.commit()
-        db.refresh(db_document)
+        self.create_document_record(db, document_id, title, url, "web", user_id, result["chunk_count"])
 
         return {
             "message": "Web article added successfully!",
@@ -115,9 +133,8 @@ class DocumentService:
 
         # Delete the document from the vector database
         try:
-            # Get the collection name for this document
-            collection_name = f"doc_{document_id}"
-            # Delete the collection if it exists
-            self.vectordb_service.client.delete_collection(collection_name)
+            self.vectordb_service.delete_document(document_id)
         except Exception as e:
             print(f"Error deleting document from vector database: {e}")
+        finally:
+            self._invalidate_caches(document_id)
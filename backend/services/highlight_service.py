@@ -39,6 +39,10 @@ class HighlightService:
         """Generate a smart highlight using LLM."""
         return self.llm_service.generate_smart_highlight(text)
     
+    async def aget_smart_highlight(self, text: str) -> Dict[str, Any]:
+        """Generate a smart highlight using the async LLM client."""
+        return await self.llm_service.agenerate_smart_highlight(text)
+    
     def get_user_highlights(self, db: Session, user_id: int) -> List[Highlight]:
         """Get all highlights for a user."""
         return db.query(Highlight).filter(Highlight.user_id == user_id).all()
@@ -0,0 +1,200 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from backend.core.config import settings
+from backend.core.concurrency import run_cpu_bound, run_io_bound
+from backend.llm.prompts import conversation_summary_prompt
+from backend.services.llm_service import ERROR_RESPONSE
+
+# A (user message, assistant reply) pair
+Turn = Tuple[str, str]
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)."""
+    return len(text) // 4 + 1
+
+def format_turns(turns: List[Turn]) -> str:
+    """Render turns the way they appear in the chat prompt."""
+    return "\n".join(f"User: {question}\nAssistant: {answer}" for question, answer in turns)
+
+def split_turns(messages) -> List[Turn]:
+    """Pair LangChain chat messages into (user, assistant) turns."""
+    turns, question = [], None
+    for message in messages:
+        content = getattr(message, "content", "")
+        if getattr(message, "type", "") == "human":
+            if question is not None:
+                turns.append((question, ""))
+            question = content
+        else:
+            turns.append((question or "", content))
+            question = None
+    if question is not None:
+        turns.append((question, ""))
+    return turns
+
+class HistoryWindow:
+    """Builds the conversation history part of a chat prompt within a token budget.
+
+    The last ``recent_turns`` turns are kept verbatim. Older turns are folded
+    into a rolling summary ``summary_block`` turns at a time, so at most one
+    summary call happens every few turns and prompt size stays flat however
+    long the session runs. Summaries are cached per session and, given a
+    ``store``, saved next to the session's messages so any worker can pick
+    them up; at most ``max_folds`` blocks are folded per turn. Optionally
+    the earlier turns most similar to the query are recalled.
+    """
+
+    STATE_KEY = "history_summary"
+
+    def __init__(self, llm_service, embedder=None, token_budget: Optional[int] = None,
+                 recent_turns: Optional[int] = None, summary_block: Optional[int] = None,
+                 relevant_turns: Optional[int] = None, relevant_scan: Optional[int] = None,
+                 max_sessions: Optional[int] = None, max_folds: Optional[int] = None, store=None):
+        self.llm_service = llm_service
+        self.embedder = embedder
+        self.token_budget = token_budget or settings.HISTORY_TOKEN_BUDGET
+        self.recent_turns = settings.HISTORY_RECENT_TURNS if recent_turns is None else recent_turns
+        self.summary_block = max(1, summary_block or settings.HISTORY_SUMMARY_BLOCK)
+        self.relevant_turns = settings.HISTORY_RELEVANT_TURNS if relevant_turns is None else relevant_turns
+        self.relevant_scan = relevant_scan or settings.HISTORY_RELEVANT_SCAN
+        self.max_sessions = max_sessions or settings.HISTORY_SUMMARY_SESSIONS
+        self.max_folds = max(1, max_folds or settings.HISTORY_MAX_FOLDS_PER_TURN)
+        self.store = store
+        # session_id -> (turns folded, summary, fingerprint of the last folded turn)
+        self._summaries: "OrderedDict[str, Tuple[int, str, str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _fingerprint(self, turns: List[Turn]) -> str:
+        return hashlib.sha1(format_turns(turns[-1:]).encode("utf-8")).hexdigest()
+
+    def _cached_summary(self, session_id: str, older: List[Turn]) -> Tuple[int, str]:
+        """Return the cached summary if it still matches the start of the history."""
+        with self._lock:
+            entry = self._summaries.get(session_id)
+            if entry is not None:
+                self._summaries.move_to_end(session_id)
+        if entry is None and self.store is not None:
+            try:
+                stored = self.store.load_state(session_id, self.STATE_KEY)
+            except Exception as e:
+                print(f"Error loading history summary: {e}")
+                stored = None
+            if stored:
+                entry = tuple(stored)
+        if entry is not None:
+            folded, summary, fingerprint = entry
+            # A reset session that grew again must not reuse the old summary
+            if folded <= len(older) and fingerprint == self._fingerprint(older[:folded]):
+                return folded, summary
+        return 0, ""
+
+    def _remember(self, session_id: str, folded: int, summary: str, older: List[Turn]):
+        entry = (folded, summary, self._fingerprint(older[:folded]))
+        with self._lock:
+            self._summaries[session_id] = entry
+            self._summaries.move_to_end(session_id)
+            while len(self._summaries) > self.max_sessions:
+                self._summaries.popitem(last=False)
+        if self.store is not None:
+            try:
+                self.store.save_state(session_id, self.STATE_KEY, list(entry))
+            except Exception as e:
+                print(f"Error saving history summary: {e}")
+
+    def _split(self, messages) -> Tuple[List[Turn], List[Turn]]:
+        turns = split_turns(messages)
+        split = max(len(turns) - self.recent_turns, 0)
+        return turns[:split], turns[split:]
+
+    def _blocks(self, older: List[Turn], folded: int) -> List[List[Turn]]:
+        """Full blocks of older turns not yet in the summary, up to ``max_folds``."""
+        end = len(older) // self.summary_block * self.summary_block
+        blocks = [older[i:i + self.summary_block] for i in range(folded, end, self.summary_block)]
+        # A long history with no summary yet catches up over several turns
+        return blocks[:self.max_folds]
+
+    def _relevant(self, candidates: List[Turn], query: str) -> List[Turn]:
+        """Earlier turns most similar to the query, in conversation order."""
+        if not self.relevant_turns or self.embedder is None or not candidates or not query:
+            return []
+
+        candidates = candidates[-self.relevant_scan:]
+        # Turn embeddings come from the embedding cache after their first use
+        matrix = np.asarray(self.embedder.embed_batch([format_turns([turn]) for turn in candidates] + [query]),
+                            dtype=np.float32)
+        vectors, query_vector = matrix[:-1], matrix[-1]
+        norms = np.linalg.norm(vectors, axis=1) * np.linalg.norm(query_vector)
+        scores = vectors @ query_vector / np.where(norms == 0, 1, norms)
+        top = sorted(np.argsort(-scores)[:self.relevant_turns])
+        return [candidates[i] for i in top]
+
+    def _assemble(self, summary: str, older: List[Turn], folded: int, recent: List[Turn], query: str) -> str:
+        """Fit the summary, recalled turns and latest turns into the token budget."""
+        # Older turns short of a full block are not summarized yet, so keep them verbatim
+        verbatim = older[folded:] + recent
+        kept, used = [], 0
+        for turn in reversed(verbatim):
+            text = format_turns([turn])
+            cost = estimate_tokens(text)
+            if used + cost > self.token_budget:
+                if not kept:
+                    # Always keep the end of the latest turn
+                    text = text[-self.token_budget * 4:]
+                    kept.insert(0, text)
+                    used = self.token_budget
+                break
+            kept.insert(0, text)
+            used += cost
+
+        remaining = self.token_budget - used
+        sections = []
+        if summary and remaining > 0:
+            summary = summary[:remaining * 4]
+            sections.append(f"Summary of earlier conversation:\n{summary}")
+            remaining -= estimate_tokens(summary)
+
+        recalled = []
+        if remaining > 0:
+            for turn in self._relevant(older[:folded], query):
+                text = format_turns([turn])
+                if estimate_tokens(text) <= remaining:
+                    recalled.append(text)
+                    remaining -= estimate_tokens(text)
+        if recalled:
+            sections.append("Related earlier exchanges:\n" + "\n".join(recalled))
+
+        if not sections:
+            return "\n".join(kept)
+        if kept:
+            sections.append("Recent conversation:\n" + "\n".join(kept))
+        return "\n\n".join(sections)
+
+    def build(self, session_id: str, messages, query: str = "") -> str:
+        """Build the history text for the next prompt, updating the summary if due."""
+        older, recent = self._split(messages)
+        folded, summary = self._cached_summary(session_id, older)
+        for block in self._blocks(older, folded):
+            updated = self.llm_service.get_together_response(conversation_summary_prompt(summary, format_turns(block)))
+            if updated == ERROR_RESPONSE:
+                # Leave the rest unfolded and try again next turn
+                break
+            folded, summary = folded + len(block), updated
+            self._remember(session_id, folded, summary, older)
+        return self._assemble(summary, older, folded, recent, query)
+
+    async def abuild(self, session_id: str, messages, query: str = "") -> str:
+        """Async version of ``build``."""
+        older, recent = self._split(messages)
+        folded, summary = await run_io_bound(self._cached_summary, session_id, older)
+        for block in self._blocks(older, folded):
+            updated = await self.llm_service.aget_together_response(conversation_summary_prompt(summary, format_turns(block)))
+            if updated == ERROR_RESPONSE:
+                break
+            folded, summary = folded + len(block), updated
+            await run_io_bound(self._remember, session_id, folded, summary, older)
+        return await run_cpu_bound(self._assemble, summary, older, folded, recent, query)
@@ -0,0 +1,285 @@
+import json
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from backend.core.config import settings
+from backend.db.database import SessionLocal
+from backend.services.document_service import DocumentService
+
+# Job fields stored as integers; everything else is a string (or JSON for "result")
+COUNTER_FIELDS = ("pages_parsed", "chunks_embedded", "chunks_written")
+
+class InMemoryJobQueue:
+    """Job queue and status store living in this process."""
+
+    def __init__(self, max_finished_jobs: int = 1000):
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+
+    def create(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job["job_id"]] = dict(job)
+            self._trim()
+        self._queue.put(job["job_id"])
+
+    def _trim(self):
+        """Forget the oldest finished jobs so the status store stays bounded."""
+        finished = [job_id for job_id, job in self._jobs.items() if job["status"] in ("completed", "failed")]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def update(self, job_id: str, **fields) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields, updated_at=time.time())
+
+    def next_job(self, timeout: float = 1.0) -> Optional[str]:
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def ack(self, job_id: str) -> None:
+        """Nothing to do: jobs in this process don't outlive it."""
+
+    def requeue_stale(self, stale_after: float) -> int:
+        return 0
+
+class RedisJobQueue:
+    """Job queue and status store in Redis, shared by every worker process.
+
+    A job taken by a worker moves to a processing list until it is
+    acknowledged, so a worker that dies mid-job doesn't lose it; stale
+    entries are put back on the queue when a worker starts.
+    """
+
+    def __init__(self, client, prefix: str = "ingestion", job_ttl: int = 7 * 24 * 3600):
+        self.client = client
+        self.prefix = prefix
+        self.job_ttl = job_ttl
+
+    def _job_key(self, job_id: str) -> str:
+        return f"{self.prefix}:job:{job_id}"
+
+    def _encode(self, fields: Dict[str, Any]) -> Dict[str, str]:
+        return {
+            key: json.dumps(value) if key == "result" else ("" if value is None else str(value))
+            for key, value in fields.items()
+        }
+
+    def _decode(self, fields: Dict[str, str]) -> Dict[str, Any]:
+        job: Dict[str, Any] = dict(fields)
+        for key in COUNTER_FIELDS:
+            job[key] = int(job.get(key) or 0)
+        for key in ("created_at", "updated_at", "slowest_page_seconds"):
+            if job.get(key):
+                job[key] = float(job[key])
+        for key in ("user_id", "slowest_page"):
+            if job.get(key):
+                job[key] = int(job[key])
+        job["result"] = json.loads(job["result"]) if job.get("result") else None
+        job["error"] = job.get("error") or None
+        return job
+
+    def create(self, job: Dict[str, Any]) -> None:
+        key = self._job_key(job["job_id"])
+        pipeline = self.client.pipeline()
+        pipeline.hset(key, mapping=self._encode(job))
+        pipeline.expire(key, self.job_ttl)
+        pipeline.rpush(f"{self.prefix}:queue", job["job_id"])
+        pipeline.execute()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        fields = self.client.hgetall(self._job_key(job_id))
+        return self._decode(fields) if fields else None
+
+    def update(self, job_id: str, **fields) -> None:
+        self.client.hset(self._job_key(job_id), mapping=self._encode({**fields, "updated_at": time.time()}))
+
+    def next_job(self, timeout: float = 1.0) -> Optional[str]:
+        return self.client.blmove(f"{self.prefix}:queue", f"{self.prefix}:processing",
+                                  max(1, int(timeout)), "LEFT", "RIGHT")
+
+    def ack(self, job_id: str) -> None:
+        """Mark a job as done with, whatever its outcome."""
+        self.client.lrem(f"{self.prefix}:processing", 1, job_id)
+
+    def requeue_stale(self, stale_after: float) -> int:
+        """Put back jobs whose worker stopped updating them ``stale_after`` seconds ago."""
+        requeued = 0
+        cutoff = time.time() - stale_after
+        for job_id in self.client.lrange(f"{self.prefix}:processing", 0, -1):
+            job = self.get(job_id)
+            if job is not None and (job.get("updated_at") or 0) > cutoff:
+                continue
+            # Only the worker that removes the entry requeues it
+            if not self.client.lrem(f"{self.prefix}:processing", 1, job_id) or job is None:
+                continue
+            pipeline = self.client.pipeline()
+            pipeline.hset(self._job_key(job_id), mapping=self._encode({"status": "queued", "updated_at": time.time()}))
+            pipeline.rpush(f"{self.prefix}:queue", job_id)
+            pipeline.execute()
+            requeued += 1
+        return requeued
+
+def create_job_queue(backend: str = settings.INGESTION_QUEUE_BACKEND):
+    """Build the job queue selected by INGESTION_QUEUE_BACKEND."""
+    if backend == "redis":
+        from backend.core.registry import get_redis_client
+        return RedisJobQueue(get_redis_client())
+    return InMemoryJobQueue()
+
+class IngestionService:
+    """Background ingestion pipeline for uploaded PDFs and web articles.
+
+    Uploads are saved and registered immediately and a job ID is returned;
+    a fixed pool of worker threads parses, embeds and writes the documents,
+    reporting progress on the job record. Jobs left unfinished by a worker
+    that stopped are queued again on startup; writes skip chunks that are
+    already stored, so a rerun picks up where it left off.
+    """
+
+    def __init__(self, document_service: DocumentService, job_queue=None,
+                 workers: int = settings.INGESTION_WORKERS,
+                 session_factory: Callable[[], Session] = SessionLocal):
+        self.document_service = document_service
+        self.job_queue = job_queue or create_job_queue()
+        self.session_factory = session_factory
+        self._stop = threading.Event()
+        self._workers: List[threading.Thread] = []
+        try:
+            requeued = self.job_queue.requeue_stale(settings.INGESTION_JOB_STALE_SECONDS)
+            if requeued:
+                print(f"Requeued {requeued} unfinished ingestion jobs")
+        except Exception as e:
+            print(f"Error requeueing unfinished ingestion jobs: {e}")
+        self.start_workers(workers)
+
+    def start_workers(self, count: int) -> None:
+        """Start worker threads that consume jobs from the queue."""
+        for i in range(count):
+            worker = threading.Thread(target=self._worker_loop, name=f"ingestion-worker-{i}", daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def stop(self) -> None:
+        """Ask the workers to exit after their current job."""
+        self._stop.set()
+
+    def _new_job(self, job_type: str, document_id: str, user_id: int, source: str, title: str) -> Dict[str, Any]:
+        now = time.time()
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "type": job_type,
+            "status": "queued",
+            "document_id": document_id,
+            "user_id": user_id,
+            "source": source,
+            "title": title,
+            "pages_parsed": 0,
+            "chunks_embedded": 0,
+            "chunks_written": 0,
+            "error": None,
+            "result": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        self.job_queue.create(job)
+        return job
+
+    def submit_pdf(self, file: BinaryIO, filename: str, db: Session, user_id: int) -> Dict[str, Any]:
+        """Save an uploaded PDF and queue it for ingestion."""
+        document_id, file_path = self.document_service.save_uploaded_file(file, filename)
+        self.document_service.create_document_record(db, document_id, filename, file_path, "pdf", user_id)
+        job = self._new_job("pdf", document_id, user_id, file_path, filename)
+
+        return {
+            "message": f"PDF '{filename}' queued for processing.",
+            "job_id": job["job_id"],
+            "document_id": document_id,
+            "status": job["status"]
+        }
+
+    def submit_web_article(self, url: str, db: Session, user_id: int) -> Dict[str, Any]:
+        """Register a web article and queue it for ingestion."""
+        document_id = uuid.uuid4().hex[:8]
+        self.document_service.create_document_record(db, document_id, url, url, "web", user_id)
+        job = self._new_job("web", document_id, user_id, url, url)
+
+        return {
+            "message": "Web article queued for processing.",
+            "job_id": job["job_id"],
+            "document_id": document_id,
+            "status": job["status"]
+        }
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Get the status and progress of a job."""
+        return self.job_queue.get(job_id)
+
+    def _worker_loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                job_id = self.job_queue.next_job(timeout=1.0)
+            except Exception as e:
+                print(f"Error reading ingestion queue: {e}")
+                time.sleep(1.0)
+                continue
+            if job_id:
+                try:
+                    self.run_job(job_id)
+                finally:
+                    self.job_queue.ack(job_id)
+
+    def run_job(self, job_id: str) -> None:
+        """Process one queued job, recording progress and the outcome."""
+        job = self.job_queue.get(job_id)
+        if not job:
+            return
+
+        self.job_queue.update(job_id, status="running")
+
+        def progress(**counters):
+            self.job_queue.update(job_id, **counters)
+
+        vectordb_service = self.document_service.vectordb_service
+        db = self.session_factory()
+        try:
+            title = None
+            if job["type"] == "pdf":
+                chunk_count = vectordb_service.add_pdf(
+                    job["source"], job["document_id"], progress=progress, owner_id=job["user_id"]
+                )
+            else:
+                result = vectordb_service.add_web_article(
+                    job["source"], job["document_id"], progress=progress, owner_id=job["user_id"]
+                )
+                chunk_count = result["chunk_count"]
+                title = result["metadata"].get("title") or None
+
+            self.document_service.finalize_document(db, job["document_id"], chunk_count, title=title)
+            self.job_queue.update(
+                job_id,
+                status="completed",
+                result={"document_id": job["document_id"], "indexed_documents": chunk_count, "title": title or job["title"]}
+            )
+        except Exception as e:
+            print(f"Error processing ingestion job {job_id}: {e}")
+            self.job_queue.update(job_id, status="failed", error=str(e))
+            # Don't leave a half-indexed document behind
+            self.document_service.delete_document(db, job["document_id"])
+        finally:
+            db.close()
@@ -1,15 +1,24 @@
 import os
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, AsyncIterator, List, Optional
 import json
-
-from together import Together
-from groq import Groq
-from langchain_together import ChatTogether
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
-from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.outputs import ChatGeneration, ChatResult
+import re
 
 from backend.core.config import settings
+from backend.core.concurrency import (
+    groq_rate_limiter,
+    llm_executor,
+    llm_semaphore,
+    scatter_gather,
+    together_rate_limiter
+)
+from backend.core.registry import (
+    get_together_client,
+    get_groq_client,
+    get_async_together_client,
+    get_async_groq_client,
+    get_together_chat
+)
+from backend.utils.completion_cache import get_completion_cache
 from backend.llm.prompts import (
     construct_prompt,
     chat_prompt,
@@ -17,66 +26,200 @@ from backend.llm.prompts import (
     semantic_summary_prompt
 )
 
+# Returned in place of a completion when the provider call fails
+ERROR_RESPONSE = "Sorry, I encountered an error while processing your request."
+
 class LLMService:
     def __init__(self):
-        # Initialize API clients
-        self.together_client = Together(api_key=settings.TOGETHER_API_KEY)
-        self.groq_client = Groq(api_key=settings.GROQ_API_KEY)
-
-        # Initialize LangChain models
-        self.together_chat = ChatTogether(
-            model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-            temperature=0.5,
-            top_p=0.9,
-            together_api_key=settings.TOGETHER_API_KEY
-        )
+        # Shared API clients, built once per process
+        self.together_client = get_together_client()
+        self.groq_client = get_groq_client()
+
+        # Shared LangChain models
+        self.together_chat = get_together_chat()
+
+        # Exact-match cache of completions, shared across the process
+        self.completion_cache = get_completion_cache()
 
-    def get_together_response(self, prompt: str) -> str:
+    @property
+    def async_together_client(self):
+        """Shared async Together AI client, built on first use."""
+        return get_async_together_client()
+
+    @property
+    def async_groq_client(self):
+        """Shared async Groq client, built on first use."""
+        return get_async_groq_client()
+
+    def _together_params(self, prompt: str) -> Dict[str, Any]:
+        """Request parameters for Together AI's Llama model."""
+        return {
+            "model": settings.TOGETHER_MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": None,
+            "temperature": 0.5,
+            "top_p": 0.9,
+            "top_k": 40,
+            "repetition_penalty": 1.03,
+            "stop": ["<|end_of_sentence|>"],
+            "stream": False
+        }
+
+    def _groq_params(self, prompt: str) -> Dict[str, Any]:
+        """Request parameters for Groq's Mistral model."""
+        return {
+            "model": settings.GROQ_MODEL,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": 1,
+            "max_completion_tokens": 1024,
+            "top_p": 1,
+            "stream": False,
+            "stop": None,
+        }
+
+    def _cached_completion(self, provider: str, params: Dict[str, Any], use_cache: bool) -> Optional[str]:
+        """Return a cached completion for the request, if caching applies."""
+        if not use_cache or self.completion_cache is None:
+            return None
+        return self.completion_cache.get(provider, params)
+
+    def _store_completion(self, provider: str, params: Dict[str, Any], completion: str, use_cache: bool):
+        """Cache a successful completion."""
+        if use_cache and self.completion_cache is not None:
+            self.completion_cache.set(provider, params, completion)
+
+    def _evict_completion(self, provider: str, params: Dict[str, Any]):
+        """Drop a cached completion the caller couldn't use, so the next call asks again."""
+        if self.completion_cache is not None:
+            self.completion_cache.delete(provider, params)
+
+    def get_together_response(self, prompt: str, use_cache: bool = True) -> str:
         """Get a response from Together AI's Llama model."""
+        params = self._together_params(prompt)
+        cached = self._cached_completion("together", params, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            together_rate_limiter.acquire()
+            response = self.together_client.chat.completions.create(**params)
+            completion = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Error in Together LLM response: {e}")
+            return ERROR_RESPONSE
+
+        self._store_completion("together", params, completion, use_cache)
+        return completion
+
+    async def aget_together_response(self, prompt: str, use_cache: bool = True) -> str:
+        """Get a response from Together AI's Llama model without blocking the event loop."""
+        params = self._together_params(prompt)
+        cached = self._cached_completion("together", params, use_cache)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.together_client.chat.completions.create(
-                model="meta-llama/Llama-3.3-70B-Instruct-Turbo-Free",
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=None,
-                temperature=0.5,
-                top_p=0.9,
-                top_k=40,
-                repetition_penalty=1.03,
-                stop=["<|end_of_sentence|>"],
-                stream=False
-            )
-            return response.choices[0].message.content.strip()
+            async with llm_semaphore():
+                await together_rate_limiter.aacquire()
+                response = await self.async_together_client.chat.completions.create(**params)
+            completion = response.choices[0].message.content.strip()
         except Exception as e:
             print(f"Error in Together LLM response: {e}")
-            return "Sorry, I encountered an error while processing your request."
+            return ERROR_RESPONSE
 
-    def get_groq_response(self, prompt: str) -> str:
+        self._store_completion("together", params, completion, use_cache)
+        return completion
+
+    async def astream_together_response(self, prompt: str, use_cache: bool = True) -> AsyncIterator[str]:
+        """Stream a response from Together AI's Llama model as text deltas.
+
+        A cached completion is yielded in one piece. The full answer is cached
+        under the same key as the non-streaming call once the stream ends. If
+        the provider fails, the error is raised (possibly after some deltas)
+        and nothing is cached.
+        """
+        params = self._together_params(prompt)
+        cached = self._cached_completion("together", params, use_cache)
+        if cached is not None:
+            yield cached
+            return
+
+        parts = []
+        try:
+            async with llm_semaphore():
+                await together_rate_limiter.aacquire()
+                stream = await self.async_together_client.chat.completions.create(**{**params, "stream": True})
+                async for chunk in stream:
+                    delta = chunk.choices[0].delta.content if chunk.choices else None
+                    if delta:
+                        # Drop leading whitespace, as the non-streaming call strips it
+                        if not parts:
+                            delta = delta.lstrip()
+                            if not delta:
+                                continue
+                        parts.append(delta)
+                        yield delta
+        except Exception as e:
+            # Re-raise so callers can tell a truncated answer from a complete one
+            print(f"Error in Together LLM stream after {len(parts)} deltas: {e}")
+            raise
+
+        self._store_completion("together", params, "".join(parts).strip(), use_cache)
+
+    def get_groq_response(self, prompt: str, use_cache: bool = True) -> str:
         """Get a response from Groq's Mistral model."""
+        params = self._groq_params(prompt)
+        cached = self._cached_completion("groq", params, use_cache)
+        if cached is not None:
+            return cached
+
         try:
-            response = self.groq_client.chat.completions.create(
-                model="mistral-saba-24b",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=1,
-                max_completion_tokens=1024,
-                top_p=1,
-                stream=False,
-                stop=None,
-            )
-            return response.choices[0].message.content.strip()
+            groq_rate_limiter.acquire()
+            response = self.groq_client.chat.completions.create(**params)
+            completion = response.choices[0].message.content.strip()
         except Exception as e:
             print(f"Error in Groq LLM response: {e}")
-            return "Sorry, I encountered an error while processing your request."
+            return ERROR_RESPONSE
+
+        self._store_completion("groq", params, completion, use_cache)
+        return completion
+
+    async def aget_groq_response(self, prompt: str, use_cache: bool = True) -> str:
+        """Get a response from Groq's Mistral model without blocking the event loop."""
+        params = self._groq_params(prompt)
+        cached = self._cached_completion("groq", params, use_cache)
+        if cached is not None:
+            return cached
+
+        try:
+            async with llm_semaphore():
+                await groq_rate_limiter.aacquire()
+                response = await self.async_groq_client.chat.completions.create(**params)
+            completion = response.choices[0].message.content.strip()
+        except Exception as e:
+            print(f"Error in Groq LLM response: {e}")
+            return ERROR_RESPONSE
+
+        self._store_completion("groq", params, completion, use_cache)
+        return completion
 
     def generate_rag_response(self, query: str, context: str, previous_context: str = "") -> str:
         """Generate a RAG response using the Together AI model."""
         full_prompt = construct_prompt(query, context, previous_context)
         return self.get_together_response(full_prompt)
 
-    def generate_smart_highlight(self, text: str) -> Dict[str, Any]:
-        """Generate a smart highlight using the Groq model."""
-        prompt = smart_highlight_prompt.format(text=text)
-        response = self.get_groq_response(prompt)
+    async def agenerate_rag_response(self, query: str, context: str, previous_context: str = "") -> str:
+        """Generate a RAG response using the async Together AI client."""
+        full_prompt = construct_prompt(query, context, previous_context)
+        return await self.aget_together_response(full_prompt)
+
+    async def astream_rag_response(self, query: str, context: str, previous_context: str = "") -> AsyncIterator[str]:
+        """Stream a RAG response from the Together AI model as text deltas."""
+        full_prompt = construct_prompt(query, context, previous_context)
+        async for delta in self.astream_together_response(full_prompt):
+            yield delta
 
+    def _parse_smart_highlight(self, response: str) -> Dict[str, Any]:
         try:
             return json.loads(response)
         except json.JSONDecodeError:
@@ -86,11 +229,17 @@ class LLMService:
                 "short_note": "Failed to parse response"
             }
 
-    def generate_semantic_summary(self, highlights: List[str]) -> Dict[str, Any]:
-        """Generate a semantic summary using the Groq model."""
-        formatted_prompt = semantic_summary_prompt.format(highlights="\n".join(highlights))
-        response = self.get_groq_response(formatted_prompt)
+    def generate_smart_highlight(self, text: str) -> Dict[str, Any]:
+        """Generate a smart highlight using the Groq model."""
+        prompt = smart_highlight_prompt.format(text=text)
+        return self._parse_smart_highlight(self.get_groq_response(prompt))
 
+    async def agenerate_smart_highlight(self, text: str) -> Dict[str, Any]:
+        """Generate a smart highlight using the async Groq client."""
+        prompt = smart_highlight_prompt.format(text=text)
+        return self._parse_smart_highlight(await self.aget_groq_response(prompt))
+
+    def _parse_semantic_summary(self, response: str) -> Dict[str, Any]:
         try:
             return json.loads(response)
         except json.JSONDecodeError:
@@ -98,8 +247,32 @@ class LLMService:
                 "compressed_study_memory": "Failed to generate summary"
             }
 
-    def generate_study_guide(self, document_chunks: List[str]) -> Dict[str, Any]:
-        """Generate a study guide using the Together AI model."""
+    def generate_semantic_summary(self, highlights: List[str]) -> Dict[str, Any]:
+        """Generate a semantic summary using the Groq model."""
+        formatted_prompt = semantic_summary_prompt.format(highlights="\n".join(highlights))
+        return self._parse_semantic_summary(self.get_groq_response(formatted_prompt))
+
+    async def agenerate_semantic_summary(self, highlights: List[str]) -> Dict[str, Any]:
+        """Generate a semantic summary using the async Groq client."""
+        formatted_prompt = semantic_summary_prompt.format(highlights="\n".join(highlights))
+        return self._parse_semantic_summary(await self.aget_groq_response(formatted_prompt))
+
+    def _parse_json_list(self, response: str, fallback: str) -> List[str]:
+        """Parse a JSON array from a response, tolerating surrounding text."""
+        try:
+            return json.loads(response)
+        except json.JSONDecodeError:
+            try:
+                # Try to extract JSON from the response if it contains other text
+                json_match = re.search(r'\[.*\]', response, re.DOTALL)
+                if json_match:
+                    return json.loads(json_match.group(0))
+            except Exception:
+                pass
+            return [fallback]
+
+    def _study_guide_prompts(self, document_chunks: List[str]) -> Dict[str, str]:
+        """Build the study guide, key concepts and review questions prompts."""
         # Combine chunks into a single document, but limit to avoid token limits
         max_chunks = min(3, len(document_chunks))  # Limit to 3 chunks to avoid token limits
         document_text = "\n\n".join(document_chunks[:max_chunks])
@@ -107,8 +280,11 @@ class LLMService:
         # Further limit text to avoid token limits
         document_text = document_text[:3000]  # Limit to 3000 characters
 
-        # Create prompt
-        prompt = f"""
+        # Limit text to avoid token limits
+        limited_text = document_text[:2000]  # Further limit for key concepts/questions
+
+        return {
+            "study_guide": f"""
         You are an expert educator and study guide creator. Create a concise study guide based on this document excerpt:
 
         {document_text}
@@ -119,65 +295,101 @@ class LLMService:
         3. Review questions
 
         Format in Markdown with clear sections.
-        """
-
-        # Generate study guide
-        study_guide = self.get_together_response(prompt)
-
-        # Extract key concepts and review questions with shorter prompts
-        # Limit text to avoid token limits
-        limited_text = document_text[:2000]  # Further limit for key concepts/questions
-        key_concepts_prompt = f"""
+        """,
+            "key_concepts": f"""
         Based on this document excerpt, list 5 key concepts as a JSON array of strings:
 
         {limited_text}
 
         Return ONLY a valid JSON array of strings, nothing else.
-        """
-
-        review_questions_prompt = f"""
+        """,
+            "review_questions": f"""
         Based on this document excerpt, create 5 review questions as a JSON array of strings:
 
         {limited_text}
 
         Return ONLY a valid JSON array of strings, nothing else.
-        """
+        """,
+            "structured": f"""
+        You are an expert educator and study guide creator. Based on this document excerpt:
 
-        # Get key concepts and review questions
-        key_concepts_response = self.get_together_response(key_concepts_prompt)
-        review_questions_response = self.get_together_response(review_questions_prompt)
+        {document_text}
 
-        # Parse responses
-        try:
-            key_concepts = json.loads(key_concepts_response)
-        except json.JSONDecodeError:
-            try:
-                # Try to extract JSON from the response if it contains other text
-                import re
-                json_match = re.search(r'\[.*\]', key_concepts_response, re.DOTALL)
-                if json_match:
-                    key_concepts = json.loads(json_match.group(0))
-                else:
-                    key_concepts = ["Failed to extract key concepts"]
-            except:
-                key_concepts = ["Failed to extract key concepts"]
+        Return ONLY a valid JSON object with these keys, nothing else:
+        "study_guide": a concise study guide in Markdown with a brief summary, key concepts and review questions sections,
+        "key_concepts": a JSON array of 5 key concepts as strings,
+        "review_questions": a JSON array of 5 review questions as strings.
+        """
+        }
 
+    def _generate_structured_study_guide(self, prompt: str, use_cache: bool = True) -> Optional[Dict[str, Any]]:
+        """Generate all study guide sections in one JSON completion, or None if it can't be parsed."""
+        response = self.get_together_response(prompt, use_cache=use_cache)
         try:
-            review_questions = json.loads(review_questions_response)
+            json_match = re.search(r'\{.*\}', response, re.DOTALL)
+            result = json.loads(json_match.group(0)) if json_match else None
         except json.JSONDecodeError:
-            try:
-                # Try to extract JSON from the response if it contains other text
-                import re
-                json_match = re.search(r'\[.*\]', review_questions_response, re.DOTALL)
-                if json_match:
-                    review_questions = json.loads(json_match.group(0))
-                else:
-                    review_questions = ["Failed to extract review questions"]
-            except:
-                review_questions = ["Failed to extract review questions"]
+            result = None
+
+        if (not isinstance(result, dict) or not isinstance(result.get("study_guide"), str)
+                or not isinstance(result.get("key_concepts"), list)
+                or not isinstance(result.get("review_questions"), list)):
+            print("Structured study guide response could not be parsed, falling back to separate calls")
+            # Don't replay the bad response; the next request retries the structured prompt
+            self._evict_completion("together", self._together_params(prompt))
+            return None
 
         return {
-            "study_guide": study_guide,
-            "key_concepts": key_concepts,
-            "review_questions": review_questions
+            "study_guide": result["study_guide"],
+            "key_concepts": [str(concept) for concept in result["key_concepts"]],
+            "review_questions": [str(question) for question in result["review_questions"]],
+            "errors": []
+        }
+
+    def generate_study_guide(self, document_chunks: List[str], structured: Optional[bool] = None,
+                             timeout: Optional[float] = None, use_cache: bool = True) -> Dict[str, Any]:
+        """Generate a study guide using the Together AI model.
+
+        By default the guide, key concepts and review questions are requested
+        concurrently; sections that fail or miss the ``timeout`` get a
+        placeholder instead of failing the whole guide and are listed in
+        ``errors``. With ``structured``,
+        all three come from a single JSON completion. ``use_cache=False``
+        bypasses the completion cache, e.g. to regenerate.
+        """
+        prompts = self._study_guide_prompts(document_chunks)
+        structured = settings.STUDY_GUIDE_STRUCTURED if structured is None else structured
+        timeout = settings.LLM_CALL_TIMEOUT if timeout is None else timeout
+
+        if structured:
+            result = self._generate_structured_study_guide(prompts["structured"], use_cache=use_cache)
+            if result is not None:
+                return result
+
+        # The three prompts are independent, so issue them at once
+        sections = ["study_guide", "key_concepts", "review_questions"]
+        responses, failed = scatter_gather(
+            lambda section: (section, self.get_together_response(prompts[section], use_cache=use_cache)),
+            sections,
+            timeout=timeout,
+            executor=llm_executor
+        )
+        # Provider errors come back as ERROR_RESPONSE rather than raising
+        responses = {section: response for section, response in responses if response != ERROR_RESPONSE}
+        missing = [section for section in sections if section not in responses]
+        if missing:
+            print(f"Study guide returned partial results: missing {missing}")
+
+        fallbacks = {
+            "key_concepts": "Failed to extract key concepts",
+            "review_questions": "Failed to extract review questions"
         }
+        result = {"study_guide": responses.get("study_guide", "Failed to generate study guide.")}
+        for section, fallback in fallbacks.items():
+            result[section] = self._parse_json_list(responses.get(section, ""), fallback)
+        # A list that fell back to its placeholder failed too
+        result["errors"] = missing + [
+            section for section, fallback in fallbacks.items()
+            if section not in missing and result[section] == [fallback]
+        ]
+        return result
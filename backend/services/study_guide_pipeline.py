@@ -0,0 +1,156 @@
+import operator
+import re
+from typing import Annotated, Any, Callable, Dict, List, Optional, TypedDict
+
+from backend.core.config import settings
+from backend.core.concurrency import llm_executor, scatter_gather
+from backend.llm.prompts import (
+    chunk_summary_prompt,
+    concept_prompt,
+    review_question_prompt,
+    analogy_prompt,
+    faq_prompt,
+    integrative_guide_prompt
+)
+from backend.services.llm_service import ERROR_RESPONSE
+
+class GuideState(TypedDict):
+    chunks: List[str]
+    summary: str
+    concept: str
+    question: str
+    analogy: str
+    faq: str
+    study_guide: str
+    use_cache: bool
+    # Sections that failed; the reducer lets parallel nodes append to it
+    errors: Annotated[List[str], operator.add]
+
+# Sections built from the combined summary. They only read the summary, so
+# they run in parallel between summarization and the final guide.
+SECTION_NODES: Dict[str, Callable[[str], str]] = {
+    "concept": concept_prompt,
+    "question": review_question_prompt,
+    "analogy": analogy_prompt,
+    "faq": faq_prompt,
+}
+
+def list_items(text: str, questions: bool = False, limit: int = 10) -> List[str]:
+    """Pull headings (or questions) out of a Markdown section as plain strings."""
+    items = []
+    for line in text.splitlines():
+        line = line.strip()
+        item = re.sub(r"^(#+|[-*]|\d+[.)])\s*", "", line).strip("*: ").strip()
+        if questions:
+            if not item.endswith("?"):
+                continue
+        elif not (line.startswith("#") or (line.startswith("**") and line.endswith("**"))):
+            continue
+        if item and item not in items:
+            items.append(item)
+        if len(items) >= limit:
+            break
+    return items
+
+class StudyGuidePipeline:
+    """Full-document study guide workflow as a LangGraph graph.
+
+    Chunks are summarized concurrently on the LLM pool, then the concept,
+    review question, analogy and FAQ nodes run in parallel on the combined
+    summary before the integrative guide node merges them. If no chunk
+    could be summarized the run stops there and reports the failure. Calls go through
+    ``LLMService``, so they share its completion cache and rate limits.
+    """
+
+    def __init__(self, llm_service, timeout: Optional[float] = None):
+        self.llm_service = llm_service
+        self.timeout = settings.STUDY_GUIDE_TIMEOUT if timeout is None else timeout
+        self._graph = None
+
+    def summarize_chunks(self, chunks: List[str], use_cache: bool = True) -> List[str]:
+        """Summarize chunks concurrently, keeping document order and skipping failures."""
+        results, _ = scatter_gather(
+            lambda item: (item[0], self.llm_service.get_together_response(chunk_summary_prompt(item[1]),
+                                                                          use_cache=use_cache)),
+            enumerate(chunks),
+            timeout=self.timeout,
+            executor=llm_executor
+        )
+        # Provider errors come back as ERROR_RESPONSE rather than raising
+        summaries = [summary for _, summary in sorted(results) if summary != ERROR_RESPONSE]
+        if len(summaries) < len(chunks):
+            print(f"Study guide pipeline skipped {len(chunks) - len(summaries)} of {len(chunks)} chunk summaries")
+        return summaries
+
+    def _summarize_node(self, state: GuideState) -> Dict[str, Any]:
+        summaries = self.summarize_chunks(state["chunks"], use_cache=state.get("use_cache", True))
+        if not summaries:
+            # Nothing to build the sections from, so the run ends here
+            update = {section: "" for section in SECTION_NODES}
+            update.update({"summary": "", "study_guide": "Failed to generate study guide.", "errors": ["summary"]})
+            return update
+        update = {"summary": "\n".join(summaries)}
+        if len(summaries) < len(state["chunks"]):
+            update["errors"] = ["summary"]
+        return update
+
+    def _route_summary(self, state: GuideState) -> str:
+        return "sections" if state["summary"] else "failed"
+
+    def _section_node(self, section: str) -> Callable[[GuideState], Dict[str, Any]]:
+        prompt = SECTION_NODES[section]
+
+        def node(state: GuideState) -> Dict[str, Any]:
+            # Return only this node's keys so parallel updates don't collide
+            try:
+                response = self.llm_service.get_together_response(prompt(state["summary"]),
+                                                                  use_cache=state.get("use_cache", True))
+            except Exception as e:
+                print(f"Error in study guide {section} node: {e}")
+                response = ERROR_RESPONSE
+            if response == ERROR_RESPONSE:
+                return {section: "", "errors": [section]}
+            return {section: response}
+
+        return node
+
+    def _integrative_node(self, state: GuideState) -> Dict[str, Any]:
+        prompt = integrative_guide_prompt(state["concept"], state["question"], state["analogy"], state["faq"])
+        response = self.llm_service.get_together_response(prompt, use_cache=state.get("use_cache", True))
+        if response == ERROR_RESPONSE:
+            return {"study_guide": response, "errors": ["study_guide"]}
+        return {"study_guide": response}
+
+    @property
+    def graph(self):
+        """The compiled workflow, built on first use."""
+        if self._graph is None:
+            from langgraph.graph import END, StateGraph
+
+            builder = StateGraph(GuideState)
+            builder.add_node("summarize_chunks_node", self._summarize_node)
+            # Fans out to the sections; a branch can only lead to one node
+            builder.add_node("sections_node", lambda state: {})
+            builder.add_node("build_study_guide_node", self._integrative_node)
+            builder.set_entry_point("summarize_chunks_node")
+            builder.add_conditional_edges("summarize_chunks_node", self._route_summary,
+                                          {"sections": "sections_node", "failed": END})
+            for section in SECTION_NODES:
+                builder.add_node(f"{section}_node", self._section_node(section))
+                builder.add_edge("sections_node", f"{section}_node")
+                builder.add_edge(f"{section}_node", "build_study_guide_node")
+            builder.set_finish_point("build_study_guide_node")
+            self._graph = builder.compile()
+        return self._graph
+
+    def run(self, chunks: List[str], use_cache: bool = True) -> Dict[str, Any]:
+        """Run the workflow over document chunks and return every section.
+
+        ``errors`` lists the sections that failed, if any.
+
+        ``use_cache=False`` bypasses the completion cache, e.g. to regenerate.
+        """
+        return self.graph.invoke(
+            {"chunks": chunks, "errors": [], "use_cache": use_cache},
+            config={"max_concurrency": len(SECTION_NODES)}
+        )
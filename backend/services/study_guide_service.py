@@ -1,15 +1,28 @@
 from typing import Dict, Any, List, Optional
+from sqlalchemy.orm import Session
 
+from backend.core.config import settings
 from backend.services.vectordb_service import VectorDBService
 from backend.services.llm_service import LLMService
+from backend.services.artifact_service import ArtifactService
+from backend.services.study_guide_pipeline import StudyGuidePipeline, list_items
 
 class StudyGuideService:
     def __init__(self):
         self.vectordb_service = VectorDBService()
         self.llm_service = LLMService()
+        self.pipeline = StudyGuidePipeline(self.llm_service)
+        self.artifact_service = ArtifactService()
 
-    def generate_study_guide(self, document_id: str, format: str = "markdown") -> Dict[str, Any]:
-        """Generate a study guide for a document."""
+    def generate_study_guide(self, document_id: str, format: str = "markdown", mode: str = "quick",
+                             db: Optional[Session] = None, force: bool = False) -> Dict[str, Any]:
+        """Generate a study guide for a document.
+
+        ``quick`` builds the guide from the first chunks in one round of calls;
+        ``full`` runs the study guide workflow over up to STUDY_GUIDE_MAX_CHUNKS chunks.
+        With a database session the guide is stored and reused until its
+        inputs change; ``force`` regenerates it anyway.
+        """
         # Get document chunks
         chunks = self.vectordb_service.get_documents(document_id)
 
@@ -21,6 +34,14 @@ class StudyGuideService:
                 "review_questions": []
             }
 
+        if mode == "full":
+            chunks = chunks[:settings.STUDY_GUIDE_MAX_CHUNKS]
+            return self.artifact_service.get_or_generate(
+                db, document_id, "study_guide_full", chunks,
+                lambda: self._generate_full_study_guide(document_id, chunks, use_cache=not force),
+                force=force
+            )
+
         # Limit the number of chunks to process
         max_chunks = min(2, len(chunks))  # Process at most 2 chunks
         limited_chunks = chunks[:max_chunks]
@@ -29,11 +50,40 @@ class StudyGuideService:
         limited_chunks = [chunk[:2000] for chunk in limited_chunks]  # Limit each chunk to 2000 characters
 
         # Generate study guide directly
-        result = self.llm_service.generate_study_guide(limited_chunks)
+        return self.artifact_service.get_or_generate(
+            db, document_id, "study_guide", limited_chunks,
+            lambda: self._generate_quick_study_guide(document_id, limited_chunks, use_cache=not force),
+            variant="structured" if settings.STUDY_GUIDE_STRUCTURED else "",
+            force=force
+        )
+
+    def _generate_quick_study_guide(self, document_id: str, chunks: List[str], use_cache: bool = True) -> Dict[str, Any]:
+        """Generate a study guide, key concepts and review questions from the first chunks."""
+        result = self.llm_service.generate_study_guide(chunks, use_cache=use_cache)
 
         return {
             "document_id": document_id,
             "study_guide": result["study_guide"],
             "key_concepts": result["key_concepts"],
-            "review_questions": result["review_questions"]
+            "review_questions": result["review_questions"],
+            "errors": result.get("errors", [])
+        }
+
+    def _generate_full_study_guide(self, document_id: str, chunks: List[str], use_cache: bool = True) -> Dict[str, Any]:
+        """Generate a study guide with concepts, questions, analogies and FAQs from the workflow."""
+        result = self.pipeline.run(chunks, use_cache=use_cache)
+
+        return {
+            "document_id": document_id,
+            "study_guide": result["study_guide"],
+            "key_concepts": list_items(result["concept"]),
+            "review_questions": list_items(result["question"], questions=True),
+            "sections": {
+                "summary": result["summary"],
+                "concepts": result["concept"],
+                "review_questions": result["question"],
+                "analogies": result["analogy"],
+                "faqs": result["faq"]
+            },
+            "errors": result.get("errors", [])
         }
@@ -0,0 +1,104 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.core.concurrency import llm_executor, scatter_gather
+from backend.llm.prompts import section_summary_prompt, document_summary_prompt
+from backend.services.llm_service import ERROR_RESPONSE
+
+class MapReduceSummarizer:
+    """Hierarchical map-reduce summarizer that covers the whole document.
+
+    Chunks are packed into groups of about ``group_chars`` characters and
+    each group is summarized concurrently on the LLM pool. The summaries are
+    grouped and summarized again, level by level, until they fit in
+    ``context_chars``; a final reduce then writes the summary at the
+    requested length. Map prompts don't depend on ``max_length``, so the
+    completion cache in ``LLMService`` keeps every level and a new length
+    only re-runs the final reduce.
+    """
+
+    def __init__(self, llm_service, group_chars: Optional[int] = None, context_chars: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.llm_service = llm_service
+        self.group_chars = group_chars or settings.SUMMARY_GROUP_CHARS
+        self.context_chars = context_chars or settings.SUMMARY_CONTEXT_CHARS
+        # Per call; a level's deadline scales with its number of groups
+        self.timeout = settings.LLM_CALL_TIMEOUT if timeout is None else timeout
+
+    def group(self, texts: List[str]) -> List[str]:
+        """Pack consecutive texts into groups of at most ``group_chars`` characters."""
+        groups, current, size = [], [], 0
+        for text in texts:
+            text = text[:self.group_chars]
+            if current and size + len(text) > self.group_chars:
+                groups.append("\n\n".join(current))
+                current, size = [], 0
+            current.append(text)
+            size += len(text) + 2
+        if current:
+            groups.append("\n\n".join(current))
+        return groups
+
+    def level_timeout(self, groups: int) -> float:
+        """Deadline for a level: enough rounds of calls on the LLM pool, plus rate-limit waits."""
+        rounds = math.ceil(groups / settings.LLM_MAX_CONCURRENCY)
+        timeout = self.timeout * rounds
+        # A rate of 0 means no limit, so no waits to allow for
+        if settings.TOGETHER_REQUESTS_PER_MINUTE > 0:
+            timeout += groups * 60.0 / settings.TOGETHER_REQUESTS_PER_MINUTE
+        return timeout
+
+    def summarize_level(self, texts: List[str], use_cache: bool = True) -> Tuple[List[str], List[int]]:
+        """Summarize one level of groups concurrently, in document order.
+
+        Returns the summaries and the indexes of the groups that failed.
+        """
+        groups = self.group(texts)
+        results, _ = scatter_gather(
+            lambda item: (item[0], self.llm_service.get_together_response(section_summary_prompt(item[1]), use_cache=use_cache)),
+            enumerate(groups),
+            timeout=self.level_timeout(len(groups)),
+            executor=llm_executor
+        )
+        # Provider errors come back as ERROR_RESPONSE rather than raising
+        summaries = {i: summary for i, summary in results if summary != ERROR_RESPONSE}
+        failed = [i for i in range(len(groups)) if i not in summaries]
+        if failed:
+            print(f"Summarization kept the start of {len(failed)} of {len(groups)} sections that failed to summarize")
+
+        # Keep the start of a failed section rather than dropping it from the summary
+        return [summaries.get(i, groups[i][:self.group_chars // 8]) for i in range(len(groups))], failed
+
+    def reduce_levels(self, chunks: List[str], use_cache: bool = True) -> Tuple[List[str], List[str]]:
+        """Summarize level by level until the texts fit the final reduce's context.
+
+        Returns the texts and the sections that failed to summarize.
+        """
+        texts = [chunk for chunk in chunks if chunk.strip()]
+        errors = []
+        level = 0
+        while sum(len(text) for text in texts) > self.context_chars:
+            previous = len(texts)
+            texts, failed = self.summarize_level(texts, use_cache=use_cache)
+            level += 1
+            errors.extend(f"level {level} section {i}" for i in failed)
+            print(f"Summarization level {level}: {previous} texts -> {len(texts)} summaries")
+            # Stop once a level can't shrink any further; the final reduce truncates
+            if len(texts) == 1 or len(texts) >= previous:
+                break
+        return texts, errors
+
+    def summarize(self, chunks: List[str], max_length: int = 500, use_cache: bool = True) -> Dict[str, Any]:
+        """Summarize a whole document from its chunks; ``use_cache=False`` bypasses the completion cache.
+
+        Returns the ``summary`` and the ``errors`` (sections that failed), so a
+        degraded summary can be told apart from a complete one.
+        """
+        texts, errors = self.reduce_levels(chunks, use_cache=use_cache)
+        document_text = "\n\n".join(texts)[:self.context_chars]
+        summary = self.llm_service.get_together_response(document_summary_prompt(document_text, max_length),
+                                                         use_cache=use_cache)
+        if summary == ERROR_RESPONSE:
+            errors.append("summary")
+        return {"summary": summary, "errors": errors}
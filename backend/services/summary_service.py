@@ -1,15 +1,25 @@
 from typing import Dict, Any, List, Optional
+from sqlalchemy.orm import Session
 
 from backend.services.vectordb_service import VectorDBService
 from backend.services.llm_service import LLMService
+from backend.services.artifact_service import ArtifactService
+from backend.services.summarizer import MapReduceSummarizer
 
 class SummaryService:
     def __init__(self):
         self.vectordb_service = VectorDBService()
         self.llm_service = LLMService()
+        self.summarizer = MapReduceSummarizer(self.llm_service)
+        self.artifact_service = ArtifactService()
 
-    def generate_document_summary(self, document_id: str, max_length: Optional[int] = 500) -> Dict[str, Any]:
-        """Generate a summary for a document."""
+    def generate_document_summary(self, document_id: str, max_length: Optional[int] = 500,
+                                  db: Optional[Session] = None, force: bool = False) -> Dict[str, Any]:
+        """Generate a summary for a document.
+
+        With a database session the summary is stored and reused until the
+        document changes; ``force`` regenerates it anyway.
+        """
         # Get document chunks
         chunks = self.vectordb_service.get_documents(document_id)
 
@@ -19,25 +29,15 @@ class SummaryService:
                 "summary": "No document content found."
             }
 
-        # Limit the number of chunks to process
-        max_chunks = min(3, len(chunks))  # Process at most 3 chunks
-        chunks = chunks[:max_chunks]
-
-        # Limit the size of each chunk
-        limited_chunks = [chunk[:3000] for chunk in chunks]  # Limit each chunk to 3000 characters
-        document_text = "\n\n".join(limited_chunks)
-
-        # Create prompt
-        prompt = f"""
-        You are an expert summarizer. Create a concise summary of this document excerpt:
-
-        {document_text}
-
-        Capture the key points and main ideas. Keep the summary under {max_length} words.
-        """
-
-        # Generate summary
-        summary = self.llm_service.get_together_response(prompt)
+        # Summarize the whole document, level by level
+        max_length = max_length or 500
+        summary = self.artifact_service.get_or_generate(
+            db, document_id, "summary", chunks,
+            # Forcing must reach the model, not replay cached completions
+            lambda: self.summarizer.summarize(chunks, max_length=max_length, use_cache=not force),
+            variant=f"max_length={max_length}",
+            force=force
+        )["summary"]
 
         return {
             "document_id": document_id,
@@ -47,3 +47,7 @@ class SummaryService:
     def generate_semantic_summary(self, highlights: List[str]) -> Dict[str, Any]:
         """Generate a semantic summary from highlights."""
         return self.llm_service.generate_semantic_summary(highlights)
+
+    async def agenerate_semantic_summary(self, highlights: List[str]) -> Dict[str, Any]:
+        """Generate a semantic summary from highlights using the async LLM client."""
+        return await self.llm_service.agenerate_semantic_summary(highlights)
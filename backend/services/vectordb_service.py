@@ -1,20 +1,115 @@
-import chromadb
-from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
-from typing import List, Dict, Any, Tuple, Optional
+import hashlib
+import heapq
+from itertools import islice
+from typing import List, Dict, Any, Tuple, Optional, Callable, Iterator
 from tqdm import tqdm
 
 from backend.utils.embeddings import Embedder
 from backend.core.config import settings
+from backend.core.concurrency import scatter_gather
+from backend.core.registry import get_collection_cache, get_corpus_index, get_embedder, get_vector_client
+from backend.utils.corpus_index import reciprocal_rank_fusion
+
+# Collection name (or shard prefix) used by the shared and sharded layouts
+SHARED_COLLECTION = "chunks"
+
+def shard_for(document_id: str, shards: int) -> int:
+    """Stable shard number for a document."""
+    return int(hashlib.md5(document_id.encode("utf-8")).hexdigest(), 16) % shards
 
 class VectorDBService:
-    def __init__(self, persist_dir: Optional[str] = None):
+    def __init__(self, persist_dir: Optional[str] = None, layout: Optional[str] = None, shards: Optional[int] = None):
         self.persist_dir = persist_dir or settings.VECTORDB_PATH
-        self.client = chromadb.PersistentClient(path=self.persist_dir)
-        self.embedder = Embedder()
+        # per_document: one collection per document; shared: one collection for every chunk;
+        # sharded: chunks spread over VECTORDB_SHARDS collections by document ID
+        self.layout = layout or settings.VECTORDB_LAYOUT
+        self.shards = max(1, shards or settings.VECTORDB_SHARDS)
+        # The embedding model and Chroma client are shared by every service in the process
+        self.client = get_vector_client(self.persist_dir)
+        self.embedder: Embedder = get_embedder()
+        # Corpus-wide term statistics, so keyword scores are comparable across documents
+        self.corpus_index = get_corpus_index(self.persist_dir)
+        # Collection handles, counts and the collection list, so a query doesn't pay for them every time
+        self.collection_cache = get_collection_cache(self.persist_dir)
+    
+    def _collection_name(self, document_id: str) -> str:
+        """Name of the collection holding a document's chunks under the configured layout."""
+        if self.layout == "shared":
+            return SHARED_COLLECTION
+        if self.layout == "sharded":
+            return f"{SHARED_COLLECTION}_{shard_for(document_id, self.shards)}"
+        return f"doc_{document_id}"
     
     def _get_collection(self, document_id: str):
         """Get a collection by document ID."""
-        return self.client.get_collection(f"doc_{document_id}")
+        return self.collection_cache.get_collection(self.client, self._collection_name(document_id))
+    
+    def _where(self, document_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Metadata filter selecting a document's chunks, if its collection holds other documents too."""
+        if document_id and self.layout != "per_document":
+            return {"document_id": document_id}
+        return None
+    
+    def _search_targets(self, document_id: Optional[str] = None) -> List[Tuple[str, Any, Optional[Dict[str, Any]]]]:
+        """Collections to search, as (label, collection, metadata filter), for one document or the whole library."""
+        if document_id:
+            return [(document_id, self._get_collection(document_id), self._where(document_id))]
+        
+        existing = self.collection_cache.list_names(self.client)
+        if self.layout == "per_document":
+            return [(name.replace("doc_", ""), self.collection_cache.get_collection(self.client, name), None)
+                    for name in existing if name.startswith("doc_")]
+        
+        names = [SHARED_COLLECTION] if self.layout == "shared" else [
+            f"{SHARED_COLLECTION}_{shard}" for shard in range(self.shards)
+        ]
+        return [(name, self.collection_cache.get_collection(self.client, name), None)
+                for name in names if name in existing]
+    
+    def _vector_search(self, collection, where: Optional[Dict[str, Any]], query_embedding: List[float],
+                       top_k: int) -> Optional[Dict[str, Any]]:
+        """Run one top-k similarity search, or return None if the collection is empty."""
+        available_chunks = self.collection_cache.count(collection)
+        if available_chunks == 0:
+            return None
+        
+        kwargs = {"where": where} if where else {}
+        return collection.query(
+            query_embeddings=[query_embedding],
+            n_results=min(top_k, available_chunks),
+            **kwargs
+        )
+    
+    def _gather_vector_hits(self, targets: List[Tuple[str, Any, Optional[Dict[str, Any]]]], query_embedding: List[float],
+                            top_k: int, timeout: Optional[float] = None) -> Iterator[Tuple[float, str, str, Dict[str, Any]]]:
+        """Search the targets concurrently and merge their hits into one ranking by distance.
+
+        Each collection contributes its own top-k; the merge is a lazy k-way heap
+        merge, so taking the first ``top_k`` items gives the true global top-k.
+        Collections that miss the ``timeout`` deadline are left out.
+        """
+        def search(target) -> List[Tuple[float, str, str, Dict[str, Any]]]:
+            label, collection, where = target
+            res = self._vector_search(collection, where, query_embedding, top_k)
+            if res is None or "documents" not in res:
+                print(f"⚠️ Skipping '{label}' — No chunks available.")
+                return []
+            ids = res["ids"][0]
+            distances = (res.get("distances") or [list(range(len(ids)))])[0]
+            return list(zip(distances, ids, res["documents"][0], res["metadatas"][0]))
+        
+        if len(targets) == 1:
+            per_target = [search(targets[0])]
+        else:
+            timeout = settings.VECTORDB_QUERY_TIMEOUT if timeout is None else timeout
+            per_target, _ = scatter_gather(search, targets, timeout)
+        return heapq.merge(*per_target, key=lambda hit: hit[0])
+    
+    def _document_count(self, collection, document_id: str) -> int:
+        """Number of chunks stored for a document."""
+        if self.layout == "per_document":
+            return collection.count()
+        return len(collection.get(where={"document_id": document_id}, include=[])["ids"])
     
     def _sanitize_metadata(self, metadata_list: List[Dict[str, Any]]):
         """Convert list values in metadata to comma-separated strings."""
@@ -23,74 +118,103 @@ class VectorDBService:
                 if isinstance(value, list):
                     meta[key] = ", ".join(value)
     
-    def add_document(self, document_id: str, chunks: List[Dict[str, Any]]) -> int:
-        """Add document chunks to the vector database."""
+    def _content_hash(self, text: str) -> str:
+        """Hash chunk text so re-ingestion can detect unchanged chunks."""
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()
+    
+    def _existing_hashes(self, collection, ids: List[str]) -> Dict[str, Optional[str]]:
+        """Resolve which of the given chunk IDs are already stored, in a single lookup."""
+        existing = collection.get(ids=ids, include=["metadatas"])
+        return {
+            chunk_id: (metadata or {}).get("content_hash")
+            for chunk_id, metadata in zip(existing.get("ids") or [], existing.get("metadatas") or [])
+        }
+    
+    def add_document(self, document_id: str, chunks: List[Dict[str, Any]], batch_size: Optional[int] = None,
+                     progress: Optional[Callable[..., None]] = None, start_index: int = 0,
+                     owner_id: Optional[int] = None) -> int:
+        """Add document chunks to the vector database.
+
+        Re-ingestion is idempotent: chunks that are already stored with the same
+        content are skipped, changed chunks are upserted, and only the rest is written.
+        ``start_index`` is the position of the first chunk, for documents written
+        in several windows. Every chunk carries ``document_id``, ``chunk_index``
+        and (if given) ``owner_id`` metadata for filtering.
+        """
         # Create or get collection
-        collection_name = f"doc_{document_id}"
-        collection = self.client.get_or_create_collection(name=collection_name)
+        collection = self.client.get_or_create_collection(name=self._collection_name(document_id))
         
-        # Process chunks in batches
-        batch_size = 16
-        batch_docs, batch_ids, batch_embeddings, batch_metadata = [], [], [], []
+        if not chunks:
+            return self._document_count(collection, document_id)
         
-        for i, chunk in tqdm(enumerate(chunks), total=len(chunks), desc="Embedding Chunks"):
-            doc_id = f"{document_id}_chunk_{i}"
-            
-            # Skip if already exists
-            existing = collection.get(ids=[doc_id])
-            if existing and existing["ids"]:
-                continue
-            
-            # Extract data
-            text = chunk["text"]
-            embedding = chunk["embedding"]
-            keywords = chunk.get("keywords", [])
-            
-            # Add to batch
-            batch_docs.append(text)
-            batch_ids.append(doc_id)
-            batch_embeddings.append(embedding)
-            batch_metadata.append({"keywords": keywords})
-            
-            # Process batch if full
-            if len(batch_docs) >= batch_size:
+        ids = [f"{document_id}_chunk_{start_index + i}" for i in range(len(chunks))]
+        hashes = [self._content_hash(chunk["text"]) for chunk in chunks]
+        
+        # One existence query for the whole document instead of one per chunk
+        existing = self._existing_hashes(collection, ids)
+        missing = [i for i, chunk_id in enumerate(ids) if chunk_id not in existing]
+        changed = [i for i, chunk_id in enumerate(ids) if chunk_id in existing and existing[chunk_id] != hashes[i]]
+        
+        # Unchanged chunks count as already written
+        written = start_index + len(chunks) - len(missing) - len(changed)
+        
+        # Update corpus statistics incrementally and score keywords against the whole library
+        to_index = missing + changed
+        term_counts = self.corpus_index.add_chunks(document_id, [(ids[i], chunks[i]["text"]) for i in to_index])
+        keywords = dict(zip(to_index, self.corpus_index.keywords(term_counts)))
+        
+        batch_size = batch_size or settings.VECTORDB_WRITE_BATCH_SIZE
+        for indices, write in ((missing, collection.add), (changed, collection.upsert)):
+            for start in tqdm(range(0, len(indices), batch_size), desc="Writing Chunks", disable=not indices):
+                batch = indices[start:start + batch_size]
+                batch_metadata = [
+                    {
+                        "keywords": keywords[i],
+                        "content_hash": hashes[i],
+                        "document_id": document_id,
+                        "chunk_index": start_index + i,
+                        **({"owner_id": owner_id} if owner_id is not None else {})
+                    }
+                    for i in batch
+                ]
                 self._sanitize_metadata(batch_metadata)
-                collection.add(
-                    ids=batch_ids,
-                    embeddings=batch_embeddings,
-                    documents=batch_docs,
+                write(
+                    ids=[ids[i] for i in batch],
+                    embeddings=[chunks[i]["embedding"] for i in batch],
+                    documents=[chunks[i]["text"] for i in batch],
                     metadatas=batch_metadata
                 )
-                batch_docs, batch_ids, batch_embeddings, batch_metadata = [], [], [], []
-        
-        # Process remaining documents
-        if batch_docs:
-            self._sanitize_metadata(batch_metadata)
-            collection.add(
-                ids=batch_ids,
-                embeddings=batch_embeddings,
-                documents=batch_docs,
-                metadatas=batch_metadata
-            )
+                written += len(batch)
+                if progress:
+                    progress(chunks_written=written)
         
-        # Return the number of chunks added
-        return collection.count()
+        # Return the number of chunks stored
+        return self._document_count(collection, document_id)
     
-    def add_pdf(self, pdf_path: str, document_id: str) -> int:
-        """Process a PDF file and add it to the vector database."""
-        # Extract and embed text
-        pdf_chunks = self.embedder.load_pdf(pdf_path)
+    def add_pdf(self, pdf_path: str, document_id: str, progress: Optional[Callable[..., None]] = None,
+                owner_id: Optional[int] = None) -> int:
+        """Process a PDF file and add it to the vector database, one window of chunks at a time."""
+        chunk_count = None
+        start_index = 0
+        for window in self.embedder.stream_pdf(pdf_path, progress=progress, with_keywords=False):
+            chunk_count = self.add_document(document_id, window, progress=progress, start_index=start_index,
+                                            owner_id=owner_id)
+            start_index += len(window)
         
-        # Add to vector database
-        return self.add_document(document_id, pdf_chunks)
+        # Empty PDFs still get a collection
+        if chunk_count is None:
+            chunk_count = self.add_document(document_id, [], owner_id=owner_id)
+        
+        return chunk_count
     
-    def add_web_article(self, url: str, document_id: str) -> Dict[str, Any]:
+    def add_web_article(self, url: str, document_id: str, progress: Optional[Callable[..., None]] = None,
+                        owner_id: Optional[int] = None) -> Dict[str, Any]:
         """Process a web article and add it to the vector database."""
         # Extract and embed text
-        article_data = self.embedder.load_web_article(url)
+        article_data = self.embedder.load_web_article(url, progress=progress, with_keywords=False)
         
         # Add to vector database
-        chunk_count = self.add_document(document_id, article_data["chunks"])
+        chunk_count = self.add_document(document_id, article_data["chunks"], progress=progress, owner_id=owner_id)
         
         # Return metadata
         return {
@@ -104,7 +228,14 @@ class VectorDBService:
         """Retrieve all stored documents for a given document ID."""
         try:
             collection = self._get_collection(document_id)
-            results = collection.get()
+            where = self._where(document_id)
+            if where is None:
+                results = collection.get()
+            else:
+                # Shared collections return chunks in storage order; restore document order
+                results = collection.get(where=where, include=["documents", "metadatas"])
+                ordered = sorted(zip(results["metadatas"], results["documents"]), key=lambda item: item[0]["chunk_index"])
+                results = {"documents": [doc for _, doc in ordered]}
             
             if results and "documents" in results:
                 return results["documents"]
@@ -113,109 +244,100 @@ class VectorDBService:
         
         return []
     
-    def query(self, query_text: str, document_id: Optional[str] = None, top_k: int = 5) -> Dict[str, Any]:
+    def query(self, query_text: str, document_id: Optional[str] = None, top_k: int = 5,
+              timeout: Optional[float] = None) -> Dict[str, Any]:
         """Retrieve the top-k most similar documents for a query."""
         query_embedding = self.embedder.get_embedding(query_text)
         query_keywords = set(query_text.lower().split())
         
         if document_id:
-            # Query a specific document collection
-            collection = self._get_collection(document_id)
+            # Query a specific document
+            _, collection, where = self._search_targets(document_id)[0]
+            results = self._vector_search(collection, where, query_embedding, top_k)
             
-            available_chunks = collection.count()
-            if available_chunks == 0:
-                return {"documents": [], "metadatas": []}
-            
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=min(top_k, available_chunks)
-            )
-            
-            return results
+            return results or {"documents": [], "metadatas": []}
         else:
-            # Query across all document collections
-            all_results = {"documents": [], "metadatas": [], "ids": []}
-            collection_names = self.client.list_collections()
+            # Query across the whole library, keeping the global top-k keyword matches
+            all_results = {"documents": [], "metadatas": [], "ids": [], "distances": []}
+            hits = self._gather_vector_hits(self._search_targets(), query_embedding, top_k, timeout)
             
-            for collection_name in collection_names:
-                collection = self.client.get_collection(collection_name.name)
-                available_chunks = collection.count()
-                
-                if available_chunks > 0:
-                    res = collection.query(
-                        query_embeddings=[query_embedding],
-                        n_results=min(top_k, available_chunks)
-                    )
-                    
-                    if res and "documents" in res:
-                        # Apply keyword filtering
-                        filtered_docs = []
-                        filtered_metadata = []
-                        filtered_ids = []
-                        
-                        for doc, metadata, doc_id in zip(
-                            res["documents"][0],
-                            res["metadatas"][0],
-                            res["ids"][0]
-                        ):
-                            doc_keywords = set(metadata["keywords"].split(", "))
-                            if query_keywords & doc_keywords:
-                                filtered_docs.append(doc)
-                                filtered_metadata.append(metadata)
-                                filtered_ids.append(doc_id)
-                        
-                        all_results["documents"].extend(filtered_docs)
-                        all_results["metadatas"].extend(filtered_metadata)
-                        all_results["ids"].extend(filtered_ids)
+            # Apply keyword filtering
+            matches = (
+                hit for hit in hits
+                if query_keywords & set(hit[3]["keywords"].split(", "))
+            )
+            for distance, chunk_id, doc, metadata in islice(matches, top_k):
+                all_results["documents"].append(doc)
+                all_results["metadatas"].append(metadata)
+                all_results["ids"].append(chunk_id)
+                all_results["distances"].append(distance)
             
             return all_results
     
-    def hybrid_query(self, query_text: str, document_id: Optional[str] = None, top_k: int = 5) -> Tuple[List[str], List[Dict[str, Any]]]:
-        """Performs a hybrid search using embeddings + keyword matching."""
+    def hybrid_query(self, query_text: str, document_id: Optional[str] = None, top_k: int = 5,
+                     vector_weight: Optional[float] = None, lexical_weight: Optional[float] = None,
+                     timeout: Optional[float] = None) -> Tuple[List[str], List[Dict[str, Any]]]:
+        """Performs a hybrid search: vector similarity fused with BM25 via reciprocal rank fusion."""
         query_embedding = self.embedder.get_embedding(query_text)
+        candidates = max(top_k, settings.HYBRID_CANDIDATES)
         
-        # Remove stopwords from query for more meaningful matching
-        query_keywords = set(
-            word for word in query_text.lower().split() if word not in ENGLISH_STOP_WORDS
-        )
+        try:
+            targets = self._search_targets(document_id)
+        except Exception as e:
+            print(f"❌ Collection for document_id '{document_id}' not found: {e}")
+            return [], []
         
-        retrieved_docs = []
-        retrieved_metadata = []
+        # Vector candidates from every collection, searched in parallel and ranked globally by distance
+        vector_hits = list(islice(self._gather_vector_hits(targets, query_embedding, candidates, timeout), candidates))
+        hits: Dict[str, Tuple[str, Dict[str, Any]]] = {
+            chunk_id: (doc, metadata) for _, chunk_id, doc, metadata in vector_hits
+        }
+        vector_ranking = [chunk_id for _, chunk_id, _, _ in vector_hits]
+        
+        # Lexical candidates from the BM25 index, so exact terms (names, codes, formulas) are found
+        lexical_hits = self.corpus_index.bm25_search(
+            query_text, top_k=candidates, document_id=document_id, k1=settings.BM25_K1, b=settings.BM25_B
+        )
+        lexical_ranking = [chunk_id for chunk_id, _, _ in lexical_hits]
         
-        collections = []
+        fused = reciprocal_rank_fusion(
+            [vector_ranking, lexical_ranking],
+            weights=[
+                settings.HYBRID_VECTOR_WEIGHT if vector_weight is None else vector_weight,
+                settings.HYBRID_LEXICAL_WEIGHT if lexical_weight is None else lexical_weight,
+            ],
+            k=settings.HYBRID_RRF_K
+        )[:top_k]
         
-        if document_id:
+        # Fetch the text of lexical-only hits, one lookup per document
+        selected = {chunk_id for chunk_id, _ in fused}
+        missing: Dict[str, List[str]] = {}
+        for chunk_id, doc_id, _ in lexical_hits:
+            if chunk_id not in hits and chunk_id in selected:
+                missing.setdefault(doc_id, []).append(chunk_id)
+        for doc_id, chunk_ids in missing.items():
             try:
-                collection = self._get_collection(document_id)
-                collections = [(document_id, collection)]
+                res = self._get_collection(doc_id).get(ids=chunk_ids, include=["documents", "metadatas"])
+                for chunk_id, doc, metadata in zip(res["ids"], res["documents"], res["metadatas"]):
+                    hits[chunk_id] = (doc, metadata)
             except Exception as e:
-                print(f"❌ Collection for document_id '{document_id}' not found: {e}")
-                return [], []
-        else:
-            collections = [(col.name.replace("doc_", ""), self.client.get_collection(col.name))
-                        for col in self.client.list_collections()]
-        
-        for doc_id, collection in collections:
-            total_chunks = collection.count()
-            if total_chunks == 0:
-                print(f"⚠️ Skipping '{doc_id}' — No chunks available.")
-                continue
-            
-            res = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=min(top_k, total_chunks)
-            )
-            
-            if res and "documents" in res:
-                for doc, metadata in zip(res["documents"][0], res["metadatas"][0]):
-                    keywords_field = metadata.get("keywords", "")
-                    # Split if stored as comma-separated string
-                    doc_keywords = (
-                        set(keywords_field.split(", ")) if isinstance(keywords_field, str) else set(keywords_field)
-                    )
-                    
-                    # Always include the document in results, regardless of keyword match
-                    retrieved_docs.append(doc)
-                    retrieved_metadata.append(metadata)
+                print(f"Error fetching lexical matches for {doc_id}: {e}")
+        
+        retrieved = [hits[chunk_id] for chunk_id, _ in fused if chunk_id in hits]
+        retrieved_docs = [doc for doc, _ in retrieved]
+        retrieved_metadata = [metadata for _, metadata in retrieved]
         
         return retrieved_docs, retrieved_metadata
+    
+    def invalidate_cache(self, document_id: Optional[str] = None) -> None:
+        """Drop cached collection metadata after a document is written or deleted (or all of it)."""
+        self.collection_cache.invalidate(self._collection_name(document_id) if document_id else None)
+    
+    def delete_document(self, document_id: str) -> None:
+        """Remove a document's chunks from the vector store and the corpus index."""
+        self.corpus_index.remove_document(document_id)
+        
+        if self.layout == "per_document":
+            self.client.delete_collection(self._collection_name(document_id))
+        else:
+            self._get_collection(document_id).delete(where={"document_id": document_id})
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+# Bucket for answers drawn from the whole library rather than one document
+LIBRARY_KEY = "*"
+
+class SemanticAnswerCache:
+    """Reuses chat answers for questions that mean the same thing about the same document.
+
+    Entries are keyed by document ID and the normalized query embedding; a new
+    question reuses the closest cached answer for its document if their cosine
+    similarity reaches ``threshold``. Entries expire after ``ttl`` seconds and
+    the least recently used are evicted beyond ``max_entries``.
+    """
+
+    def __init__(self, threshold: float = 0.95, ttl: float = 3600.0, max_entries: int = 5000):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (document_id, query) -> (unit embedding, response, expires_at)
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, str, float]]" = OrderedDict()
+        self._by_document: Dict[str, Set[Tuple[str, str]]] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def _normalize(self, embedding) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _remove(self, key: Tuple[str, str]):
+        self._entries.pop(key, None)
+        keys = self._by_document.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_document[key[0]]
+
+    def lookup(self, document_id: Optional[str], embedding) -> Optional[str]:
+        """Return the cached answer closest to the query embedding, if it is similar enough."""
+        document_id = document_id or LIBRARY_KEY
+        query = self._normalize(embedding)
+        now = time.monotonic()
+
+        with self._lock:
+            keys = [key for key in self._by_document.get(document_id, ()) if self._entries[key][2] > now]
+            for key in set(self._by_document.get(document_id, ())) - set(keys):
+                self._remove(key)
+
+            if keys:
+                similarities = np.stack([self._entries[key][0] for key in keys]) @ query
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    self._entries.move_to_end(keys[best])
+                    self.hits += 1
+                    return self._entries[keys[best]][1]
+
+            self.misses += 1
+            return None
+
+    def store(self, document_id: Optional[str], query: str, embedding, response: str):
+        """Cache the answer to a query."""
+        key = (document_id or LIBRARY_KEY, " ".join(query.lower().split()))
+        with self._lock:
+            self._entries[key] = (self._normalize(embedding), response, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            self._by_document.setdefault(key[0], set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, document_id: Optional[str] = None):
+        """Drop the answers for a document (and library-wide answers), or everything."""
+        with self._lock:
+            self.invalidations += 1
+            if document_id is None:
+                self._entries.clear()
+                self._by_document.clear()
+                return
+            for bucket in (document_id, LIBRARY_KEY):
+                for key in list(self._by_document.get(bucket, ())):
+                    self._remove(key)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the cache."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "entries": len(self._entries),
+            "invalidations": self.invalidations,
+        }
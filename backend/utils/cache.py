@@ -0,0 +1,200 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional
+
+class PersistentLRUCache:
+    """Two-tier key/value cache: an in-memory LRU in front of an SQLite file.
+
+    Values are raw bytes. The memory tier holds at most ``memory_items`` entries;
+    the disk tier is trimmed back under ``max_bytes`` by evicting the least
+    recently accessed rows. Pass ``path=None`` for a memory-only cache.
+    Access times are written in batches of ``touch_batch`` (or with the next
+    write), so reads don't turn into write transactions.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_items: int = 1024, max_bytes: int = 256 * 1024 * 1024,
+                 touch_batch: int = 256):
+        self.path = path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.touch_batch = touch_batch
+        self._memory: "OrderedDict[str, bytes]" = OrderedDict()
+        # key -> last access time not yet written to disk
+        self._touched: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_bytes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed_at ON cache_entries (accessed_at)")
+            self._conn.commit()
+            self._disk_bytes = self._count_disk_bytes()
+
+    def _count_disk_bytes(self) -> int:
+        return self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+
+    def _remember(self, key: str, value: bytes):
+        """Insert into the memory tier, evicting the least recently used entry."""
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    def _flush_touched(self):
+        """Write buffered access times; the caller holds the lock and commits."""
+        if self._touched:
+            self._conn.executemany(
+                "UPDATE cache_entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._touched.items()]
+            )
+            self._touched.clear()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for a key, or None."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """Return the cached values for all keys that are present."""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            now = time.time()
+            pending = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                    self.memory_hits += 1
+                    # Keep hot keys from looking stale on disk
+                    if self._conn is not None:
+                        self._touched[key] = now
+                else:
+                    pending.append(key)
+
+            if pending and self._conn is not None:
+                # SQLite limits the number of bound parameters per statement
+                for start in range(0, len(pending), 500):
+                    batch = pending[start:start + 500]
+                    placeholders = ", ".join("?" * len(batch))
+                    rows = self._conn.execute(
+                        f"SELECT key, value FROM cache_entries WHERE key IN ({placeholders})", batch
+                    ).fetchall()
+                    for key, value in rows:
+                        found[key] = value
+                        self._remember(key, value)
+                        self._touched[key] = now
+                        self.disk_hits += 1
+
+            if len(self._touched) >= self.touch_batch:
+                self._flush_touched()
+                self._conn.commit()
+
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: bytes):
+        """Store a value under a key."""
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, bytes]):
+        """Store several values at once."""
+        if not items:
+            return
+        with self._lock:
+            for key, value in items.items():
+                self._remember(key, value)
+
+            if self._conn is None:
+                return
+
+            # Replaced rows give back their old size
+            keys = list(items)
+            replaced = 0
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ", ".join("?" * len(batch))
+                replaced += self._conn.execute(
+                    f"SELECT COALESCE(SUM(size), 0) FROM cache_entries WHERE key IN ({placeholders})", batch
+                ).fetchone()[0]
+
+            now = time.time()
+            for key in items:
+                self._touched.pop(key, None)
+            self._flush_touched()
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache_entries (key, value, size, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, value, len(value), now) for key, value in items.items()]
+            )
+            self._conn.commit()
+            self._disk_bytes += sum(len(value) for value in items.values()) - replaced
+            if self._disk_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Trim the disk tier to 90% of max_bytes, oldest entries first."""
+        # Other processes may share the file, so recount before evicting
+        self._disk_bytes = self._count_disk_bytes()
+        self._flush_touched()
+        target = int(self.max_bytes * 0.9)
+        if self._disk_bytes <= target:
+            return
+
+        evicted: List[str] = []
+        freed = 0
+        cursor = self._conn.execute("SELECT key, size FROM cache_entries ORDER BY accessed_at")
+        for key, size in cursor:
+            if self._disk_bytes - freed <= target:
+                break
+            evicted.append(key)
+            freed += size
+        cursor.close()
+
+        self._conn.executemany("DELETE FROM cache_entries WHERE key = ?", [(key,) for key in evicted])
+        self._conn.commit()
+        self._disk_bytes -= freed
+
+    def delete(self, key: str):
+        """Remove a key from both tiers."""
+        with self._lock:
+            self._memory.pop(key, None)
+            self._touched.pop(key, None)
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._disk_bytes = self._count_disk_bytes()
+
+    def clear(self):
+        """Remove every entry from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            self._touched.clear()
+            if self._conn is not None:
+                self._conn.execute("DELETE FROM cache_entries")
+                self._conn.commit()
+                self._disk_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current tier sizes."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+            "memory_items": len(self._memory),
+            "disk_bytes": self._disk_bytes,
+        }
@@ -1,9 +1,12 @@
 from langsmith import traceable
 from langchain.memory import ConversationBufferMemory
+from langchain_core.chat_history import BaseChatMessageHistory
 from langchain_core.language_models.chat_models import BaseChatModel
-from langchain_core.messages import HumanMessage, AIMessage
+from langchain_core.messages import BaseMessage, HumanMessage, AIMessage
 from typing import List, Dict, Any, Optional
 
+from backend.core.registry import get_session_store
+
 # Create a mock LLM for development/testing
 class MockChatModel(BaseChatModel):
     def _generate(self, messages, stop=None, run_manager=None, **kwargs):
@@ -23,30 +26,71 @@ class MockChatModel(BaseChatModel):
 # Initialize the mock model
 llm = MockChatModel()
 
-# In-memory storage for session memories
-chat_memory = {}
+class StoreChatMessageHistory(BaseChatMessageHistory):
+    """Message history for one session, backed by the shared session store.
+
+    Messages are loaded on first access and new messages are appended to
+    the store, so no worker holds on to sessions between requests.
+    """
+
+    def __init__(self, session_id: str, store):
+        self.session_id = session_id
+        self.store = store
+        self._messages: Optional[List[BaseMessage]] = None
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        if self._messages is None:
+            self._messages = [
+                HumanMessage(content=m["content"]) if m["role"] == "user" else AIMessage(content=m["content"])
+                for m in self.store.load(self.session_id)
+            ]
+        return self._messages
+
+    def add_message(self, message: BaseMessage) -> None:
+        self.add_messages([message])
+
+    def add_messages(self, messages: List[BaseMessage]) -> None:
+        self.store.append(self.session_id, [
+            {"role": "user" if isinstance(m, HumanMessage) else "assistant", "content": m.content}
+            for m in messages
+        ])
+        # Only track messages locally once the history has been loaded
+        if self._messages is not None:
+            self._messages.extend(messages)
+
+    def clear(self) -> None:
+        self.store.clear(self.session_id)
+        self._messages = []
 
 @traceable(name="memory")
 def get_session_memory(session_id: str):
     """
     Retrieve the memory instance for a given session.
-    If it doesn't exist, create a new one.
+    History lives in the session store and is loaded on first use.
     """
-    if session_id not in chat_memory:
-        chat_memory[session_id] = ConversationBufferMemory(return_messages=True)
-    return chat_memory[session_id]
+    history = StoreChatMessageHistory(session_id, get_session_store())
+    return ConversationBufferMemory(chat_memory=history, return_messages=True)
 
 @traceable(name="memory")
 def reset_session_memory(session_id: str):
     """
     Reset the conversation memory for a given session.
     """
-    if session_id in chat_memory:
-        chat_memory[session_id] = ConversationBufferMemory(return_messages=True)
+    if get_session_store().clear(session_id):
         return {"message": f"Chat history for session '{session_id}' cleared."}
     else:
         return {"message": f"No chat history found for session '{session_id}'."}
 
+@traceable(name="memory")
+def get_session_page(session_id: str, cursor: int = 0, limit: int = 50):
+    """
+    Read one page of a session's messages without loading the whole history.
+    Returns the messages from ``cursor`` onwards and the session's message count.
+    """
+    store = get_session_store()
+    return store.load_range(session_id, cursor, cursor + limit), store.count(session_id)
+
 @traceable(name="memory")
 def store_chat_memory(session_id: str, user_message: str, ai_response: str):
     """
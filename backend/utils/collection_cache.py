@@ -0,0 +1,72 @@
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+class CollectionCache:
+    """Short-lived cache of vector store metadata: collection handles, chunk counts and the collection list.
+
+    Entries expire after ``ttl`` seconds so changes made by other processes
+    are picked up; writers in this process call ``invalidate`` right away.
+    """
+
+    def __init__(self, ttl: float = 30.0):
+        self.ttl = ttl
+        self._handles: Dict[str, Tuple[Any, float]] = {}
+        self._counts: Dict[str, Tuple[int, float]] = {}
+        self._names: Optional[Tuple[List[str], float]] = None
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+    def _fresh(self, entry: Optional[Tuple[Any, float]]) -> bool:
+        return entry is not None and entry[1] > time.monotonic()
+
+    def _lookup(self, store: Dict[str, Tuple[Any, float]], key: str, load: Callable[[], Any]) -> Any:
+        with self._lock:
+            entry = store.get(key)
+            if self._fresh(entry):
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        value = load()
+        with self._lock:
+            store[key] = (value, time.monotonic() + self.ttl)
+        return value
+
+    def get_collection(self, client, name: str):
+        """Return the handle for a collection, fetching it from the client on a miss."""
+        return self._lookup(self._handles, name, lambda: client.get_collection(name))
+
+    def count(self, collection) -> int:
+        """Return the number of chunks in a collection."""
+        return self._lookup(self._counts, collection.name, collection.count)
+
+    def list_names(self, client) -> List[str]:
+        """Return the names of all collections."""
+        with self._lock:
+            if self._fresh(self._names):
+                self.hits += 1
+                return list(self._names[0])
+            self.misses += 1
+
+        names = [col.name for col in client.list_collections()]
+        with self._lock:
+            self._names = (names, time.monotonic() + self.ttl)
+        return list(names)
+
+    def invalidate(self, name: Optional[str] = None):
+        """Forget cached metadata for one collection (and the collection list), or everything."""
+        with self._lock:
+            self._names = None
+            if name is None:
+                self._handles.clear()
+                self._counts.clear()
+            else:
+                self._handles.pop(name, None)
+                self._counts.pop(name, None)
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters for the cache."""
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,57 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional
+
+from backend.core.config import settings
+from backend.utils.cache import PersistentLRUCache
+
+class CompletionCache:
+    """Exact-match LLM completion cache keyed by (provider, request parameters hash).
+
+    The key covers everything sent to the provider (model, messages and
+    sampling parameters), so changing any of them is a miss.
+    """
+
+    def __init__(self, path: Optional[str] = None, memory_items: int = 2000, max_bytes: int = 256 * 1024 * 1024):
+        self.store = PersistentLRUCache(path=path, memory_items=memory_items, max_bytes=max_bytes)
+
+    def make_key(self, provider: str, params: Dict[str, Any]) -> str:
+        """Build the cache key for a request to a provider."""
+        payload = json.dumps(params, sort_keys=True, separators=(",", ":"), default=str)
+        digest = hashlib.sha256(payload.encode("utf-8")).hexdigest()
+        return f"{provider}:{digest}"
+
+    def get(self, provider: str, params: Dict[str, Any]) -> Optional[str]:
+        """Return the cached completion for a request, or None."""
+        value = self.store.get(self.make_key(provider, params))
+        return value.decode("utf-8") if value is not None else None
+
+    def set(self, provider: str, params: Dict[str, Any], completion: str):
+        """Store the completion for a request."""
+        self.store.set(self.make_key(provider, params), completion.encode("utf-8"))
+
+    def delete(self, provider: str, params: Dict[str, Any]):
+        """Forget the completion for a request, e.g. one that turned out unusable."""
+        self.store.delete(self.make_key(provider, params))
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the cache."""
+        return self.store.stats()
+
+_completion_cache: Optional[CompletionCache] = None
+_completion_cache_lock = threading.Lock()
+
+def get_completion_cache() -> Optional[CompletionCache]:
+    """Return the process-wide completion cache, or None if caching is disabled."""
+    global _completion_cache
+    if not settings.LLM_CACHE_ENABLED:
+        return None
+    with _completion_cache_lock:
+        if _completion_cache is None:
+            _completion_cache = CompletionCache(
+                path=settings.LLM_CACHE_PATH or None,
+                memory_items=settings.LLM_CACHE_MEMORY_ITEMS,
+                max_bytes=settings.LLM_CACHE_MAX_MB * 1024 * 1024,
+            )
+    return _completion_cache
@@ -0,0 +1,247 @@
+import math
+import os
+import sqlite3
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sklearn.feature_extraction.text import CountVectorizer
+
+# SQLite limits the number of bound parameters per statement
+MAX_PARAMS = 500
+
+class CorpusIndex:
+    """Persistent corpus statistics and BM25 index for lexical search across the whole library.
+
+    Stores the vocabulary with document frequencies, per-chunk term counts
+    (postings) and chunk lengths in an SQLite file. Chunks are added and
+    removed incrementally, so IDF is always computed over every indexed chunk
+    instead of being refit per upload. Pass ``path=None`` for an in-memory index.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path
+        self._lock = threading.Lock()
+        # Same tokenization as the TF-IDF keywords used before: lowercase words, English stop words removed
+        self.analyzer = CountVectorizer(stop_words="english").build_analyzer()
+
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path or ":memory:", timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS terms ("
+            "term_id INTEGER PRIMARY KEY, term TEXT NOT NULL UNIQUE, df INTEGER NOT NULL DEFAULT 0);"
+            "CREATE TABLE IF NOT EXISTS chunks ("
+            "chunk_id TEXT PRIMARY KEY, document_id TEXT NOT NULL, length INTEGER NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS ix_chunks_document_id ON chunks (document_id);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            "term_id INTEGER NOT NULL, chunk_id TEXT NOT NULL, tf INTEGER NOT NULL, "
+            "PRIMARY KEY (term_id, chunk_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS ix_postings_chunk_id ON postings (chunk_id);"
+            "CREATE TABLE IF NOT EXISTS corpus_stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+            "INSERT OR IGNORE INTO corpus_stats (key, value) VALUES ('chunk_count', 0), ('total_length', 0);"
+        )
+        self._conn.commit()
+
+    def analyze(self, text: str) -> Counter:
+        """Tokenize a text into term counts."""
+        return Counter(self.analyzer(text))
+
+    def _select_in(self, query: str, values: Sequence, prefix: Sequence = ()) -> List[tuple]:
+        """Run a ``... IN ({placeholders})`` query in parameter-limited batches."""
+        rows = []
+        for start in range(0, len(values), MAX_PARAMS):
+            batch = list(values[start:start + MAX_PARAMS])
+            placeholders = ", ".join("?" * len(batch))
+            rows.extend(self._conn.execute(query.format(placeholders=placeholders), [*prefix, *batch]).fetchall())
+        return rows
+
+    def _bump_stats(self, chunk_delta: int, length_delta: int):
+        self._conn.executemany(
+            "UPDATE corpus_stats SET value = value + ? WHERE key = ?",
+            [(chunk_delta, "chunk_count"), (length_delta, "total_length")]
+        )
+
+    def _remove_chunks(self, chunk_ids: Sequence[str]):
+        """Remove chunks and their postings, keeping document frequencies in step. Caller holds the lock."""
+        existing = self._select_in("SELECT chunk_id, length FROM chunks WHERE chunk_id IN ({placeholders})", chunk_ids)
+        if not existing:
+            return
+        ids = [chunk_id for chunk_id, _ in existing]
+
+        df_changes = self._select_in(
+            "SELECT term_id, COUNT(*) FROM postings WHERE chunk_id IN ({placeholders}) GROUP BY term_id", ids
+        )
+        self._conn.executemany("UPDATE terms SET df = df - ? WHERE term_id = ?", [(n, t) for t, n in df_changes])
+        # Only the terms just decremented can have dropped to zero; df isn't indexed
+        self._conn.executemany("DELETE FROM terms WHERE term_id = ? AND df <= 0", [(t,) for t, _ in df_changes])
+        for start in range(0, len(ids), MAX_PARAMS):
+            batch = ids[start:start + MAX_PARAMS]
+            placeholders = ", ".join("?" * len(batch))
+            self._conn.execute(f"DELETE FROM postings WHERE chunk_id IN ({placeholders})", batch)
+            self._conn.execute(f"DELETE FROM chunks WHERE chunk_id IN ({placeholders})", batch)
+        self._bump_stats(-len(existing), -sum(length for _, length in existing))
+
+    def add_chunks(self, document_id: str, chunks: Sequence[Tuple[str, str]]) -> List[Counter]:
+        """Index ``(chunk_id, text)`` pairs for a document, replacing chunks already indexed.
+
+        Returns the term counts of each chunk, in input order.
+        """
+        term_counts = [self.analyze(text) for _, text in chunks]
+        if not chunks:
+            return term_counts
+
+        with self._lock:
+            self._remove_chunks([chunk_id for chunk_id, _ in chunks])
+
+            vocabulary = sorted({term for counts in term_counts for term in counts})
+            self._conn.executemany("INSERT OR IGNORE INTO terms (term) VALUES (?)", [(term,) for term in vocabulary])
+            term_ids = dict(self._select_in("SELECT term, term_id FROM terms WHERE term IN ({placeholders})", vocabulary))
+
+            df_changes = Counter(term for counts in term_counts for term in counts)
+            self._conn.executemany(
+                "UPDATE terms SET df = df + ? WHERE term_id = ?",
+                sorted((n, term_ids[term]) for term, n in df_changes.items())
+            )
+            self._conn.executemany(
+                "INSERT INTO chunks (chunk_id, document_id, length) VALUES (?, ?, ?)",
+                [(chunk_id, document_id, sum(counts.values())) for (chunk_id, _), counts in zip(chunks, term_counts)]
+            )
+            # Insert in primary key order; random-order inserts into the clustered table are much slower
+            self._conn.executemany(
+                "INSERT INTO postings (term_id, chunk_id, tf) VALUES (?, ?, ?)",
+                sorted(
+                    (term_ids[term], chunk_id, tf)
+                    for (chunk_id, _), counts in zip(chunks, term_counts)
+                    for term, tf in counts.items()
+                )
+            )
+            self._bump_stats(len(chunks), sum(sum(counts.values()) for counts in term_counts))
+            self._conn.commit()
+
+        return term_counts
+
+    def remove_document(self, document_id: str):
+        """Remove every chunk of a document from the index."""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                "SELECT chunk_id FROM chunks WHERE document_id = ?", (document_id,)
+            ).fetchall()]
+            self._remove_chunks(ids)
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of indexed chunks, their total length and the vocabulary size."""
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT key, value FROM corpus_stats").fetchall())
+            stats["vocabulary_size"] = self._conn.execute("SELECT COUNT(*) FROM terms").fetchone()[0]
+        return stats
+
+    def document_frequencies(self, terms: Iterable[str]) -> Dict[str, int]:
+        """Return the number of chunks containing each term (absent terms are omitted)."""
+        terms = list(dict.fromkeys(terms))
+        with self._lock:
+            return dict(self._select_in("SELECT term, df FROM terms WHERE term IN ({placeholders})", terms))
+
+    def idf(self, df: int, chunk_count: int) -> float:
+        """Smoothed inverse document frequency, as in scikit-learn's TfidfVectorizer."""
+        return math.log((1 + chunk_count) / (1 + df)) + 1
+
+    def keywords(self, term_counts: Sequence[Counter], top_n: int = 5) -> List[List[str]]:
+        """Top TF-IDF terms for each chunk, scored with corpus-wide document frequencies."""
+        frequencies = self.document_frequencies(term for counts in term_counts for term in counts)
+        chunk_count = self.stats()["chunk_count"]
+
+        keywords_list = []
+        for counts in term_counts:
+            scored = sorted(
+                counts.items(),
+                key=lambda item: (-item[1] * self.idf(frequencies.get(item[0], 0), chunk_count), item[0])
+            )
+            keywords_list.append([term for term, _ in scored[:top_n]])
+        return keywords_list
+
+    def chunk_keywords(self, chunk_ids: Sequence[str], top_n: int = 5) -> Dict[str, List[str]]:
+        """Top TF-IDF terms of already indexed chunks, using current corpus statistics."""
+        with self._lock:
+            rows = self._select_in(
+                "SELECT p.chunk_id, t.term, p.tf FROM postings p JOIN terms t ON t.term_id = p.term_id "
+                "WHERE p.chunk_id IN ({placeholders})",
+                list(chunk_ids)
+            )
+        term_counts: Dict[str, Counter] = {chunk_id: Counter() for chunk_id in chunk_ids}
+        for chunk_id, term, tf in rows:
+            term_counts[chunk_id][term] = tf
+        ids = list(term_counts)
+        return dict(zip(ids, self.keywords([term_counts[chunk_id] for chunk_id in ids], top_n)))
+
+    def bm25_search(self, query: str, top_k: int = 10, document_id: Optional[str] = None,
+                    k1: float = 1.5, b: float = 0.75) -> List[Tuple[str, str, float]]:
+        """Rank chunks for a query with Okapi BM25.
+
+        Returns up to ``top_k`` ``(chunk_id, document_id, score)`` tuples, best
+        first, optionally restricted to one document.
+        """
+        terms = list(self.analyze(query))
+        if not terms:
+            return []
+
+        with self._lock:
+            stats = dict(self._conn.execute("SELECT key, value FROM corpus_stats").fetchall())
+            chunk_count = stats["chunk_count"]
+            if chunk_count == 0:
+                return []
+
+            term_rows = self._select_in("SELECT term_id, df FROM terms WHERE term IN ({placeholders})", terms)
+            if not term_rows:
+                return []
+
+            placeholders = ", ".join("?" * len(term_rows))
+            sql = (
+                "SELECT p.term_id, p.chunk_id, p.tf, c.length, c.document_id "
+                "FROM postings p JOIN chunks c ON c.chunk_id = p.chunk_id "
+                f"WHERE p.term_id IN ({placeholders})"
+            )
+            params = [term_id for term_id, _ in term_rows]
+            if document_id:
+                sql += " AND c.document_id = ?"
+                params.append(document_id)
+            rows = self._conn.execute(sql, params).fetchall()
+
+        if not rows:
+            return []
+
+        idf = {
+            term_id: math.log(1 + (chunk_count - df + 0.5) / (df + 0.5))
+            for term_id, df in term_rows
+        }
+        term_ids, chunk_ids, tf, lengths, document_ids = zip(*rows)
+        tf = np.asarray(tf, dtype=np.float64)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        average_length = stats["total_length"] / chunk_count
+
+        # Sum each posting's BM25 contribution into its chunk
+        contributions = np.fromiter((idf[term_id] for term_id in term_ids), dtype=np.float64, count=len(rows))
+        contributions *= tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths / average_length))
+        unique_ids, inverse = np.unique(np.asarray(chunk_ids, dtype=object), return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions)
+
+        chunk_documents = dict(zip(chunk_ids, document_ids))
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [(unique_ids[i], chunk_documents[unique_ids[i]], float(scores[i])) for i in top]
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], weights: Optional[Sequence[float]] = None,
+                           k: int = 60) -> List[Tuple[str, float]]:
+    """Fuse ranked lists of IDs with weighted reciprocal rank fusion.
+
+    Each list contributes ``weight / (k + rank)`` (rank starting at 1) to every
+    ID it contains. Returns ``(id, score)`` pairs, best first.
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + weight / (k + rank)
+    return sorted(scores.items(), key=lambda item: -item[1])
@@ -0,0 +1,84 @@
+import hashlib
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+from backend.core.config import settings
+from backend.utils.cache import PersistentLRUCache
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so trivially different copies of a text share a cache entry."""
+    return " ".join(text.split())
+
+class EmbeddingCache:
+    """Content-addressed embedding cache keyed by (model name, normalized text hash)."""
+
+    def __init__(self, path: Optional[str] = None, memory_items: int = 10000, max_bytes: int = 512 * 1024 * 1024):
+        self.store = PersistentLRUCache(path=path, memory_items=memory_items, max_bytes=max_bytes)
+
+    def make_key(self, model_name: str, text: str) -> str:
+        """Build the cache key for a text embedded by a given model."""
+        digest = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{model_name}:{digest}"
+
+    def get(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        """Return the cached embedding for a text, or None."""
+        return self.get_many(model_name, [text])[0]
+
+    def get_many(self, model_name: str, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return cached embeddings for a list of texts, with None for misses."""
+        keys = [self.make_key(model_name, text) for text in texts]
+        found = self.store.get_many(keys)
+        return [
+            np.frombuffer(found[key], dtype=np.float32) if key in found else None
+            for key in keys
+        ]
+
+    def set(self, model_name: str, text: str, embedding):
+        """Store the embedding for a text."""
+        self.set_many(model_name, [text], [embedding])
+
+    def set_many(self, model_name: str, texts: List[str], embeddings):
+        """Store embeddings for a list of texts."""
+        self.store.set_many({
+            self.make_key(model_name, text): np.asarray(embedding, dtype=np.float32).tobytes()
+            for text, embedding in zip(texts, embeddings)
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters for the cache."""
+        return self.store.stats()
+
+def encode_with_cache(cache: Optional[EmbeddingCache], model_name: str, texts: List[str],
+                      encode: Callable[[List[str]], Any]) -> List[np.ndarray]:
+    """Embed texts with ``encode``, only running it on the texts missing from the cache."""
+    if cache is None:
+        return list(encode(texts))
+
+    embeddings = cache.get_many(model_name, texts)
+    missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+    if missing:
+        missing_texts = [texts[i] for i in missing]
+        encoded = encode(missing_texts)
+        cache.set_many(model_name, missing_texts, encoded)
+        for i, embedding in zip(missing, encoded):
+            embeddings[i] = embedding
+    return embeddings
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> Optional[EmbeddingCache]:
+    """Return the process-wide embedding cache, or None if caching is disabled."""
+    global _embedding_cache
+    if not settings.EMBEDDING_CACHE_ENABLED:
+        return None
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache(
+                path=settings.EMBEDDING_CACHE_PATH or None,
+                memory_items=settings.EMBEDDING_CACHE_MEMORY_ITEMS,
+                max_bytes=settings.EMBEDDING_CACHE_MAX_MB * 1024 * 1024,
+            )
+    return _embedding_cache
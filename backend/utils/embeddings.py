@@ -2,12 +2,21 @@ from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_community.document_loaders import WebBaseLoader, PyPDFLoader
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sentence_transformers import SentenceTransformer
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator
+import numpy as np
 import os
+import time
+
+from backend.core.config import settings
+from backend.utils.embedding_cache import encode_with_cache, get_embedding_cache
+from backend.utils.keywords import top_terms_per_row
+from backend.utils.pdf_extraction import PageResult, iter_pages_parallel, page_count
 
 class Embedder:
-    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+    def __init__(self, model_name: str = settings.EMBEDDING_MODEL):
+        self.model_name = model_name
         self.model = SentenceTransformer(model_name)
+        self.cache = get_embedding_cache()
         self.text_splitter = RecursiveCharacterTextSplitter(
             chunk_size=1000,
             chunk_overlap=200,
@@ -20,62 +29,179 @@ class Embedder:
     
     def get_embedding(self, text: str) -> List[float]:
         """Generate embeddings for a text string."""
-        return self.model.encode(text).tolist()
+        embeddings = encode_with_cache(self.cache, self.model_name, [text], self.model.encode)
+        return np.asarray(embeddings[0]).tolist()
+
+    def embed_batch(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """Embed a list of texts in mini-batches, returning a contiguous float32 matrix."""
+        if not texts:
+            dimension = self.model.get_sentence_embedding_dimension()
+            return np.empty((0, dimension), dtype=np.float32)
+
+        embeddings = encode_with_cache(
+            self.cache,
+            self.model_name,
+            texts,
+            lambda batch: self.model.encode(
+                batch,
+                batch_size=batch_size or settings.EMBEDDING_BATCH_SIZE,
+                convert_to_numpy=True,
+                show_progress_bar=False,
+            ),
+        )
+        return np.ascontiguousarray(np.stack(embeddings), dtype=np.float32)
+
+    def embed_documents(self, documents: List[List[str]], batch_size: Optional[int] = None) -> List[np.ndarray]:
+        """Embed the chunks of several documents (e.g. an upload queue) in a single pass.
+
+        Returns one matrix per document, in the same order as the input.
+        """
+        if not documents:
+            return []
+
+        matrix = self.embed_batch([text for chunks in documents for text in chunks], batch_size)
+        offsets = np.cumsum([len(chunks) for chunks in documents])[:-1]
+        return np.split(matrix, offsets)
     
     def extract_keywords(self, texts: List[str], top_n: int = 5) -> List[List[str]]:
         """Extract keywords from a list of texts using TF-IDF."""
-        # Fit the vectorizer on all texts
-        self.tfidf_vectorizer.fit(texts)
-        
-        # Get feature names (words)
+        # One fit/transform over all texts, then top terms straight from the sparse matrix
+        tfidf_matrix = self.tfidf_vectorizer.fit_transform(texts)
         feature_names = self.tfidf_vectorizer.get_feature_names_out()
-        
-        # Extract keywords for each text
-        keywords_list = []
-        for text in texts:
-            # Transform the text to get TF-IDF scores
-            tfidf_matrix = self.tfidf_vectorizer.transform([text])
-            
-            # Get indices of top N scores
-            indices = tfidf_matrix.toarray()[0].argsort()[-top_n:][::-1]
-            
-            # Get the corresponding words
-            keywords = [feature_names[i] for i in indices]
-            keywords_list.append(keywords)
-        
-        return keywords_list
+        return top_terms_per_row(tfidf_matrix, feature_names, top_n)
     
-    def load_pdf(self, pdf_path: str) -> List[Dict[str, Any]]:
-        """Load and chunk a PDF file."""
-        # Check if file exists
-        if not os.path.exists(pdf_path):
-            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
-        
-        # Load PDF
-        loader = PyPDFLoader(pdf_path)
-        docs = loader.load()
-        
-        # Combine extracted text
-        raw_text = " ".join([doc.page_content for doc in docs])
-        
-        # Split text into chunks
-        text_chunks = self.text_splitter.split_text(raw_text)
-        
+    def prepare_chunks(self, text_chunks: List[str], progress: Optional[Callable[..., None]] = None,
+                       with_keywords: bool = True) -> List[Dict[str, Any]]:
+        """Embed and extract keywords for a list of text chunks.
+
+        Pass ``with_keywords=False`` when keywords are scored elsewhere (e.g. by the corpus index).
+        """
+        if not text_chunks:
+            return []
+
         # Extract keywords for hybrid search
-        keywords_list = self.extract_keywords(text_chunks)
-        
+        keywords_list = self.extract_keywords(text_chunks) if with_keywords else [[] for _ in text_chunks]
+
+        # Embed all chunks in mini-batches instead of one forward pass per chunk
+        embeddings = self.embed_batch(text_chunks).tolist()
+        if progress:
+            progress(chunks_embedded=len(text_chunks))
+
         # Prepare structured output
-        chunk_data = []
-        for i, chunk_text in enumerate(text_chunks):
-            chunk_data.append({
+        return [
+            {
                 "text": chunk_text,
-                "embedding": self.get_embedding(chunk_text),
+                "embedding": embeddings[i],
                 "keywords": keywords_list[i],
-            })
-        
-        return chunk_data
+            }
+            for i, chunk_text in enumerate(text_chunks)
+        ]
     
-    def load_web_article(self, url: str) -> Dict[str, Any]:
+    def iter_pdf_page_timings(self, pdf_path: str) -> Iterator[PageResult]:
+        """Yield ``(page number, text, seconds)`` for each page of a PDF, in order.
+
+        With PDF_PARSE_WORKERS > 1, documents longer than one task's worth of
+        pages are extracted in parallel across a process pool.
+        """
+        # Check if file exists
+        if not os.path.exists(pdf_path):
+            raise FileNotFoundError(f"PDF file not found: {pdf_path}")
+
+        workers = settings.PDF_PARSE_WORKERS
+        if workers > 1 and page_count(pdf_path) > settings.PDF_PAGES_PER_TASK:
+            yield from iter_pages_parallel(pdf_path, workers, settings.PDF_PAGES_PER_TASK)
+            return
+
+        pages = PyPDFLoader(pdf_path).lazy_load()
+        number = 0
+        while True:
+            started = time.perf_counter()
+            doc = next(pages, None)
+            if doc is None:
+                return
+            yield number, doc.page_content, time.perf_counter() - started
+            number += 1
+
+    def iter_pdf_pages(self, pdf_path: str) -> Iterator[str]:
+        """Yield the text of a PDF one page at a time."""
+        for _, text, _ in self.iter_pdf_page_timings(pdf_path):
+            yield text
+
+    def iter_chunks(self, pages: Iterable[str]) -> Iterator[str]:
+        """Split a stream of pages into chunks without joining the whole text.
+
+        The last (possibly incomplete) chunk of each split is carried over into
+        the next page, so chunks and their overlap span page boundaries while
+        only about one page of text is buffered at a time.
+        """
+        buffer = ""
+        for page in pages:
+            buffer = f"{buffer} {page}" if buffer else page
+            chunks = self.text_splitter.split_text(buffer)
+            if len(chunks) > 1:
+                yield from chunks[:-1]
+                buffer = chunks[-1]
+        if buffer:
+            yield from self.text_splitter.split_text(buffer)
+
+    def stream_pdf(self, pdf_path: str, window_size: Optional[int] = None,
+                   progress: Optional[Callable[..., None]] = None,
+                   with_keywords: bool = True) -> Iterator[List[Dict[str, Any]]]:
+        """Load, chunk and embed a PDF in bounded windows of chunks.
+
+        Only one window of chunks and embeddings is held at a time, so memory
+        stays flat regardless of the document's size. ``progress``, if given,
+        is called with running ``pages_parsed`` and ``chunks_embedded`` counts
+        and with the slowest page seen so far.
+        """
+        window_size = window_size or settings.INGESTION_WINDOW_CHUNKS
+        counts = {"pages_parsed": 0, "chunks_embedded": 0}
+        slowest = (-1, 0.0)
+
+        def pages():
+            nonlocal slowest
+            for number, page, seconds in self.iter_pdf_page_timings(pdf_path):
+                counts["pages_parsed"] += 1
+                if seconds >= settings.PDF_SLOW_PAGE_SECONDS:
+                    print(f"Slow page {number} in {pdf_path}: {seconds:.2f}s to extract")
+                if seconds > slowest[1]:
+                    slowest = (number, seconds)
+                if progress:
+                    progress(
+                        pages_parsed=counts["pages_parsed"],
+                        slowest_page=slowest[0],
+                        slowest_page_seconds=round(slowest[1], 3)
+                    )
+                yield page
+
+        window: List[str] = []
+        for chunk in self.iter_chunks(pages()):
+            window.append(chunk)
+            if len(window) >= window_size:
+                yield self._prepare_window(window, counts, progress, with_keywords)
+                window = []
+        if window:
+            yield self._prepare_window(window, counts, progress, with_keywords)
+
+    def _prepare_window(self, window: List[str], counts: Dict[str, int],
+                        progress: Optional[Callable[..., None]], with_keywords: bool) -> List[Dict[str, Any]]:
+        chunks = self.prepare_chunks(window, with_keywords=with_keywords)
+        counts["chunks_embedded"] += len(chunks)
+        if progress:
+            progress(chunks_embedded=counts["chunks_embedded"])
+        return chunks
+
+    def load_pdf(self, pdf_path: str, progress: Optional[Callable[..., None]] = None) -> List[Dict[str, Any]]:
+        """Load and chunk a PDF file.
+
+        ``progress``, if given, is called with counters such as ``pages_parsed``
+        and ``chunks_embedded`` as ingestion advances. Prefer ``stream_pdf`` for
+        large files; this keeps every chunk in memory.
+        """
+        return [chunk for window in self.stream_pdf(pdf_path, progress=progress) for chunk in window]
+    
+    def load_web_article(self, url: str, progress: Optional[Callable[..., None]] = None,
+                         with_keywords: bool = True) -> Dict[str, Any]:
         """Load and chunk a web article."""
         # Load web article
         loader = WebBaseLoader(url)
@@ -94,19 +220,7 @@ class Embedder:
         # Split text into chunks
         text_chunks = self.text_splitter.split_text(raw_text)
         
-        # Extract keywords for hybrid search
-        keywords_list = self.extract_keywords(text_chunks)
-        
-        # Prepare structured output
-        chunk_data = []
-        for i, chunk_text in enumerate(text_chunks):
-            chunk_data.append({
-                "text": chunk_text,
-                "embedding": self.get_embedding(chunk_text),
-                "keywords": keywords_list[i],
-            })
-        
         return {
             "metadata": metadata,
-            "chunks": chunk_data,
+            "chunks": self.prepare_chunks(text_chunks, progress=progress, with_keywords=with_keywords),
         }
@@ -0,0 +1,28 @@
+from typing import List, Sequence
+
+import numpy as np
+
+def top_terms_per_row(matrix, feature_names: Sequence[str], top_n: int = 5) -> List[List[str]]:
+    """Return the top-N highest scoring terms of every row of a sparse term matrix.
+
+    Works directly on the CSR arrays: one segmented sort of the non-zero
+    entries by (row, descending score) instead of densifying each row. Rows
+    with fewer than ``top_n`` non-zero terms return only those terms; ties
+    are broken by feature index so the output is deterministic.
+    """
+    matrix = matrix.tocsr()
+    row_lengths = np.diff(matrix.indptr)
+    if matrix.nnz == 0:
+        return [[] for _ in range(matrix.shape[0])]
+
+    rows = np.repeat(np.arange(matrix.shape[0]), row_lengths)
+    order = np.lexsort((matrix.indices, -matrix.data, rows))
+
+    # Position of each sorted entry within its row; keep the first top_n
+    ranks = np.arange(matrix.nnz) - matrix.indptr[rows[order]]
+    keep = order[ranks < top_n]
+
+    names = np.asarray(feature_names, dtype=object)[matrix.indices[keep]].tolist()
+    bounds = np.cumsum(np.minimum(row_lengths, top_n))
+    starts = np.concatenate(([0], bounds[:-1]))
+    return [names[start:end] for start, end in zip(starts, bounds)]
@@ -0,0 +1,70 @@
+import time
+from collections import deque
+from typing import Iterator, List, Tuple
+
+from backend.core.config import settings
+
+# (page number, page text, seconds spent extracting the page)
+PageResult = Tuple[int, str, float]
+
+def page_count(pdf_path: str) -> int:
+    """Return the number of pages in a PDF."""
+    from pypdf import PdfReader
+    return len(PdfReader(pdf_path).pages)
+
+def extract_page_range(pdf_path: str, start: int, end: int) -> List[PageResult]:
+    """Extract the text of pages [start, end), timing each page.
+
+    Runs in a worker process, so it opens its own reader.
+    """
+    from pypdf import PdfReader
+
+    reader = PdfReader(pdf_path)
+    results = []
+    for number in range(start, min(end, len(reader.pages))):
+        started = time.perf_counter()
+        try:
+            text = reader.pages[number].extract_text() or ""
+        except Exception as e:
+            print(f"Error extracting page {number} of {pdf_path}: {e}")
+            text = ""
+        results.append((number, text, time.perf_counter() - started))
+    return results
+
+def get_pdf_parse_pool(workers: int = settings.PDF_PARSE_WORKERS):
+    """Get the shared process pool used for page-parallel PDF extraction."""
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    from backend.core.registry import get_or_create
+
+    # Spawn rather than fork: the pool is created from a worker thread in a
+    # process already running torch, tokenizer and executor threads
+    return get_or_create(
+        ("pdf_parse_pool", workers),
+        lambda: ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+    )
+
+def iter_pages_parallel(pdf_path: str, workers: int = settings.PDF_PARSE_WORKERS,
+                        pages_per_task: int = settings.PDF_PAGES_PER_TASK) -> Iterator[PageResult]:
+    """Extract PDF pages across a process pool, yielding them in page order.
+
+    Page ranges are submitted a few at a time so that only a bounded number of
+    extracted pages waits in memory ahead of the consumer.
+    """
+    total = page_count(pdf_path)
+    pool = get_pdf_parse_pool(workers)
+    ranges = iter(range(0, total, pages_per_task))
+    pending = deque()
+
+    def submit_next():
+        start = next(ranges, None)
+        if start is not None:
+            pending.append(pool.submit(extract_page_range, pdf_path, start, start + pages_per_task))
+
+    for _ in range(workers * 2):
+        submit_next()
+
+    while pending:
+        results = pending.popleft().result()
+        submit_next()
+        yield from results
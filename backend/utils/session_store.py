@@ -0,0 +1,414 @@
+import atexit
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+
+# Messages are stored as {"role": "user" | "assistant", "content": str}
+Message = Dict[str, str]
+
+class InMemorySessionStore:
+    """Chat sessions in this process, bounded by an LRU limit and a TTL.
+
+    Only suitable for a single worker; sessions are lost on restart.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl: float = 24 * 3600):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._sessions: "OrderedDict[str, Tuple[List[Message], float]]" = OrderedDict()
+        # Small per-session values (e.g. the rolling history summary), dropped with the session
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, session_id: str) -> Optional[List[Message]]:
+        entry = self._sessions.get(session_id)
+        if entry is None:
+            return None
+        if entry[1] <= time.monotonic():
+            del self._sessions[session_id]
+            self._state.pop(session_id, None)
+            return None
+        self._sessions.move_to_end(session_id)
+        return entry[0]
+
+    def load(self, session_id: str) -> List[Message]:
+        """Return a session's messages, oldest first."""
+        with self._lock:
+            return list(self._get(session_id) or [])
+
+    def load_range(self, session_id: str, start: int, stop: int) -> List[Message]:
+        """Return messages ``start`` to ``stop`` (exclusive) of a session."""
+        with self._lock:
+            return list((self._get(session_id) or [])[start:stop])
+
+    def count(self, session_id: str) -> int:
+        """Return the number of messages in a session."""
+        with self._lock:
+            return len(self._get(session_id) or [])
+
+    def append(self, session_id: str, messages: List[Message]):
+        """Append messages to a session."""
+        self.append_many({session_id: messages})
+
+    def append_many(self, batch: Dict[str, List[Message]]):
+        """Append messages to several sessions at once."""
+        with self._lock:
+            for session_id, messages in batch.items():
+                stored = self._get(session_id) or []
+                stored.extend(messages)
+                self._sessions[session_id] = (stored, time.monotonic() + self.ttl)
+                self._sessions.move_to_end(session_id)
+            while len(self._sessions) > self.max_sessions:
+                evicted, _ = self._sessions.popitem(last=False)
+                self._state.pop(evicted, None)
+
+    def load_state(self, session_id: str, key: str) -> Optional[Any]:
+        """Return a value stored alongside a session, or None."""
+        with self._lock:
+            if self._get(session_id) is None:
+                return None
+            return self._state.get(session_id, {}).get(key)
+
+    def save_state(self, session_id: str, key: str, value: Any):
+        """Store a JSON-serializable value alongside a session's messages."""
+        with self._lock:
+            if self._get(session_id) is not None:
+                self._state.setdefault(session_id, {})[key] = value
+
+    def clear(self, session_id: str) -> bool:
+        """Delete a session's messages and return whether it had any."""
+        with self._lock:
+            existed = self._get(session_id) is not None
+            self._sessions.pop(session_id, None)
+            self._state.pop(session_id, None)
+            return existed
+
+class SQLSessionStore:
+    """Chat sessions in the ``chat_sessions`` and ``chat_messages`` tables."""
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from backend.db.database import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+
+    def _messages(self, db, session_id: str):
+        from backend.db.models import ChatMessage, ChatSession
+
+        return (
+            db.query(ChatMessage.role, ChatMessage.content)
+            .join(ChatSession, ChatMessage.session_id == ChatSession.id)
+            .filter(ChatSession.session_id == session_id)
+        )
+
+    def load(self, session_id: str) -> List[Message]:
+        """Return a session's messages, oldest first."""
+        return self.load_range(session_id, 0, None)
+
+    def load_range(self, session_id: str, start: int, stop: Optional[int]) -> List[Message]:
+        """Return messages ``start`` to ``stop`` (exclusive) of a session."""
+        from backend.db.models import ChatMessage
+
+        db = self.session_factory()
+        try:
+            query = self._messages(db, session_id).order_by(ChatMessage.id).offset(start)
+            if stop is not None:
+                query = query.limit(max(stop - start, 0))
+            return [{"role": role, "content": content} for role, content in query.all()]
+        finally:
+            db.close()
+
+    def count(self, session_id: str) -> int:
+        """Return the number of messages in a session."""
+        db = self.session_factory()
+        try:
+            return self._messages(db, session_id).count()
+        finally:
+            db.close()
+
+    def append(self, session_id: str, messages: List[Message]):
+        """Append messages to a session."""
+        self.append_many({session_id: messages})
+
+    def append_many(self, batch: Dict[str, List[Message]]):
+        """Append messages to several sessions in one transaction."""
+        from backend.db.models import ChatMessage, ChatSession
+
+        db = self.session_factory()
+        try:
+            for session_id, messages in batch.items():
+                session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+                if session is None:
+                    session = ChatSession(session_id=session_id)
+                    db.add(session)
+                    db.flush()
+                db.add_all([
+                    ChatMessage(session_id=session.id, role=message["role"], content=message["content"])
+                    for message in messages
+                ])
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def load_state(self, session_id: str, key: str) -> Optional[Any]:
+        """Return a value stored alongside a session, or None."""
+        from backend.db.models import ChatSession, ChatSessionState
+
+        db = self.session_factory()
+        try:
+            row = (
+                db.query(ChatSessionState.value)
+                .join(ChatSession, ChatSessionState.session_id == ChatSession.id)
+                .filter(ChatSession.session_id == session_id, ChatSessionState.key == key)
+                .first()
+            )
+            return json.loads(row[0]) if row else None
+        finally:
+            db.close()
+
+    def save_state(self, session_id: str, key: str, value: Any):
+        """Store a JSON-serializable value alongside a session's messages."""
+        from backend.db.models import ChatSession, ChatSessionState
+
+        db = self.session_factory()
+        try:
+            session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+            if session is None:
+                session = ChatSession(session_id=session_id)
+                db.add(session)
+                db.flush()
+            state = db.query(ChatSessionState).filter(
+                ChatSessionState.session_id == session.id, ChatSessionState.key == key
+            ).first()
+            if state is None:
+                state = ChatSessionState(session_id=session.id, key=key)
+                db.add(state)
+            state.value = json.dumps(value)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def clear(self, session_id: str) -> bool:
+        """Delete a session and its messages and return whether it existed."""
+        from backend.db.models import ChatMessage, ChatSession, ChatSessionState
+
+        db = self.session_factory()
+        try:
+            session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+            if session is None:
+                return False
+            db.query(ChatSessionState).filter(ChatSessionState.session_id == session.id).delete()
+            db.query(ChatMessage).filter(ChatMessage.session_id == session.id).delete()
+            db.delete(session)
+            db.commit()
+            return True
+        finally:
+            db.close()
+
+class RedisSessionStore:
+    """Chat sessions as Redis lists, shared by every worker process."""
+
+    def __init__(self, client, prefix: str = "chat", ttl: int = 7 * 24 * 3600):
+        self.client = client
+        self.prefix = prefix
+        self.ttl = ttl
+
+    def _key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}:messages"
+
+    def _state_key(self, session_id: str) -> str:
+        return f"{self.prefix}:session:{session_id}:state"
+
+    def load(self, session_id: str) -> List[Message]:
+        """Return a session's messages, oldest first."""
+        return [json.loads(item) for item in self.client.lrange(self._key(session_id), 0, -1)]
+
+    def load_range(self, session_id: str, start: int, stop: int) -> List[Message]:
+        """Return messages ``start`` to ``stop`` (exclusive) of a session."""
+        if stop <= start:
+            return []
+        return [json.loads(item) for item in self.client.lrange(self._key(session_id), start, stop - 1)]
+
+    def count(self, session_id: str) -> int:
+        """Return the number of messages in a session."""
+        return self.client.llen(self._key(session_id))
+
+    def append(self, session_id: str, messages: List[Message]):
+        """Append messages to a session."""
+        self.append_many({session_id: messages})
+
+    def append_many(self, batch: Dict[str, List[Message]]):
+        """Append messages to several sessions in one round trip."""
+        pipe = self.client.pipeline()
+        for session_id, messages in batch.items():
+            if messages:
+                pipe.rpush(self._key(session_id), *[json.dumps(message) for message in messages])
+                pipe.expire(self._key(session_id), self.ttl)
+        pipe.execute()
+
+    def load_state(self, session_id: str, key: str) -> Optional[Any]:
+        """Return a value stored alongside a session, or None."""
+        value = self.client.hget(self._state_key(session_id), key)
+        return json.loads(value) if value is not None else None
+
+    def save_state(self, session_id: str, key: str, value: Any):
+        """Store a JSON-serializable value alongside a session's messages."""
+        pipe = self.client.pipeline()
+        pipe.hset(self._state_key(session_id), key, json.dumps(value))
+        pipe.expire(self._state_key(session_id), self.ttl)
+        pipe.execute()
+
+    def clear(self, session_id: str) -> bool:
+        """Delete a session's messages and return whether it had any."""
+        self.client.delete(self._state_key(session_id))
+        return bool(self.client.delete(self._key(session_id)))
+
+class WriteBehindSessionStore:
+    """Buffers appends in memory and writes them to another store in batches.
+
+    A background thread flushes every ``flush_interval`` seconds, or sooner
+    once ``max_batch`` messages are waiting. Reads in this process see
+    buffered messages right away; other workers see them after the flush.
+    At most ``max_pending`` messages are buffered: past that, appends are
+    written through, and fail while the underlying store is down.
+    """
+
+    def __init__(self, store, flush_interval: float = 0.5, max_batch: int = 100,
+                 max_pending: Optional[int] = None):
+        self.store = store
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_pending = max_pending or settings.SESSION_MAX_PENDING
+        self._pending: Dict[str, List[Message]] = {}
+        self._pending_count = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        atexit.register(self.flush)
+
+    def _start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._flush_loop, name="session-store-flush", daemon=True)
+            self._thread.start()
+
+    def _flush_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def _buffered(self, session_id: str) -> List[Message]:
+        with self._lock:
+            return list(self._pending.get(session_id, []))
+
+    def load(self, session_id: str) -> List[Message]:
+        """Return a session's stored messages plus any still buffered."""
+        # Holding the flush lock keeps a batch from being read twice mid-flush
+        with self._flush_lock:
+            return self.store.load(session_id) + self._buffered(session_id)
+
+    def load_range(self, session_id: str, start: int, stop: int) -> List[Message]:
+        """Return messages ``start`` to ``stop`` (exclusive), stored or buffered."""
+        with self._flush_lock:
+            stored = self.store.count(session_id)
+            messages = self.store.load_range(session_id, start, min(stop, stored)) if start < stored else []
+            buffered = self._buffered(session_id)
+            return messages + buffered[max(start - stored, 0):max(stop - stored, 0)]
+
+    def count(self, session_id: str) -> int:
+        """Return the number of messages in a session, including buffered ones."""
+        with self._flush_lock:
+            return self.store.count(session_id) + len(self._buffered(session_id))
+
+    def load_state(self, session_id: str, key: str) -> Optional[Any]:
+        """Return a value stored alongside a session, or None."""
+        return self.store.load_state(session_id, key)
+
+    def save_state(self, session_id: str, key: str, value: Any):
+        """Store a value alongside a session; written through, as it changes rarely."""
+        self.store.save_state(session_id, key, value)
+
+    def append(self, session_id: str, messages: List[Message]):
+        """Buffer messages for the next flush, or write them through once the buffer is full."""
+        with self._lock:
+            full = self._pending_count + len(messages) > self.max_pending
+            if not full:
+                self._pending.setdefault(session_id, []).extend(messages)
+                self._pending_count += len(messages)
+                due = self._pending_count >= self.max_batch
+                self._start()
+        if not full:
+            if due:
+                self._wake.set()
+            return
+
+        # The store is falling behind or down, so stop buffering
+        with self._flush_lock:
+            # Write the older messages first to keep each session in order
+            if not self._flush_pending():
+                raise RuntimeError("Chat message buffer is full and the session store is unavailable")
+            self.store.append(session_id, messages)
+
+    def _flush_pending(self) -> bool:
+        """Write the buffer to the underlying store; the caller holds the flush lock.
+
+        Returns False if the write failed and the messages were put back.
+        """
+        with self._lock:
+            if not self._pending:
+                return True
+            batch, self._pending = self._pending, {}
+            self._pending_count = 0
+        try:
+            self.store.append_many(batch)
+            return True
+        except Exception as e:
+            print(f"Error flushing chat messages, will retry: {e}")
+            with self._lock:
+                for session_id, messages in self._pending.items():
+                    batch.setdefault(session_id, []).extend(messages)
+                self._pending = batch
+                self._pending_count = sum(len(messages) for messages in batch.values())
+            return False
+
+    def flush(self):
+        """Write all buffered messages to the underlying store."""
+        with self._flush_lock:
+            self._flush_pending()
+
+    def clear(self, session_id: str) -> bool:
+        """Delete a session, including messages not yet flushed."""
+        with self._flush_lock:
+            with self._lock:
+                buffered = self._pending.pop(session_id, None)
+                if buffered:
+                    self._pending_count -= len(buffered)
+            return self.store.clear(session_id) or bool(buffered)
+
+def create_session_store(backend: str = settings.SESSION_STORE_BACKEND):
+    """Build the chat session store selected by SESSION_STORE_BACKEND."""
+    if backend == "memory":
+        return InMemorySessionStore(max_sessions=settings.SESSION_MAX_SESSIONS, ttl=settings.SESSION_TTL)
+
+    if backend == "redis":
+        from backend.core.registry import get_redis_client
+        store = RedisSessionStore(get_redis_client(), ttl=int(settings.SESSION_TTL))
+    elif backend == "sql":
+        store = SQLSessionStore()
+    else:
+        raise ValueError(f"Unknown session store backend: {backend}")
+
+    if settings.SESSION_WRITE_BEHIND:
+        return WriteBehindSessionStore(store, flush_interval=settings.SESSION_FLUSH_INTERVAL)
+    return store
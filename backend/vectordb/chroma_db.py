@@ -1,4 +1,3 @@
-import chromadb
 import os
 from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
 import sys
@@ -6,12 +5,14 @@ import numpy as np
 from sklearn.feature_extraction.text import TfidfVectorizer
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 from backend.embeddings.embedder import Embedder
+from backend.core.registry import get_vector_client
 from langsmith import traceable
 from tqdm import tqdm
 
 class ChromaDBManager:
     def __init__(self, persist_dir="data/chroma_db"):
-        self.client = chromadb.PersistentClient(path=persist_dir)
+        self.client = get_vector_client(persist_dir)
+        # Loaders around the shared model from the registry
         self.embedder = Embedder()
         self.tfidf_vectorizer = TfidfVectorizer(stop_words="english")
 
@@ -24,47 +25,49 @@ class ChromaDBManager:
                 if isinstance(value, list):
                     meta[key] = ", ".join(value)
 
+    def _add_chunks(self, collection, document_id, texts, embeddings, metadatas, batch_size=512):
+        """Bulk-insert chunks, skipping the ones already stored.
+
+        Existing chunk IDs are resolved with a single lookup and only the
+        missing chunks are written, in large batches.
+        """
+        ids = [f"{document_id}_chunk_{i}" for i in range(len(texts))]
+        if not ids:
+            return 0
+
+        existing = set(collection.get(ids=ids, include=[])["ids"])
+        missing = [i for i, doc_id in enumerate(ids) if doc_id not in existing]
+
+        for start in tqdm(range(0, len(missing), batch_size), desc="Writing Chunks"):
+            batch = missing[start:start + batch_size]
+            batch_metadata = [dict(metadatas[i]) for i in batch]
+            self._sanitize_metadata(batch_metadata)
+            collection.add(
+                ids=[ids[i] for i in batch],
+                embeddings=[embeddings[i] for i in batch],
+                documents=[texts[i] for i in batch],
+                metadatas=batch_metadata,
+            )
+
+        return len(missing)
+
     def add_pdf(self, pdf_path, document_id):
         """Extracts text from a PDF, chunks it, embeds it, and stores it under a unique document_id."""
         collection_name = f"doc_{document_id}"  # Unique collection for each PDF
         collection = self.client.get_or_create_collection(name=collection_name)
 
-        # Extract and embed text
+        # Extract and embed text (load_pdf already returns embeddings and keywords)
         pdf_chunks = self.embedder.load_pdf(pdf_path)
-        pdf_chunks = [chunk["text"] if isinstance(chunk, dict) else chunk for chunk in pdf_chunks]
-
-        print("DEBUG: pdf_chunks =", pdf_chunks)
-        tfidf_keywords = self.embedder.extract_keywords(pdf_chunks)
-
-        batch_size = 16
-        batch_docs, batch_ids, batch_embeddings, batch_metadata = [], [], [], []
 
         print(f"📘 Processing {len(pdf_chunks)} chunks from {pdf_path} (ID: {document_id})...")
 
-        for i, chunk in tqdm(enumerate(pdf_chunks), total=len(pdf_chunks), desc="Embedding Chunks"):
-            doc_id = f"{document_id}_chunk_{i}"
-
-            # Skip if already exists
-            existing = collection.get(ids=[doc_id])
-            if existing and existing["ids"]:
-                continue
-
-            batch_docs.append(chunk)
-            batch_ids.append(doc_id)
-            batch_embeddings.append(self.embedder.get_embedding(chunk))
-            batch_metadata.append({"keywords": tfidf_keywords[i]})
-
-            # Process in batches
-            if len(batch_docs) >= batch_size:
-                self._sanitize_metadata(batch_metadata)
-                collection.add(ids=batch_ids, embeddings=batch_embeddings, documents=batch_docs, metadatas=batch_metadata)
-                batch_docs, batch_ids, batch_embeddings, batch_metadata = [], [], [], []
-
-
-        # Insert remaining documents
-        if batch_docs:
-            self._sanitize_metadata(batch_metadata)
-            collection.add(ids=batch_ids, embeddings=batch_embeddings, documents=batch_docs, metadatas=batch_metadata)
+        self._add_chunks(
+            collection,
+            document_id,
+            texts=[chunk["text"] for chunk in pdf_chunks],
+            embeddings=[chunk["embedding"] for chunk in pdf_chunks],
+            metadatas=[{"keywords": chunk["keywords"]} for chunk in pdf_chunks],
+        )
 
         print(f"✅ PDF '{pdf_path}' stored as '{collection_name}' in ChromaDB!")
 
@@ -187,49 +190,18 @@ class ChromaDBManager:
         collection = self.client.get_or_create_collection(name=collection_name)
 
         article_data = self.embedder.load_web_article(url)
-
-        print(f"\n\n\narticle_data: {article_data}\n\n\n")
-
         web_article_chunks = article_data["chunks"]
-        web_article_chunks = [chunk["text"] if isinstance(chunk, dict) else chunk for chunk in web_article_chunks]
-
-        tfidf_keywords = self.embedder.extract_keywords(web_article_chunks)
-
-        batch_size = 16
-        batch_docs, batch_ids, batch_embeddings, batch_metadata = [], [], [], []
 
         print(f"🌐 Processing {len(web_article_chunks)} chunks from {url} (ID: {document_id})...")
 
-        for i, chunk in tqdm(enumerate(web_article_chunks), total=len(web_article_chunks), desc="Embedding Chunks"):
-            doc_id = f"{document_id}_chunk_{i}"
-
-            # Skip if already exists
-            existing = collection.get(ids=[doc_id])
-            if existing and existing["ids"]:
-                continue
-
-            # Merge metadata (TF-IDF keywords + article metadata)
-            metadata = {**article_data["metadata"], "keywords": tfidf_keywords[i]}
-
-            batch_docs.append(chunk)
-            batch_ids.append(doc_id)
-            batch_embeddings.append(self.embedder.get_embedding(chunk))
-            batch_metadata.append(metadata)
-
-            # Ensure metadata values are stored as valid types
-            for meta in batch_metadata:
-                for key, value in meta.items():
-                    if isinstance(value, list):
-                        meta[key] = ", ".join(value)
-
-            # Process in batches
-            if len(batch_docs) >= batch_size:
-                collection.add(ids=batch_ids, embeddings=batch_embeddings, documents=batch_docs, metadatas=batch_metadata)
-                batch_docs, batch_ids, batch_embeddings, batch_metadata = [], [], [], []
-
-        # Insert remaining documents
-        if batch_docs:
-            collection.add(ids=batch_ids, embeddings=batch_embeddings, documents=batch_docs, metadatas=batch_metadata)
+        # Merge metadata (TF-IDF keywords + article metadata)
+        self._add_chunks(
+            collection,
+            document_id,
+            texts=[chunk["text"] for chunk in web_article_chunks],
+            embeddings=[chunk["embedding"] for chunk in web_article_chunks],
+            metadatas=[{**article_data["metadata"], "keywords": chunk["keywords"]} for chunk in web_article_chunks],
+        )
 
         print(f"✅ Web article '{url}' stored as '{collection_name}' in ChromaDB!")
 
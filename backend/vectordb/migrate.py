@@ -0,0 +1,108 @@
+"""Move chunks from per-document collections into the shared or sharded layout.
+
+Usage:
+    python -m backend.vectordb.migrate --layout shared
+    python -m backend.vectordb.migrate --layout sharded --shards 8 --delete-source
+
+Chunks are copied with their embeddings (nothing is re-embedded) and gain the
+``document_id``, ``chunk_index`` and ``owner_id`` metadata the shared layouts
+filter on. Writes are upserts, so an interrupted migration can be re-run.
+Set VECTORDB_LAYOUT to the new layout once it finishes.
+"""
+import argparse
+from typing import Dict, Optional
+
+from backend.core.config import settings
+from backend.core.registry import get_vector_client
+from backend.services.vectordb_service import SHARED_COLLECTION, shard_for
+
+def load_owners() -> Dict[str, int]:
+    """Map document IDs to owner IDs from the database."""
+    try:
+        from backend.db.database import SessionLocal
+        from backend.db.models import Document
+
+        db = SessionLocal()
+        try:
+            return {document_id: owner_id for document_id, owner_id in db.query(Document.document_id, Document.owner_id)}
+        finally:
+            db.close()
+    except Exception as e:
+        print(f"Could not load document owners, continuing without them: {e}")
+        return {}
+
+def chunk_index(chunk_id: str) -> int:
+    """Chunk position from an ID of the form ``{document_id}_chunk_{n}``."""
+    try:
+        return int(chunk_id.rsplit("_chunk_", 1)[1])
+    except (IndexError, ValueError):
+        return 0
+
+def target_collection(document_id: str, layout: str, shards: int) -> str:
+    """Collection a document's chunks belong to under the target layout."""
+    if layout == "shared":
+        return SHARED_COLLECTION
+    return f"{SHARED_COLLECTION}_{shard_for(document_id, shards)}"
+
+def migrate(layout: str, persist_dir: Optional[str] = None, shards: Optional[int] = None,
+            batch_size: int = 1000, delete_source: bool = False) -> Dict[str, int]:
+    """Copy every ``doc_*`` collection into the target layout and return chunk counts per document."""
+    if layout not in ("shared", "sharded"):
+        raise ValueError("layout must be 'shared' or 'sharded'")
+
+    persist_dir = persist_dir or settings.VECTORDB_PATH
+    shards = max(1, shards or settings.VECTORDB_SHARDS)
+    client = get_vector_client(persist_dir)
+    owners = load_owners()
+    migrated = {}
+
+    for col in client.list_collections():
+        if not col.name.startswith("doc_"):
+            continue
+        document_id = col.name[len("doc_"):]
+        source = client.get_collection(col.name)
+        destination = client.get_or_create_collection(name=target_collection(document_id, layout, shards))
+
+        copied = 0
+        total = source.count()
+        for offset in range(0, total, batch_size):
+            batch = source.get(limit=batch_size, offset=offset, include=["embeddings", "documents", "metadatas"])
+            if not batch["ids"]:
+                break
+
+            metadatas = []
+            for chunk_id, metadata in zip(batch["ids"], batch["metadatas"]):
+                metadata = dict(metadata or {})
+                metadata["document_id"] = document_id
+                metadata["chunk_index"] = chunk_index(chunk_id)
+                if document_id in owners:
+                    metadata["owner_id"] = owners[document_id]
+                metadatas.append(metadata)
+
+            destination.upsert(
+                ids=batch["ids"],
+                embeddings=batch["embeddings"],
+                documents=batch["documents"],
+                metadatas=metadatas
+            )
+            copied += len(batch["ids"])
+
+        migrated[document_id] = copied
+        print(f"Migrated {copied} chunks of '{document_id}' to '{destination.name}'")
+
+        if delete_source and copied == total:
+            client.delete_collection(col.name)
+
+    return migrated
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migrate per-document Chroma collections to a shared layout.")
+    parser.add_argument("--layout", choices=["shared", "sharded"], default="shared")
+    parser.add_argument("--shards", type=int, default=None, help="Number of shards for the sharded layout")
+    parser.add_argument("--persist-dir", default=None, help="Chroma directory (defaults to VECTORDB_PATH)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--delete-source", action="store_true", help="Drop each per-document collection once copied")
+    args = parser.parse_args()
+
+    result = migrate(args.layout, args.persist_dir, args.shards, args.batch_size, args.delete_source)
+    print(f"Migrated {sum(result.values())} chunks from {len(result)} documents.")
@@ -3,6 +3,7 @@ import requests
 import json
 import os
 import uuid
+import time
 from dotenv import load_dotenv
 import redis
 
@@ -95,12 +96,29 @@ def reset_session():
     st.session_state.chat_history = []
 
 # Document functions
+def wait_for_job(job_id, timeout=600, interval=1.0):
+    """Poll an ingestion job until it completes or fails."""
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = api_request("GET", f"/documents/jobs/{job_id}")
+        if not job:
+            return None
+        if job["status"] == "completed":
+            return job
+        if job["status"] == "failed":
+            st.error(f"Processing failed: {job.get('error')}")
+            return None
+        time.sleep(interval)
+
+    st.error("Processing is taking longer than expected. The document will appear once it is ready.")
+    return None
+
 def upload_pdf(file):
     """Upload a PDF document."""
     files = {"file": file}
     response = api_request("POST", "/documents/upload-pdf", files=files)
 
-    if response:
+    if response and wait_for_job(response["job_id"]):
         st.session_state.current_document_id = response["document_id"]
         return response
 
@@ -113,7 +131,7 @@ def add_web_article(url):
     encoded_url = urllib.parse.quote(url)
     response = api_request("POST", f"/documents/add-web-article?url={encoded_url}")
 
-    if response:
+    if response and wait_for_job(response["job_id"]):
         st.session_state.current_document_id = response["document_id"]
         return response
 
@@ -135,6 +153,36 @@ def create_chat_session(document_id):
 
     return None
 
+def fetch_chat_history(session_id, limit=200):
+    """Fetch a session's full chat history page by page."""
+    messages = []
+    cursor = 0
+    while cursor is not None:
+        response = api_request("GET", f"/chat/history/{session_id}?cursor={cursor}&limit={limit}")
+        if not response:
+            return None
+        messages.extend(response["messages"])
+        cursor = response["next_cursor"]
+    return messages
+
+def update_chat_history(response):
+    """Add the new turn to the local chat history, resyncing if turns were missed."""
+    cursor = response.get("history_cursor")
+    local = st.session_state.chat_history
+
+    if cursor is not None and len(local) == cursor - 2:
+        local.extend([{"user": response["query"]}, {"bot": response["response"]}])
+    elif cursor is not None:
+        # Another tab or a reset changed the session; fetch it again
+        history = fetch_chat_history(response["session_id"])
+        if history is not None:
+            st.session_state.chat_history = history
+    elif response.get("chat_history"):
+        st.session_state.chat_history = [
+            msg for msg in response["chat_history"]
+            if msg.get("user") is not None or msg.get("bot") is not None
+        ]
+
 def query_document(query, document_id, session_id=None):
     """Query a document and get a response."""
     # Get session ID from Redis if not provided
@@ -146,7 +194,8 @@ def query_document(query, document_id, session_id=None):
     data = {
         "query": query,
         "document_id": document_id,
-        "session_id": session_id
+        "session_id": session_id,
+        "incremental": True
     }
 
     response = api_request("POST", "/chat/query", data)
@@ -156,22 +205,60 @@ def query_document(query, document_id, session_id=None):
             # Store the session ID in Redis if not already stored
             redis_client.set(f"chat_session:{st.session_state.session_id}", response["session_id"])
 
-        if "chat_history" in response:
-            # Filter out any messages with None values
-            filtered_history = []
-            for msg in response["chat_history"]:
-                if isinstance(msg, dict):
-                    if ("user" in msg and msg["user"] is not None) or ("bot" in msg and msg["bot"] is not None):
-                        filtered_history.append(msg)
-                else:
-                    filtered_history.append(msg)
-
-            st.session_state.chat_history = filtered_history
+        update_chat_history(response)
 
         return response
 
     return None
 
+def stream_query_document(query, document_id, session_id=None, on_token=None):
+    """Query a document and stream the response, calling on_token with the text so far."""
+    # Get session ID from Redis if not provided
+    if not session_id:
+        stored_session_id = redis_client.get(f"chat_session:{st.session_state.session_id}")
+        if stored_session_id:
+            session_id = stored_session_id.decode('utf-8')
+
+    data = {
+        "query": query,
+        "document_id": document_id,
+        "session_id": session_id,
+        "incremental": True
+    }
+    url = f"{API_URL}/chat/query/stream?session_id={st.session_state.session_id}"
+
+    try:
+        with requests.post(url, json=data, stream=True, timeout=(10, 300)) as response:
+            if response.status_code >= 400:
+                st.error(f"Error: {response.status_code} - {response.text}")
+                return None
+
+            text = ""
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    payload = json.loads(line[len("data:"):].strip())
+                    if event == "token":
+                        text += payload["text"]
+                        if on_token:
+                            on_token(text)
+                    elif event == "error":
+                        st.error(payload["detail"])
+                        return None
+                    elif event == "done":
+                        if not redis_client.get(f"chat_session:{st.session_state.session_id}"):
+                            # Store the session ID in Redis if not already stored
+                            redis_client.set(f"chat_session:{st.session_state.session_id}", payload["session_id"])
+
+                        update_chat_history(payload)
+                        return payload
+    except Exception as e:
+        st.error(f"API Error: {str(e)}")
+
+    return None
+
 def reset_chat_session():
     """Reset a chat session."""
     # Get session ID from Redis
@@ -218,11 +305,12 @@ def delete_document(document_id):
     return response
 
 # Summary functions
-def generate_document_summary(document_id, max_length=500):
+def generate_document_summary(document_id, max_length=500, force=False):
     """Generate a summary for a document."""
     data = {
         "document_id": document_id,
-        "max_length": max_length
+        "max_length": max_length,
+        "force": force
     }
 
     return api_request("POST", "/summaries/document", data)
@@ -233,11 +321,13 @@ def generate_semantic_summary(highlights):
     return api_request("POST", "/summaries/semantic", data)
 
 # Study guide functions
-def generate_study_guide(document_id, format="markdown"):
+def generate_study_guide(document_id, format="markdown", mode="quick", force=False):
     """Generate a study guide for a document."""
     data = {
         "document_id": document_id,
-        "format": format
+        "format": format,
+        "mode": mode,
+        "force": force
     }
 
     return api_request("POST", "/study-guides/generate", data)
@@ -358,25 +448,33 @@ if st.session_state.current_document_id:
 
         # Process the query if the flag is set
         if st.session_state.process_query:
-            with st.spinner("Generating response..."):
-                # Get session ID from Redis
-                stored_session_id = redis_client.get(f"chat_session:{st.session_state.session_id}")
-                session_id = None
-                if stored_session_id:
-                    session_id = stored_session_id.decode('utf-8')
-
-                response = query_document(
-                    query=st.session_state.current_query,
-                    document_id=st.session_state.current_document_id,
-                    session_id=session_id
-                )
-
-                # Reset the flag
-                st.session_state.process_query = False
+            # Get session ID from Redis
+            stored_session_id = redis_client.get(f"chat_session:{st.session_state.session_id}")
+            session_id = None
+            if stored_session_id:
+                session_id = stored_session_id.decode('utf-8')
+
+            # Render tokens as they arrive
+            st.markdown(f"**You:** {st.session_state.current_query}")
+            answer_placeholder = st.empty()
+            answer_placeholder.markdown("**AI:** ...")
+
+            response = stream_query_document(
+                query=st.session_state.current_query,
+                document_id=st.session_state.current_document_id,
+                session_id=session_id,
+                on_token=lambda text: answer_placeholder.markdown(f"**AI:** {text}▌")
+            )
+
+            # Reset the flag
+            st.session_state.process_query = False
 
-                # Force a rerun to update the chat display
-                if response and "chat_history" in response and response["chat_history"]:
-                    st.rerun()
+            # Force a rerun to update the chat display
+            if response:
+                st.rerun()
+            else:
+                # Drop a partial answer from a failed stream
+                answer_placeholder.empty()
 
         # Define a callback function for resetting the chat
         def reset_chat():
@@ -435,9 +533,12 @@ if st.session_state.current_document_id:
     with tab3:
         st.header("📝 Document Summary")
 
+        regenerate_summary = st.checkbox("Regenerate", key="regenerate_summary",
+                                         help="Ignore the saved summary and generate a new one")
+
         if st.button("Generate Summary"):
             with st.spinner("Generating summary..."):
-                summary = generate_document_summary(st.session_state.current_document_id)
+                summary = generate_document_summary(st.session_state.current_document_id, force=regenerate_summary)
 
                 if summary:
                     st.success("Summary generated!")
@@ -446,9 +547,17 @@ if st.session_state.current_document_id:
     with tab4:
         st.header("📚 Study Guide")
 
+        full_guide = st.checkbox("Detailed guide (concepts, analogies and FAQs from the whole document)")
+        regenerate_guide = st.checkbox("Regenerate", key="regenerate_study_guide",
+                                       help="Ignore the saved study guide and generate a new one")
+
         if st.button("Generate Study Guide"):
             with st.spinner("Generating study guide..."):
-                study_guide = generate_study_guide(st.session_state.current_document_id)
+                study_guide = generate_study_guide(
+                    st.session_state.current_document_id,
+                    mode="full" if full_guide else "quick",
+                    force=regenerate_guide
+                )
 
                 if study_guide:
                     st.success("Study guide generated!")
@@ -465,6 +574,13 @@ if st.session_state.current_document_id:
                     with st.expander("Review Questions", expanded=False):
                         for i, question in enumerate(study_guide["review_questions"], 1):
                             st.markdown(f"{i}. {question}")
+
+                    # Display the detailed sections
+                    sections = study_guide.get("sections") or {}
+                    for title, key in [("Analogies", "analogies"), ("FAQs", "faqs")]:
+                        if sections.get(key):
+                            with st.expander(title, expanded=False):
+                                st.markdown(sections[key])
 else:
     st.title("📚 DocuMind - AI-Powered Knowledge Management")
     st.write("Please select or upload a document from the sidebar to get started.")
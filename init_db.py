@@ -1,5 +1,5 @@
 from backend.db.database import engine
-from backend.db.models import Base, User, Document, Highlight, ChatSession, ChatMessage
+from backend.db.models import Base, User, Document, Highlight, ChatSession, ChatMessage, ChatSessionState, DocumentArtifact
 
 def init_db():
     print("Creating database tables...")
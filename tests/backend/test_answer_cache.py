@@ -0,0 +1,51 @@
+from unittest.mock import patch
+
+from backend.utils.answer_cache import SemanticAnswerCache
+
+def test_lookup_similar_query():
+    """Test a similar query reuses the cached answer and a different one does not."""
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("doc1", "Summarize this", [1.0, 0.0], "A summary.")
+
+    # Check the result
+    assert cache.lookup("doc1", [0.99, 0.05]) == "A summary."
+    assert cache.lookup("doc1", [0.0, 1.0]) is None
+    assert cache.lookup("doc2", [1.0, 0.0]) is None
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["hit_rate"] == round(1 / 3, 4)
+
+def test_ttl_and_lru_eviction():
+    """Test entries expire after the TTL and the least recently used are evicted."""
+    cache = SemanticAnswerCache(threshold=0.9, ttl=10, max_entries=2)
+
+    with patch("backend.utils.answer_cache.time.monotonic", return_value=0):
+        cache.store("doc1", "first", [1.0, 0.0, 0.0], "one")
+        cache.store("doc1", "second", [0.0, 1.0, 0.0], "two")
+        cache.lookup("doc1", [1.0, 0.0, 0.0])
+        cache.store("doc1", "third", [0.0, 0.0, 1.0], "three")
+
+        # Check the result
+        assert cache.lookup("doc1", [1.0, 0.0, 0.0]) == "one"
+        assert cache.lookup("doc1", [0.0, 1.0, 0.0]) is None
+
+    with patch("backend.utils.answer_cache.time.monotonic", return_value=11):
+        assert cache.lookup("doc1", [1.0, 0.0, 0.0]) is None
+        assert cache.stats()["entries"] == 0
+
+def test_invalidate_document():
+    """Test invalidating a document drops its answers and library-wide answers."""
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("doc1", "question", [1.0, 0.0], "doc1 answer")
+    cache.store("doc2", "question", [1.0, 0.0], "doc2 answer")
+    cache.store(None, "question", [1.0, 0.0], "library answer")
+
+    # Invalidate one document
+    cache.invalidate("doc1")
+
+    # Check the result
+    assert cache.lookup("doc1", [1.0, 0.0]) is None
+    assert cache.lookup(None, [1.0, 0.0]) is None
+    assert cache.lookup("doc2", [1.0, 0.0]) == "doc2 answer"
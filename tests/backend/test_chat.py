@@ -1,7 +1,12 @@
+import asyncio
+import threading
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
+from langchain_core.messages import HumanMessage, AIMessage
 
 from backend.services.chat_service import ChatService
+from backend.services.llm_service import ERROR_RESPONSE
+from backend.utils.answer_cache import SemanticAnswerCache
 
 @pytest.fixture
 def chat_service():
@@ -14,6 +19,7 @@ def chat_service():
         service = ChatService()
         service.vectordb_service = mock_vectordb.return_value
         service.llm_service = mock_llm.return_value
+        service.answer_cache = None
         
         # Mock memory
         mock_memory = MagicMock()
@@ -85,6 +91,201 @@ def test_process_query_existing_session(chat_service):
     assert result["response"] == "This is a test response."
     assert result["session_id"] == "existing_session"
 
+def test_aprocess_query(chat_service):
+    """Test processing a query through the async path."""
+    # Mock VectorDBService
+    chat_service.vectordb_service.hybrid_query.return_value = (
+        ["Document 1", "Document 2"],
+        [{"keywords": ["key1", "key2"]}, {"keywords": ["key3", "key4"]}]
+    )
+    
+    # Mock LLMService
+    chat_service.llm_service.agenerate_rag_response = AsyncMock(return_value="This is a test response.")
+    
+    # Process a query
+    result = asyncio.run(chat_service.aprocess_query(
+        query="What is RAG?",
+        document_id="test_doc",
+        session_id="existing_session"
+    ))
+    
+    # Check the result
+    assert result["response"] == "This is a test response."
+    assert result["session_id"] == "existing_session"
+    chat_service.llm_service.agenerate_rag_response.assert_awaited_once()
+    chat_service.llm_service.generate_rag_response.assert_not_called()
+
+def test_aprocess_query_session_io_off_event_loop(chat_service):
+    """Test the async path reads and saves the session outside the event loop thread."""
+    chat_service.vectordb_service.hybrid_query.return_value = (["Document 1"], [{"keywords": []}])
+    chat_service.llm_service.agenerate_rag_response = AsyncMock(return_value="This is a test response.")
+
+    threads = []
+    memory = MagicMock()
+    memory.load_memory_variables.side_effect = lambda inputs: threads.append(threading.current_thread()) or {"history": []}
+    memory.save_context.side_effect = lambda *args: threads.append(threading.current_thread())
+
+    with patch("backend.services.chat_service.get_session_memory", return_value=memory):
+        asyncio.run(chat_service.aprocess_query(query="What is RAG?", document_id="test_doc", session_id="s1"))
+
+    # Check the result
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
+
+def test_process_query_answer_cache(chat_service):
+    """Test a repeated question is answered from the cache without retrieval or the LLM."""
+    chat_service.answer_cache = SemanticAnswerCache(threshold=0.9)
+    chat_service.vectordb_service.embedder.get_embedding.return_value = [1.0, 0.0, 0.0]
+    chat_service.vectordb_service.hybrid_query.return_value = (["Document 1"], [{"keywords": []}])
+    chat_service.llm_service.generate_rag_response.return_value = "This is a test response."
+
+    # Ask the same question twice
+    first = chat_service.process_query(query="Summarize this", document_id="test_doc", session_id="s1")
+    second = chat_service.process_query(query="Summarize this please", document_id="test_doc", session_id="s2")
+
+    # Check the result
+    assert first["response"] == second["response"] == "This is a test response."
+    chat_service.llm_service.generate_rag_response.assert_called_once()
+    chat_service.vectordb_service.hybrid_query.assert_called_once()
+    assert chat_service.answer_cache.stats()["hits"] == 1
+
+def test_process_query_error_not_cached(chat_service):
+    """Test a provider error is not cached as the answer to similar questions."""
+    chat_service.answer_cache = SemanticAnswerCache(threshold=0.9)
+    chat_service.vectordb_service.embedder.get_embedding.return_value = [1.0, 0.0, 0.0]
+    chat_service.vectordb_service.hybrid_query.return_value = (["Document 1"], [{"keywords": []}])
+    chat_service.llm_service.generate_rag_response.side_effect = [ERROR_RESPONSE, "This is a test response."]
+
+    # Ask the same question twice
+    first = chat_service.process_query(query="Summarize this", document_id="test_doc", session_id="s1")
+    second = chat_service.process_query(query="Summarize this", document_id="test_doc", session_id="s2")
+
+    # Check the result
+    assert first["response"] == ERROR_RESPONSE
+    assert second["response"] == "This is a test response."
+    assert chat_service.answer_cache.stats()["hits"] == 0
+
+def test_astream_query(chat_service):
+    """Test streaming a query yields tokens and saves the full answer."""
+    chat_service.vectordb_service.hybrid_query.return_value = (["Document 1"], [{"keywords": []}])
+
+    async def stream(**kwargs):
+        for delta in ["This is", " a test", " response."]:
+            yield delta
+
+    chat_service.llm_service.astream_rag_response = stream
+
+    async def collect():
+        return [event async for event in chat_service.astream_query(
+            query="What is RAG?",
+            document_id="test_doc",
+            session_id="existing_session"
+        )]
+
+    # Stream the query
+    events = asyncio.run(collect())
+
+    # Check the result
+    assert events[0] == {"event": "start", "session_id": "existing_session"}
+    assert [event["text"] for event in events if event["event"] == "token"] == ["This is", " a test", " response."]
+    assert events[-1]["event"] == "done"
+    assert events[-1]["response"] == "This is a test response."
+    chat_service.llm_service.agenerate_rag_response.assert_not_called()
+
+def test_process_query_incremental(chat_service):
+    """Test incremental mode returns only the new turn and the cursor matches the store."""
+    from backend.utils.chat_memory import StoreChatMessageHistory
+    from backend.utils.session_store import InMemorySessionStore
+
+    chat_service.vectordb_service.hybrid_query.return_value = (["Document 1"], [{"keywords": []}])
+    chat_service.llm_service.generate_rag_response.return_value = "This is a test response."
+
+    store = InMemorySessionStore()
+    store.append("existing_session", [
+        {"role": "user", "content": "What is RAG?"},
+        {"role": "assistant", "content": "Retrieval-augmented generation."}
+    ])
+
+    class BufferMemory:
+        """Same reads and writes as ConversationBufferMemory(return_messages=True)."""
+        def __init__(self, history):
+            self.chat_memory = history
+
+        def load_memory_variables(self, inputs):
+            return {"history": self.chat_memory.messages}
+
+        def save_context(self, inputs, outputs):
+            self.chat_memory.add_user_message(inputs["input"])
+            self.chat_memory.add_ai_message(outputs["output"])
+
+    def get_memory(session_id):
+        return BufferMemory(StoreChatMessageHistory(session_id, store))
+
+    with patch("backend.services.chat_service.get_session_memory", side_effect=get_memory):
+        result = chat_service.process_query(
+            query="How does it work?",
+            document_id="test_doc",
+            session_id="existing_session",
+            incremental=True
+        )
+        full = chat_service.process_query(query="And why?", document_id="test_doc", session_id="existing_session")
+
+    # Check the result
+    assert result["chat_history"] is None
+    assert result["history_cursor"] == 4
+    assert full["history_cursor"] == store.count("existing_session") == 6
+    assert [m.user or m.bot for m in full["chat_history"]] == [
+        "What is RAG?", "Retrieval-augmented generation.",
+        "How does it work?", "This is a test response.",
+        "And why?", "This is a test response."
+    ]
+
+def test_get_history(chat_service):
+    """Test a page of history is returned with the cursor of the next page."""
+    page = [{"role": "user", "content": "What is RAG?"}, {"role": "assistant", "content": "An answer."}]
+
+    with patch("backend.services.chat_service.get_session_page", return_value=(page, 5)) as mock_page:
+        result = chat_service.get_history("existing_session", cursor=1, limit=2)
+
+    # Check the result
+    mock_page.assert_called_once_with("existing_session", 1, 2)
+    assert result["messages"][0].user == "What is RAG?"
+    assert result["messages"][1].bot == "An answer."
+    assert result["next_cursor"] == 3
+    assert result["total"] == 5
+
+def test_astream_query_failure(chat_service):
+    """Test a stream that fails partway ends with an error and saves nothing."""
+    chat_service.answer_cache = MagicMock()
+    chat_service.answer_cache.lookup.return_value = None
+    chat_service.vectordb_service.embedder.get_embedding.return_value = [1.0, 0.0, 0.0]
+    chat_service.vectordb_service.hybrid_query.return_value = (["Document 1"], [{"keywords": []}])
+
+    async def stream(**kwargs):
+        yield "This is"
+        raise RuntimeError("connection reset")
+
+    chat_service.llm_service.astream_rag_response = stream
+    memory = MagicMock()
+    memory.load_memory_variables.return_value = {"history": []}
+
+    async def collect():
+        return [event async for event in chat_service.astream_query(
+            query="What is RAG?",
+            document_id="test_doc",
+            session_id="existing_session"
+        )]
+
+    # Stream the query
+    with patch("backend.services.chat_service.get_session_memory", return_value=memory):
+        events = asyncio.run(collect())
+
+    # Check the result
+    assert [event["event"] for event in events] == ["start", "token", "error"]
+    assert "connection reset" in events[-1]["detail"]
+    memory.save_context.assert_not_called()
+    chat_service.answer_cache.store.assert_not_called()
+
 def test_reset_session(chat_service):
     """Test resetting a chat session."""
     # Reset a session
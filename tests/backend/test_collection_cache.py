@@ -0,0 +1,41 @@
+import pytest
+from unittest.mock import MagicMock, patch
+
+from backend.utils.collection_cache import CollectionCache
+
+def test_collection_cache_reuses_metadata():
+    """Test handles, counts and the collection list are fetched once while fresh."""
+    cache = CollectionCache(ttl=60)
+    client = MagicMock()
+    collection = client.get_collection.return_value
+    collection.name = "doc_a"
+    collection.count.return_value = 3
+    client.list_collections.return_value = [collection]
+
+    # Look everything up twice
+    for _ in range(2):
+        handle = cache.get_collection(client, "doc_a")
+        assert cache.count(handle) == 3
+        assert cache.list_names(client) == ["doc_a"]
+
+    # Check the result
+    client.get_collection.assert_called_once_with("doc_a")
+    collection.count.assert_called_once()
+    client.list_collections.assert_called_once()
+    assert cache.stats()["hits"] == 3
+
+def test_collection_cache_invalidate_and_expiry():
+    """Test invalidation and TTL expiry force a fresh lookup."""
+    cache = CollectionCache(ttl=60)
+    client = MagicMock()
+
+    # Invalidate a cached handle
+    cache.get_collection(client, "doc_a")
+    cache.invalidate("doc_a")
+    cache.get_collection(client, "doc_a")
+    assert client.get_collection.call_count == 2
+
+    # Let the entry expire
+    with patch("backend.utils.collection_cache.time.monotonic", return_value=1e12):
+        cache.get_collection(client, "doc_a")
+    assert client.get_collection.call_count == 3
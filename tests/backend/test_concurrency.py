@@ -0,0 +1,76 @@
+import pytest
+import time
+from unittest.mock import patch
+
+from backend.core.concurrency import RateLimiter, scatter_gather
+
+def test_scatter_gather():
+    """Test every task's result is collected."""
+    # Run the tasks
+    results, failed = scatter_gather(lambda x: x * 2, [1, 2, 3], timeout=5)
+
+    # Check the result
+    assert sorted(results) == [2, 4, 6]
+    assert failed == 0
+
+def test_scatter_gather_deadline_returns_partial_results():
+    """Test tasks missing the deadline are dropped instead of delaying the caller."""
+    def task(delay):
+        time.sleep(delay)
+        return delay
+
+    # Run the tasks with a short deadline
+    started = time.monotonic()
+    results, failed = scatter_gather(task, [0, 0, 1.0], timeout=0.2)
+
+    # Check the result
+    assert time.monotonic() - started < 0.9
+    assert results == [0, 0]
+    assert failed == 1
+
+def test_scatter_gather_counts_errors():
+    """Test a failing task is counted without losing the others."""
+    def task(x):
+        if x == 2:
+            raise ValueError("boom")
+        return x
+
+    # Run the tasks
+    results, failed = scatter_gather(task, [1, 2, 3], timeout=5)
+
+    # Check the result
+    assert sorted(results) == [1, 3]
+    assert failed == 1
+
+def test_rate_limiter_allows_burst_then_spaces_calls():
+    """Test calls beyond the burst wait for their slot."""
+    limiter = RateLimiter(per_minute=600, burst=2)
+
+    # Make three calls
+    started = time.monotonic()
+    for _ in range(3):
+        limiter.acquire()
+
+    # Check the result
+    elapsed = time.monotonic() - started
+    assert 0.05 <= elapsed < 0.5
+
+def test_rate_limiter_burst_counts_against_limit():
+    """Test no 60-second window gets more than ``per_minute`` calls, burst included."""
+    limiter = RateLimiter(per_minute=60, burst=8)
+    clock = [0.0]
+
+    def sleep(seconds):
+        clock[0] += seconds
+
+    # Call as fast as allowed for three minutes
+    calls = []
+    with patch("backend.core.concurrency.time.monotonic", side_effect=lambda: clock[0]), \
+         patch("backend.core.concurrency.time.sleep", side_effect=sleep):
+        while clock[0] < 180:
+            limiter.acquire()
+            calls.append(clock[0])
+
+    # Check the result
+    assert calls[:8] == [0.0] * 8
+    assert max(sum(1 for t in calls if start <= t < start + 60) for start in calls) <= 60
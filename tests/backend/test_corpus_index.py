@@ -0,0 +1,87 @@
+import pytest
+
+from backend.utils.corpus_index import CorpusIndex, reciprocal_rank_fusion
+
+@pytest.fixture
+def corpus_index():
+    """Create an in-memory CorpusIndex with two documents."""
+    index = CorpusIndex(path=None)
+    index.add_chunks("doc1", [
+        ("doc1_chunk_0", "Neural networks learn representations from data."),
+        ("doc1_chunk_1", "Backpropagation trains neural networks with data."),
+    ])
+    index.add_chunks("doc2", [
+        ("doc2_chunk_0", "Photosynthesis converts light into chemical energy with data."),
+    ])
+    yield index
+
+def test_add_chunks_updates_statistics(corpus_index):
+    """Test adding chunks updates document frequencies and corpus counts."""
+    # Check the result
+    assert corpus_index.stats()["chunk_count"] == 3
+    frequencies = corpus_index.document_frequencies(["data", "neural", "photosynthesis", "missing"])
+    assert frequencies == {"data": 3, "neural": 2, "photosynthesis": 1}
+
+def test_add_chunks_replaces_existing(corpus_index):
+    """Test re-indexing a chunk replaces its old terms instead of double counting."""
+    # Re-index a chunk with new text
+    corpus_index.add_chunks("doc2", [("doc2_chunk_0", "Chlorophyll absorbs light.")])
+
+    # Check the result
+    assert corpus_index.stats()["chunk_count"] == 3
+    frequencies = corpus_index.document_frequencies(["data", "photosynthesis", "chlorophyll"])
+    assert frequencies == {"data": 2, "chlorophyll": 1}
+
+def test_replace_drops_only_unused_terms(corpus_index):
+    """Test re-indexing deletes the terms it left unused by key, without scanning the vocabulary."""
+    vocabulary_size = corpus_index.stats()["vocabulary_size"]
+    statements = []
+    corpus_index._conn.set_trace_callback(statements.append)
+
+    # Re-index a chunk, dropping four of its words and adding one
+    corpus_index.add_chunks("doc2", [("doc2_chunk_0", "Photosynthesis data chlorophyll")])
+
+    # Check the result
+    deletes = [statement for statement in statements if statement.startswith("DELETE FROM terms")]
+    assert deletes and all("term_id = " in statement for statement in deletes)
+    assert corpus_index.stats()["vocabulary_size"] == vocabulary_size - 3
+    assert corpus_index.document_frequencies(["photosynthesis", "light"]) == {"photosynthesis": 1}
+
+def test_remove_document(corpus_index):
+    """Test removing a document drops its chunks and terms."""
+    # Remove the document
+    corpus_index.remove_document("doc1")
+
+    # Check the result
+    stats = corpus_index.stats()
+    assert stats["chunk_count"] == 1
+    assert corpus_index.document_frequencies(["neural", "data"]) == {"data": 1}
+
+def test_keywords_use_corpus_idf(corpus_index):
+    """Test keywords favour terms that are rare across the whole library."""
+    # Score keywords for a stored chunk
+    keywords = corpus_index.chunk_keywords(["doc2_chunk_0"], top_n=10)["doc2_chunk_0"]
+
+    # Check the result: "data" appears in every chunk, so it ranks last
+    assert keywords[-1] == "data"
+    assert "photosynthesis" in keywords
+
+def test_bm25_search(corpus_index):
+    """Test BM25 ranks exact term matches and can be limited to one document."""
+    # Search the whole library
+    results = corpus_index.bm25_search("backpropagation neural", top_k=5)
+
+    # Check the result
+    assert results[0][0] == "doc1_chunk_1"
+    assert {chunk_id for chunk_id, _, _ in results} == {"doc1_chunk_0", "doc1_chunk_1"}
+
+    # Search a single document
+    assert corpus_index.bm25_search("neural", document_id="doc2") == []
+
+def test_reciprocal_rank_fusion():
+    """Test weighted reciprocal rank fusion of two rankings."""
+    # Fuse the rankings
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["c", "d"]], weights=[1.0, 2.0], k=1)
+
+    # Check the result
+    assert [item for item, _ in fused] == ["c", "d", "a", "b"]
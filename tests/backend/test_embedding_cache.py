@@ -0,0 +1,102 @@
+import pytest
+import os
+import tempfile
+import numpy as np
+
+from backend.utils.cache import PersistentLRUCache
+from backend.utils.completion_cache import CompletionCache
+from backend.utils.embedding_cache import EmbeddingCache
+
+@pytest.fixture
+def cache_path():
+    """Create a temporary path for the on-disk cache tier."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        yield os.path.join(temp_dir, "cache.sqlite3")
+
+def test_embedding_cache_normalizes_text(cache_path):
+    """Test whitespace differences map to the same cache entry."""
+    cache = EmbeddingCache(path=cache_path)
+    cache.set("model", "hello   world\n", [1.0, 2.0])
+
+    # Look up a differently spaced copy
+    result = cache.get("model", " hello world")
+
+    # Check the result
+    assert result is not None
+    assert result.tolist() == [1.0, 2.0]
+    assert cache.get("other-model", "hello world") is None
+
+def test_embedding_cache_disk_tier(cache_path):
+    """Test embeddings survive a new cache instance through the disk tier."""
+    EmbeddingCache(path=cache_path).set("model", "persisted", np.ones(4))
+
+    # Open a fresh cache on the same file
+    cache = EmbeddingCache(path=cache_path)
+    result = cache.get("model", "persisted")
+
+    # Check the result
+    assert result.tolist() == [1.0, 1.0, 1.0, 1.0]
+    assert cache.stats()["disk_hits"] == 1
+
+def test_memory_tier_is_bounded():
+    """Test the memory tier evicts the least recently used entry."""
+    cache = PersistentLRUCache(path=None, memory_items=2)
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    cache.get("a")
+    cache.set("c", b"3")
+
+    # Check the result
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert cache.stats()["misses"] == 1
+
+def test_disk_tier_size_eviction(cache_path):
+    """Test the disk tier is trimmed when it exceeds its size limit."""
+    cache = PersistentLRUCache(path=cache_path, memory_items=1, max_bytes=100)
+    for i in range(10):
+        cache.set(f"key_{i}", b"x" * 20)
+
+    # Check the oldest entries were evicted from disk
+    assert cache.stats()["disk_bytes"] <= 100
+    assert cache.get("key_0") is None
+    assert cache.get("key_9") == b"x" * 20
+
+def test_disk_bytes_on_replace(cache_path):
+    """Test replacing a key counts its bytes once."""
+    cache = PersistentLRUCache(path=cache_path, max_bytes=1000)
+    for _ in range(10):
+        cache.set("key", b"x" * 20)
+
+    # Check the result
+    assert cache.stats()["disk_bytes"] == 20
+    assert cache.get("key") == b"x" * 20
+
+def test_disk_reads_batch_access_times(cache_path):
+    """Test disk hits don't write until a batch of access times is due."""
+    PersistentLRUCache(path=cache_path).set_many({f"key_{i}": b"x" for i in range(4)})
+    cache = PersistentLRUCache(path=cache_path, memory_items=1, touch_batch=3)
+    statements = []
+    cache._conn.set_trace_callback(statements.append)
+
+    cache.get("key_0")
+    cache.get("key_1")
+
+    # Check the result
+    assert not any(statement.startswith("UPDATE") for statement in statements)
+    cache.get("key_2")
+    assert sum(statement.startswith("UPDATE") for statement in statements) == 3
+
+def test_completion_cache_keys_on_params(cache_path):
+    """Test completions are keyed by every request parameter and persist to disk."""
+    params = {"model": "llama", "messages": [{"role": "user", "content": "Hi"}], "temperature": 0.5}
+    CompletionCache(path=cache_path).set("together", params, "Hello!")
+
+    # Look up through a fresh instance
+    cache = CompletionCache(path=cache_path)
+
+    # Check the result
+    assert cache.get("together", dict(params)) == "Hello!"
+    assert cache.get("together", {**params, "temperature": 1.0}) is None
+    assert cache.get("groq", params) is None
@@ -0,0 +1,115 @@
+import pytest
+import numpy as np
+from unittest.mock import patch, MagicMock
+
+from backend.utils.embeddings import Embedder
+from backend.utils.embedding_cache import EmbeddingCache
+
+@pytest.fixture
+def embedder():
+    """Create an Embedder with a mocked SentenceTransformer."""
+    with patch("backend.utils.embeddings.SentenceTransformer") as mock_model, \
+         patch("backend.utils.embeddings.get_embedding_cache", return_value=None):
+        service = Embedder()
+        service.model = mock_model.return_value
+        service.cache = None
+        service.model.get_sentence_embedding_dimension.return_value = 3
+        service.model.encode.side_effect = lambda texts, **kwargs: np.arange(
+            len(texts) * 3, dtype=np.float64
+        ).reshape(len(texts), 3)
+
+        yield service
+
+def test_embed_batch(embedder):
+    """Test embedding a list of texts in a single encode call."""
+    # Embed the texts
+    result = embedder.embed_batch(["first", "second"], batch_size=8)
+
+    # Check the result
+    assert result.shape == (2, 3)
+    assert result.dtype == np.float32
+    assert result.flags["C_CONTIGUOUS"]
+    embedder.model.encode.assert_called_once()
+    assert embedder.model.encode.call_args.kwargs["batch_size"] == 8
+
+def test_embed_batch_empty(embedder):
+    """Test embedding an empty list of texts."""
+    # Embed nothing
+    result = embedder.embed_batch([])
+
+    # Check the result
+    assert result.shape == (0, 3)
+    embedder.model.encode.assert_not_called()
+
+def test_embed_documents(embedder):
+    """Test embedding several documents in one pass."""
+    # Embed two documents
+    result = embedder.embed_documents([["a", "b"], ["c"]])
+
+    # Check the result
+    assert len(result) == 2
+    assert result[0].shape == (2, 3)
+    assert result[1].shape == (1, 3)
+    embedder.model.encode.assert_called_once()
+
+def test_prepare_chunks(embedder):
+    """Test preparing chunks with batched embeddings."""
+    # Prepare chunks
+    chunks = embedder.prepare_chunks([
+        "Neural networks learn representations.",
+        "Gradient descent minimizes the loss."
+    ])
+
+    # Check the result
+    assert len(chunks) == 2
+    assert chunks[0]["embedding"] == [0.0, 1.0, 2.0]
+    assert chunks[1]["embedding"] == [3.0, 4.0, 5.0]
+    assert "keywords" in chunks[0]
+    embedder.model.encode.assert_called_once()
+
+def test_embed_batch_uses_cache(embedder):
+    """Test cached texts skip the model."""
+    # Use a memory-only cache
+    embedder.cache = EmbeddingCache(path=None)
+    embedder.embed_batch(["first", "second"])
+
+    # Embed a mix of cached and new texts
+    result = embedder.embed_batch(["second", "third"])
+
+    # Check only the new text was encoded
+    assert result.shape == (2, 3)
+    assert embedder.model.encode.call_count == 2
+    assert embedder.model.encode.call_args.args[0] == ["third"]
+    assert embedder.cache.stats()["memory_hits"] == 1
+
+def test_iter_chunks_spans_pages(embedder):
+    """Test streamed chunks carry text and overlap across page boundaries."""
+    pages = [" ".join(f"page{p}word{i}" for i in range(150)) for p in range(3)]
+
+    # Chunk the pages as a stream
+    chunks = list(embedder.iter_chunks(iter(pages)))
+
+    # Check the result
+    assert all(len(chunk) <= 1000 for chunk in chunks)
+    assert any("page0word149 page1word0" in chunk for chunk in chunks)
+    assert "page2word149" in chunks[-1]
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current.split()[0] in previous
+
+def test_stream_pdf_windows(embedder):
+    """Test a PDF is embedded in bounded windows with running progress."""
+    pages = [" ".join(f"page{p}word{i}" for i in range(150)) for p in range(4)]
+    embedder.iter_pdf_page_timings = MagicMock(return_value=iter(
+        [(number, page, 0.1 * number) for number, page in enumerate(pages)]
+    ))
+    progress = MagicMock()
+
+    # Stream the PDF
+    windows = list(embedder.stream_pdf("test.pdf", window_size=2, progress=progress))
+
+    # Check the result
+    assert all(len(window) <= 2 for window in windows)
+    total = sum(len(window) for window in windows)
+    assert embedder.model.encode.call_count == len(windows)
+    progress.assert_any_call(chunks_embedded=total)
+    progress.assert_any_call(pages_parsed=4, slowest_page=3, slowest_page_seconds=0.3)
@@ -0,0 +1,101 @@
+import asyncio
+import numpy as np
+from unittest.mock import MagicMock, AsyncMock
+from langchain_core.messages import HumanMessage, AIMessage
+
+from backend.services.history_window import HistoryWindow, estimate_tokens, split_turns
+from backend.services.llm_service import ERROR_RESPONSE
+
+def make_messages(count):
+    """Build ``count`` question/answer turns."""
+    messages = []
+    for i in range(count):
+        messages.append(HumanMessage(content=f"Question {i}"))
+        messages.append(AIMessage(content=f"Answer {i}"))
+    return messages
+
+def test_split_turns():
+    """Test messages are paired into turns, including an unanswered question."""
+    turns = split_turns(make_messages(2) + [HumanMessage(content="Pending")])
+
+    # Check the result
+    assert turns == [("Question 0", "Answer 0"), ("Question 1", "Answer 1"), ("Pending", "")]
+
+def test_older_turns_folded_incrementally():
+    """Test older turns are summarized a block at a time and the summary is reused."""
+    llm_service = MagicMock()
+    llm_service.get_together_response.side_effect = lambda prompt: f"summary {llm_service.get_together_response.call_count}"
+    window = HistoryWindow(llm_service, recent_turns=2, summary_block=2, relevant_turns=0)
+
+    history = window.build("s1", make_messages(6), "Next?")
+
+    # Check the result
+    assert llm_service.get_together_response.call_count == 2
+    assert "Summary of earlier conversation:\nsummary 2" in history
+    assert "Question 4" in history and "Question 5" in history
+    assert "Question 0" not in history
+
+    # One more turn leaves a partial block, which stays verbatim
+    history = window.build("s1", make_messages(7), "Next?")
+    assert llm_service.get_together_response.call_count == 2
+    assert "Question 4" in history
+
+    window.build("s1", make_messages(8), "Next?")
+    assert llm_service.get_together_response.call_count == 3
+
+def test_token_budget_and_failed_summary():
+    """Test the history fits the budget and a failed summary is retried later."""
+    llm_service = MagicMock()
+    llm_service.get_together_response.return_value = ERROR_RESPONSE
+    window = HistoryWindow(llm_service, token_budget=20, recent_turns=1, summary_block=1, relevant_turns=0)
+
+    history = window.build("s1", make_messages(5))
+
+    # Check the result
+    assert estimate_tokens(history) <= 21
+    assert ERROR_RESPONSE not in history
+    assert "Question 4" in history
+
+    window.build("s1", make_messages(5))
+    assert llm_service.get_together_response.call_count == 2
+
+def test_relevant_turns_recalled():
+    """Test the earlier turn most similar to the query is recalled."""
+    llm_service = MagicMock()
+    llm_service.aget_together_response = AsyncMock(return_value="summary")
+    embedder = MagicMock()
+    embedder.embed_batch.side_effect = lambda texts: np.array(
+        [[1.0, 0.0] if "1" in text or "photosynthesis" in text else [0.0, 1.0] for text in texts]
+    )
+    window = HistoryWindow(llm_service, embedder=embedder, recent_turns=1, summary_block=4, relevant_turns=1)
+
+    history = asyncio.run(window.abuild("s1", make_messages(5), "photosynthesis"))
+
+    # Check the result
+    assert "Related earlier exchanges:\nUser: Question 1\nAssistant: Answer 1" in history
+    assert "Question 0" not in history
+    assert history.endswith("User: Question 4\nAssistant: Answer 4")
+
+def test_summary_shared_through_store():
+    """Test a new worker continues the stored summary and folds a bounded number of blocks."""
+    from backend.utils.session_store import InMemorySessionStore
+
+    store = InMemorySessionStore()
+    store.append("s1", [{"role": "user", "content": "Hi"}])
+    llm_service = MagicMock()
+    llm_service.get_together_response.side_effect = lambda prompt: f"summary {llm_service.get_together_response.call_count}"
+    window = HistoryWindow(llm_service, recent_turns=1, summary_block=1, relevant_turns=0, max_folds=2, store=store)
+
+    history = window.build("s1", make_messages(6))
+
+    # Check the result
+    assert llm_service.get_together_response.call_count == 2
+    assert "Question 2" in history
+    assert store.load_state("s1", HistoryWindow.STATE_KEY)[:2] == [2, "summary 2"]
+
+    # A cold worker picks up the stored summary instead of refolding from the start
+    other = HistoryWindow(llm_service, recent_turns=1, summary_block=1, relevant_turns=0, max_folds=2, store=store)
+    history = other.build("s1", make_messages(6))
+    assert llm_service.get_together_response.call_count == 4
+    assert "summary 4" in history
+    assert "Question 3" not in history
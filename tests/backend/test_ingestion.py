@@ -0,0 +1,96 @@
+import pytest
+from io import BytesIO
+from unittest.mock import MagicMock
+
+from backend.services.ingestion_service import IngestionService, InMemoryJobQueue, RedisJobQueue
+
+@pytest.fixture
+def ingestion_service():
+    """Create an IngestionService with a mocked DocumentService and no worker threads."""
+    document_service = MagicMock()
+    document_service.save_uploaded_file.return_value = ("doc123", "data/doc123_test.pdf")
+    service = IngestionService(
+        document_service,
+        job_queue=InMemoryJobQueue(),
+        workers=0,
+        session_factory=MagicMock
+    )
+
+    yield service
+
+def test_submit_pdf(ingestion_service):
+    """Test submitting a PDF returns a queued job right away."""
+    # Submit the PDF
+    db = MagicMock()
+    result = ingestion_service.submit_pdf(BytesIO(b"%PDF"), "test.pdf", db, 1)
+
+    # Check the result
+    assert result["status"] == "queued"
+    assert result["document_id"] == "doc123"
+    ingestion_service.document_service.create_document_record.assert_called_once_with(
+        db, "doc123", "test.pdf", "data/doc123_test.pdf", "pdf", 1
+    )
+    ingestion_service.document_service.vectordb_service.add_pdf.assert_not_called()
+
+    job = ingestion_service.get_job(result["job_id"])
+    assert job["status"] == "queued"
+    assert job["chunks_written"] == 0
+
+def test_run_job_reports_progress(ingestion_service):
+    """Test a worker processes a job and records progress."""
+    def add_pdf(path, document_id, progress=None, owner_id=None):
+        progress(pages_parsed=3)
+        progress(chunks_embedded=10, chunks_written=10)
+        return 10
+
+    vectordb_service = ingestion_service.document_service.vectordb_service
+    vectordb_service.add_pdf.side_effect = add_pdf
+
+    # Submit and run the job
+    result = ingestion_service.submit_pdf(BytesIO(b"%PDF"), "test.pdf", MagicMock(), 1)
+    job_id = ingestion_service.job_queue.next_job(timeout=0.1)
+    ingestion_service.run_job(job_id)
+
+    # Check the result
+    job = ingestion_service.get_job(result["job_id"])
+    assert job["status"] == "completed"
+    assert job["pages_parsed"] == 3
+    assert job["chunks_written"] == 10
+    assert job["result"]["indexed_documents"] == 10
+    ingestion_service.document_service.finalize_document.assert_called_once()
+
+def test_run_job_failure(ingestion_service):
+    """Test a failed job is marked failed and its document removed."""
+    vectordb_service = ingestion_service.document_service.vectordb_service
+    vectordb_service.add_web_article.side_effect = Exception("Network error")
+
+    # Submit and run the job
+    result = ingestion_service.submit_web_article("https://example.com", MagicMock(), 1)
+    ingestion_service.run_job(ingestion_service.job_queue.next_job(timeout=0.1))
+
+    # Check the result
+    job = ingestion_service.get_job(result["job_id"])
+    assert job["status"] == "failed"
+    assert job["error"] == "Network error"
+    ingestion_service.document_service.delete_document.assert_called_once()
+
+def test_redis_queue_requeues_unfinished_jobs():
+    """Test a job taken by a worker that stopped is queued again, and an acknowledged one is not."""
+    fakeredis = pytest.importorskip("fakeredis")
+    job_queue = RedisJobQueue(fakeredis.FakeRedis(decode_responses=True))
+    for job_id in ("job1", "job2"):
+        job_queue.create({"job_id": job_id, "status": "queued", "created_at": 0, "updated_at": 0})
+
+    # Take both jobs, finish one and leave the other running
+    assert job_queue.next_job() == "job1"
+    job_queue.update("job1", status="running")
+    assert job_queue.next_job() == "job2"
+    job_queue.update("job2", status="completed")
+    job_queue.ack("job2")
+
+    # Check the result
+    assert job_queue.requeue_stale(stale_after=60) == 0
+    assert job_queue.requeue_stale(stale_after=0) == 1
+    assert job_queue.get("job1")["status"] == "queued"
+    assert job_queue.next_job() == "job1"
+    assert job_queue.client.lrange("ingestion:processing", 0, -1) == ["job1"]
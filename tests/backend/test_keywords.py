@@ -0,0 +1,35 @@
+import pytest
+import numpy as np
+from scipy.sparse import csr_matrix
+
+from backend.utils.keywords import top_terms_per_row
+
+def test_top_terms_per_row():
+    """Test top terms are read from the sparse rows in descending score order."""
+    matrix = csr_matrix(np.array([
+        [0.1, 0.5, 0.0, 0.3],
+        [0.0, 0.0, 0.0, 0.0],
+        [0.2, 0.0, 0.9, 0.0],
+    ]))
+    feature_names = ["alpha", "beta", "gamma", "delta"]
+
+    # Get the top two terms per row
+    result = top_terms_per_row(matrix, feature_names, top_n=2)
+
+    # Check the result
+    assert result == [["beta", "delta"], [], ["gamma", "alpha"]]
+
+def test_top_terms_per_row_matches_dense():
+    """Test the sparse selection matches a dense argsort on random data."""
+    rng = np.random.default_rng(0)
+    dense = rng.random((50, 30)) * (rng.random((50, 30)) < 0.3)
+    feature_names = [f"term{i}" for i in range(30)]
+
+    # Get the top five terms per row
+    result = top_terms_per_row(csr_matrix(dense), feature_names, top_n=5)
+
+    # Check the result against the dense computation
+    for row, terms in zip(dense, result):
+        nonzero = np.count_nonzero(row)
+        expected = [feature_names[i] for i in np.argsort(-row, kind="stable")[:min(5, nonzero)]]
+        assert terms == expected
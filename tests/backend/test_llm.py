@@ -1,19 +1,23 @@
+import asyncio
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, AsyncMock
 
-from backend.services.llm_service import LLMService
+from backend.services.llm_service import LLMService, ERROR_RESPONSE
+from backend.utils.completion_cache import CompletionCache
 
 @pytest.fixture
 def llm_service():
     """Create an LLMService with mocked clients."""
-    with patch("backend.services.llm_service.Together") as mock_together, \
-         patch("backend.services.llm_service.Groq") as mock_groq, \
-         patch("backend.services.llm_service.ChatTogether") as mock_chat_together:
+    with patch("backend.services.llm_service.get_together_client") as mock_together, \
+         patch("backend.services.llm_service.get_groq_client") as mock_groq, \
+         patch("backend.services.llm_service.get_together_chat") as mock_chat_together, \
+         patch("backend.services.llm_service.get_completion_cache", return_value=None):
         
         service = LLMService()
         service.together_client = mock_together.return_value
         service.groq_client = mock_groq.return_value
         service.together_chat = mock_chat_together.return_value
+        service.completion_cache = CompletionCache()
         
         yield service
 
@@ -45,6 +49,91 @@ def test_get_groq_response(llm_service):
     assert response == "This is a test response."
     llm_service.groq_client.chat.completions.create.assert_called_once()
 
+def test_get_together_response_cached(llm_service):
+    """Test repeated prompts are served from the completion cache."""
+    # Mock the response
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "This is a test response."
+    llm_service.together_client.chat.completions.create.return_value = mock_response
+
+    # Get the response twice, then once more bypassing the cache
+    first = llm_service.get_together_response("This is a test prompt.")
+    second = llm_service.get_together_response("This is a test prompt.")
+    llm_service.get_together_response("This is a test prompt.", use_cache=False)
+
+    # Check the response
+    assert first == second == "This is a test response."
+    assert llm_service.together_client.chat.completions.create.call_count == 2
+
+def test_get_groq_response_error_not_cached(llm_service):
+    """Test failed completions are not cached."""
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "This is a test response."
+    llm_service.groq_client.chat.completions.create.side_effect = [Exception("Rate limited"), mock_response]
+
+    # Get the response after a failure
+    llm_service.get_groq_response("This is a test prompt.")
+    response = llm_service.get_groq_response("This is a test prompt.")
+
+    # Check the response
+    assert response == "This is a test response."
+    assert llm_service.groq_client.chat.completions.create.call_count == 2
+
+def test_astream_together_response(llm_service):
+    """Test streaming yields deltas and caches the full answer."""
+    def chunk(text):
+        mock_chunk = MagicMock()
+        mock_chunk.choices[0].delta.content = text
+        return mock_chunk
+
+    async def stream():
+        for text in [" This is", " a test", None, " response."]:
+            yield chunk(text)
+
+    async_client = MagicMock()
+    async_client.chat.completions.create = AsyncMock(return_value=stream())
+
+    async def collect():
+        return [delta async for delta in llm_service.astream_together_response("This is a test prompt.")]
+
+    # Stream the response
+    with patch("backend.services.llm_service.get_async_together_client", return_value=async_client):
+        deltas = asyncio.run(collect())
+
+    # Check the response
+    assert deltas == ["This is", " a test", " response."]
+    assert async_client.chat.completions.create.call_args.kwargs["stream"] is True
+    assert llm_service.get_together_response("This is a test prompt.") == "This is a test response."
+    llm_service.together_client.chat.completions.create.assert_not_called()
+
+def test_astream_together_response_failure(llm_service):
+    """Test a stream that fails partway raises and caches nothing."""
+    def chunk(text):
+        mock_chunk = MagicMock()
+        mock_chunk.choices[0].delta.content = text
+        return mock_chunk
+
+    async def stream():
+        yield chunk("This is")
+        raise RuntimeError("connection reset")
+
+    async_client = MagicMock()
+    async_client.chat.completions.create = AsyncMock(return_value=stream())
+    deltas = []
+
+    async def collect():
+        async for delta in llm_service.astream_together_response("This is a test prompt."):
+            deltas.append(delta)
+
+    # Stream the response
+    with patch("backend.services.llm_service.get_async_together_client", return_value=async_client):
+        with pytest.raises(RuntimeError):
+            asyncio.run(collect())
+
+    # Check the response
+    assert deltas == ["This is"]
+    assert llm_service.completion_cache.stats()["memory_items"] == 0
+
 def test_generate_rag_response(llm_service):
     """Test generating a RAG response."""
     # Mock the response
@@ -93,17 +182,107 @@ def test_generate_semantic_summary(llm_service):
 def test_generate_study_guide(llm_service):
     """Test generating a study guide."""
     # Mock the responses
-    llm_service.get_together_response = MagicMock(side_effect=[
-        "This is a test study guide.",
-        '["Key concept 1", "Key concept 2"]',
-        '["Question 1", "Question 2"]'
-    ])
+    def respond(prompt, **kwargs):
+        # The calls run concurrently, so answer by prompt rather than by call order
+        if "key concepts as a JSON array" in prompt:
+            return '["Key concept 1", "Key concept 2"]'
+        if "review questions as a JSON array" in prompt:
+            return '["Question 1", "Question 2"]'
+        return "This is a test study guide."
+
+    llm_service.get_together_response = MagicMock(side_effect=respond)
     
     # Generate the study guide
-    result = llm_service.generate_study_guide(["Chunk 1", "Chunk 2"])
+    result = llm_service.generate_study_guide(["Chunk 1", "Chunk 2"], structured=False)
     
     # Check the result
     assert result["study_guide"] == "This is a test study guide."
     assert result["key_concepts"] == ["Key concept 1", "Key concept 2"]
     assert result["review_questions"] == ["Question 1", "Question 2"]
     assert llm_service.get_together_response.call_count == 3
+
+def test_generate_study_guide_partial(llm_service):
+    """Test a failed section gets a placeholder while the others are kept."""
+    def respond(prompt, **kwargs):
+        if "review questions as a JSON array" in prompt:
+            raise Exception("Timeout")
+        if "key concepts as a JSON array" in prompt:
+            return 'Here you go: ["Key concept 1"]'
+        return "This is a test study guide."
+
+    llm_service.get_together_response = MagicMock(side_effect=respond)
+
+    # Generate the study guide
+    result = llm_service.generate_study_guide(["Chunk 1"], structured=False)
+
+    # Check the result
+    assert result["study_guide"] == "This is a test study guide."
+    assert result["key_concepts"] == ["Key concept 1"]
+    assert result["review_questions"] == ["Failed to extract review questions"]
+    assert result["errors"] == ["review_questions"]
+
+def test_generate_study_guide_provider_error(llm_service):
+    """Test a section the provider failed on gets a placeholder, not the error text."""
+    def respond(prompt, **kwargs):
+        if "key concepts as a JSON array" in prompt:
+            return '["Key concept 1"]'
+        if "review questions as a JSON array" in prompt:
+            return '["Question 1"]'
+        return ERROR_RESPONSE
+
+    llm_service.get_together_response = MagicMock(side_effect=respond)
+
+    # Generate the study guide
+    result = llm_service.generate_study_guide(["Chunk 1"], structured=False)
+
+    # Check the result
+    assert result["study_guide"] == "Failed to generate study guide."
+    assert result["key_concepts"] == ["Key concept 1"]
+    assert result["review_questions"] == ["Question 1"]
+    assert result["errors"] == ["study_guide"]
+
+def test_generate_study_guide_structured(llm_service):
+    """Test all sections can come from a single JSON completion."""
+    llm_service.get_together_response = MagicMock(return_value=(
+        '{"study_guide": "This is a test study guide.", '
+        '"key_concepts": ["Key concept 1"], "review_questions": ["Question 1"]}'
+    ))
+
+    # Generate the study guide
+    result = llm_service.generate_study_guide(["Chunk 1"], structured=True)
+
+    # Check the result
+    assert result == {
+        "study_guide": "This is a test study guide.",
+        "key_concepts": ["Key concept 1"],
+        "review_questions": ["Question 1"],
+        "errors": []
+    }
+    llm_service.get_together_response.assert_called_once()
+
+def test_generate_study_guide_structured_parse_failure_not_cached(llm_service):
+    """Test an unparseable structured response is retried on the next request instead of replayed."""
+    def create(**params):
+        prompt = params["messages"][-1]["content"]
+        response = MagicMock()
+        if "Return ONLY a valid JSON object" in prompt:
+            response.choices[0].message.content = "Sorry, here is a study guide without JSON."
+        elif "JSON array" in prompt:
+            response.choices[0].message.content = '["Item 1"]'
+        else:
+            response.choices[0].message.content = "This is a test study guide."
+        return response
+
+    llm_service.together_client.chat.completions.create.side_effect = create
+
+    # Generate the study guide twice
+    llm_service.generate_study_guide(["Chunk 1"], structured=True)
+    result = llm_service.generate_study_guide(["Chunk 1"], structured=True)
+
+    # Check the result
+    structured_calls = [
+        call for call in llm_service.together_client.chat.completions.create.call_args_list
+        if "Return ONLY a valid JSON object" in call.kwargs["messages"][-1]["content"]
+    ]
+    assert len(structured_calls) == 2
+    assert result["key_concepts"] == ["Item 1"]
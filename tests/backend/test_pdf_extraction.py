@@ -0,0 +1,25 @@
+import pytest
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import patch
+
+from backend.utils import pdf_extraction
+
+def fake_extract_page_range(pdf_path, start, end):
+    """Extract fake pages, finishing out of order."""
+    time.sleep(random.random() * 0.01)
+    return [(number, f"page {number}", 0.01) for number in range(start, min(end, 50))]
+
+def test_iter_pages_parallel_keeps_page_order():
+    """Test pages extracted in parallel come back in page order."""
+    with ThreadPoolExecutor(max_workers=4) as pool, \
+         patch("backend.utils.pdf_extraction.page_count", return_value=50), \
+         patch("backend.utils.pdf_extraction.get_pdf_parse_pool", return_value=pool), \
+         patch("backend.utils.pdf_extraction.extract_page_range", side_effect=fake_extract_page_range):
+        # Extract the pages
+        pages = list(pdf_extraction.iter_pages_parallel("test.pdf", workers=4, pages_per_task=3))
+
+    # Check the result
+    assert [number for number, _, _ in pages] == list(range(50))
+    assert pages[7][1] == "page 7"
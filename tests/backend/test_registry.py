@@ -0,0 +1,46 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from backend.core import registry
+
+def test_get_or_create_builds_once():
+    """Test a shared instance is built once and then reused."""
+    factory = MagicMock(side_effect=lambda: object())
+
+    # Request the same key twice
+    first = registry.get_or_create(("test", "builds_once"), factory)
+    second = registry.get_or_create(("test", "builds_once"), factory)
+
+    # Check the result
+    assert first is second
+    assert factory.call_count == 1
+    assert registry.is_loaded(("test", "builds_once"))
+
+def test_get_or_create_is_thread_safe():
+    """Test concurrent first requests only build the instance once."""
+    factory = MagicMock(side_effect=lambda: object())
+    results = []
+
+    def worker():
+        results.append(registry.get_or_create(("test", "thread_safe"), factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Check the result
+    assert factory.call_count == 1
+    assert all(result is results[0] for result in results)
+
+def test_chroma_embedders_share_model():
+    """Test the loader embedders reuse the shared sentence-transformer."""
+    from backend.embeddings.embedder import Embedder
+
+    with patch("backend.embeddings.embedder.get_embedder") as mock_get_embedder:
+        first, second = Embedder(), Embedder()
+
+    # Check the result
+    mock_get_embedder.assert_called_with("BAAI/bge-m3")
+    assert first.model is second.model is mock_get_embedder.return_value.model
@@ -0,0 +1,142 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy.orm import sessionmaker
+
+from backend.utils.session_store import (
+    InMemorySessionStore,
+    SQLSessionStore,
+    RedisSessionStore,
+    WriteBehindSessionStore
+)
+
+TURN = [{"role": "user", "content": "Hi"}, {"role": "assistant", "content": "Hello!"}]
+
+def test_memory_store_lru_and_ttl():
+    """Test the in-memory store evicts old sessions and expires idle ones."""
+    store = InMemorySessionStore(max_sessions=2, ttl=10)
+
+    with patch("backend.utils.session_store.time.monotonic", return_value=0):
+        store.append("s1", TURN)
+        store.append("s2", TURN)
+        store.load("s1")
+        store.append("s3", TURN)
+
+        # Check the result
+        assert store.load("s1") == TURN
+        assert store.load("s2") == []
+        assert store.load("s3") == TURN
+        store.save_state("s3", "summary", [1, "text"])
+        assert store.load_state("s3", "summary") == [1, "text"]
+
+    with patch("backend.utils.session_store.time.monotonic", return_value=11):
+        assert store.load("s1") == []
+        assert store.clear("s3") is False
+
+def test_sql_store(db):
+    """Test the SQL store keeps turns in the chat session tables."""
+    store = SQLSessionStore(session_factory=sessionmaker(bind=db.get_bind()))
+    store.append_many({"s1": TURN, "s2": TURN[:1]})
+    store.append("s1", [{"role": "user", "content": "Again"}])
+
+    # Check the result
+    assert store.load("s1") == TURN + [{"role": "user", "content": "Again"}]
+    assert store.load("s2") == TURN[:1]
+    assert store.count("s1") == 3
+    assert store.load_range("s1", 1, 2) == TURN[1:]
+    store.save_state("s1", "summary", [1, "text"])
+    store.save_state("s1", "summary", [2, "more"])
+    assert store.load_state("s1", "summary") == [2, "more"]
+    assert store.load_state("s2", "summary") is None
+    assert store.clear("s1") is True
+    assert store.load("s1") == []
+    assert store.load_state("s1", "summary") is None
+    assert store.clear("s1") is False
+
+def test_redis_store():
+    """Test the Redis store with the in-process fake."""
+    fakeredis = pytest.importorskip("fakeredis")
+    store = RedisSessionStore(fakeredis.FakeRedis(decode_responses=True), ttl=60)
+    store.append("s1", TURN)
+
+    # Check the result
+    assert store.load("s1") == TURN
+    assert 0 < store.client.ttl("chat:session:s1:messages") <= 60
+    assert store.count("s1") == 2
+    assert store.load_range("s1", 1, 5) == TURN[1:]
+    store.save_state("s1", "summary", [1, "text"])
+    assert store.load_state("s1", "summary") == [1, "text"]
+    assert store.clear("s1") is True
+    assert store.load("s1") == []
+    assert store.load_state("s1", "summary") is None
+
+def test_write_behind_batches_appends():
+    """Test buffered messages are readable before the flush and written in one batch."""
+    backend = InMemorySessionStore()
+    backend.append_many = MagicMock(wraps=backend.append_many)
+    store = WriteBehindSessionStore(backend, flush_interval=60)
+
+    store.append("s1", TURN)
+    store.append("s2", TURN)
+
+    # Check the result
+    assert store.load("s1") == TURN
+    assert backend.load("s1") == []
+
+    store.flush()
+    backend.append_many.assert_called_once()
+    assert backend.load("s1") == TURN
+    assert store.load("s2") == TURN
+    assert store.clear("s2") is True
+
+def test_write_behind_pages_across_flush():
+    """Test ranges and counts span stored and buffered messages."""
+    store = WriteBehindSessionStore(InMemorySessionStore(), flush_interval=60)
+    store.append("s1", TURN)
+    store.flush()
+    store.append("s1", [{"role": "user", "content": "Again"}])
+
+    # Check the result
+    assert store.count("s1") == 3
+    assert store.load_range("s1", 1, 3) == [TURN[1], {"role": "user", "content": "Again"}]
+    assert store.load_range("s1", 2, 10) == [{"role": "user", "content": "Again"}]
+
+def test_write_behind_bounded_when_store_fails():
+    """Test the buffer stops growing while the store is down and drains once it is back."""
+    backend = InMemorySessionStore()
+    backend.append_many = MagicMock(side_effect=Exception("Store unavailable"))
+    store = WriteBehindSessionStore(backend, flush_interval=60, max_pending=4)
+
+    store.append("s1", TURN)
+    store.append("s1", TURN)
+    store.flush()
+
+    # Check the result
+    with pytest.raises(RuntimeError):
+        store.append("s1", TURN)
+    assert store._pending_count == 4
+    assert store.count("s1") == 4
+
+    del backend.append_many
+    store.append("s2", TURN)
+    assert store._pending_count == 0
+    assert backend.load("s1") == TURN * 2
+    assert backend.load("s2") == TURN
+
+def test_history_loads_lazily():
+    """Test the message history reads the store on first access only."""
+    from backend.utils.chat_memory import StoreChatMessageHistory
+
+    store = InMemorySessionStore()
+    store.append("s1", TURN)
+    store.load = MagicMock(wraps=store.load)
+    history = StoreChatMessageHistory("s1", store)
+
+    history.add_user_message("Next question")
+    store.load.assert_not_called()
+
+    # Check the result
+    assert [m.content for m in history.messages] == ["Hi", "Hello!", "Next question"]
+    history.add_ai_message("Next answer")
+    assert len(history.messages) == 4
+    store.load.assert_called_once()
+    assert store.load("s1")[-1] == {"role": "assistant", "content": "Next answer"}
@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import patch, MagicMock
+
+from backend.core.startup import StartupState
+
+@pytest.fixture
+def startup_state():
+    """Create a StartupState that skips the heavy module imports."""
+    with patch("backend.core.startup.HEAVY_MODULES", []):
+        yield StartupState()
+
+def test_warm_up_records_timings(startup_state):
+    """Test warm-up builds every component and reports readiness."""
+    embedder = MagicMock()
+    vector_client = MagicMock()
+
+    # Warm up two components
+    startup_state.warm_up([("embedder", embedder), ("vector_client", vector_client)])
+
+    # Check the result
+    report = startup_state.report()
+    assert startup_state.ready
+    assert report["status"] == "ready"
+    assert set(report["components"]) == {"embedder", "vector_client"}
+    embedder.assert_called_once()
+    vector_client.assert_called_once()
+
+def test_warm_up_failure(startup_state):
+    """Test a failing component marks startup as failed."""
+    broken = MagicMock(side_effect=RuntimeError("model not found"))
+
+    # Warm up a broken component
+    startup_state.warm_up([("embedder", broken)])
+
+    # Check the result
+    report = startup_state.report()
+    assert not startup_state.ready
+    assert report["status"] == "failed"
+    assert report["errors"]["embedder"] == "model not found"
+
+def test_failed_component_retried(startup_state):
+    """Test a component that loads on a retry makes startup ready."""
+    flaky = MagicMock(side_effect=[RuntimeError("connection refused"), None])
+
+    # Warm up, then retry the failed component
+    startup_state.warm_up([("vector_client", flaky)])
+    assert startup_state.report()["status"] == "failed"
+    ready = startup_state.retry_failed()
+
+    # Check the result
+    assert ready
+    assert startup_state.report()["status"] == "ready"
+    assert startup_state.report()["errors"] == {}
+    assert flaky.call_count == 2
+
+def test_retry_loop_backs_off(startup_state):
+    """Test retries wait longer each time until the component loads."""
+    flaky = MagicMock(side_effect=[RuntimeError("timeout"), RuntimeError("timeout"), None])
+    startup_state.warm_up([("embedder", flaky)])
+
+    # Run the retry loop without sleeping
+    with patch("backend.core.startup.time.sleep") as mock_sleep, \
+         patch("backend.core.startup.settings.STARTUP_RETRY_DELAY", 5.0):
+        startup_state._retry_loop()
+
+    # Check the result
+    assert startup_state.ready
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [5.0, 10.0]
@@ -2,6 +2,9 @@ import pytest
 from unittest.mock import patch, MagicMock
 
 from backend.services.study_guide_service import StudyGuideService
+from backend.services.study_guide_pipeline import StudyGuidePipeline, list_items
+from backend.services.llm_service import ERROR_RESPONSE
+from backend.db.models import DocumentArtifact
 
 @pytest.fixture
 def study_guide_service():
@@ -53,3 +56,110 @@ def test_generate_study_guide_no_chunks(study_guide_service):
     assert result["study_guide"] == "No document content found."
     assert result["key_concepts"] == []
     assert result["review_questions"] == []
+
+def test_generate_study_guide_full(study_guide_service):
+    """Test the full mode runs the study guide workflow."""
+    study_guide_service.vectordb_service.get_documents.return_value = ["Chunk 1", "Chunk 2"]
+    study_guide_service.pipeline = MagicMock()
+    study_guide_service.pipeline.run.return_value = {
+        "summary": "Summary",
+        "concept": "## Entanglement\nParticles share a state.",
+        "question": "1. **What is entanglement?**\nAnswer: ...",
+        "analogy": "Like a pair of gloves.",
+        "faq": "Q: Is it faster than light?",
+        "study_guide": "This is a test study guide."
+    }
+
+    # Generate a study guide
+    result = study_guide_service.generate_study_guide(document_id="test_doc", mode="full")
+
+    # Check the result
+    study_guide_service.pipeline.run.assert_called_once_with(["Chunk 1", "Chunk 2"], use_cache=True)
+    study_guide_service.llm_service.generate_study_guide.assert_not_called()
+    assert result["study_guide"] == "This is a test study guide."
+    assert result["key_concepts"] == ["Entanglement"]
+    assert result["review_questions"] == ["What is entanglement?"]
+    assert result["sections"]["analogies"] == "Like a pair of gloves."
+
+    # Forcing bypasses the completion cache
+    study_guide_service.generate_study_guide(document_id="test_doc", mode="full", force=True)
+    assert study_guide_service.pipeline.run.call_args.kwargs["use_cache"] is False
+
+def test_generate_study_guide_partial_not_stored(study_guide_service, db):
+    """Test a guide with failed sections is returned but not stored."""
+    study_guide_service.vectordb_service.get_documents.return_value = ["Chunk 1", "Chunk 2"]
+    study_guide_service.llm_service.generate_study_guide.return_value = {
+        "study_guide": "This is a test study guide.",
+        "key_concepts": ["Failed to extract key concepts"],
+        "review_questions": ["Question 1"],
+        "errors": ["key_concepts"]
+    }
+
+    # Generate the study guide twice
+    study_guide_service.generate_study_guide(document_id="test_doc", db=db)
+    result = study_guide_service.generate_study_guide(document_id="test_doc", db=db)
+
+    # Check the result
+    assert result["errors"] == ["key_concepts"]
+    assert study_guide_service.llm_service.generate_study_guide.call_count == 2
+    assert db.query(DocumentArtifact).count() == 0
+
+def test_pipeline_summarize_chunks_keeps_order():
+    """Test chunk summaries come back in document order."""
+    llm_service = MagicMock()
+    llm_service.get_together_response.side_effect = lambda prompt, **kwargs: prompt.split("Text:")[1].strip()
+    pipeline = StudyGuidePipeline(llm_service)
+
+    # Summarize the chunks
+    summaries = pipeline.summarize_chunks([f"Chunk {i}" for i in range(10)])
+
+    # Check the result
+    assert summaries == [f"Chunk {i}" for i in range(10)]
+
+def test_pipeline_skips_provider_errors():
+    """Test chunk summaries and sections the provider failed on are left out."""
+    llm_service = MagicMock()
+    llm_service.get_together_response.side_effect = (
+        lambda prompt, **kwargs: ERROR_RESPONSE if "Chunk 1" in prompt or "knowledge mapper" in prompt else "Summary"
+    )
+    pipeline = StudyGuidePipeline(llm_service)
+
+    # Summarize the chunks and build one section
+    summaries = pipeline.summarize_chunks(["Chunk 0", "Chunk 1"])
+    section = pipeline._section_node("concept")({"summary": "Summary"})
+
+    # Check the result
+    assert summaries == ["Summary"]
+    assert section == {"concept": "", "errors": ["concept"]}
+
+def test_pipeline_graph_runs_sections():
+    """Test the workflow fans out to every section and merges them."""
+    pytest.importorskip("langgraph")
+    llm_service = MagicMock()
+    llm_service.get_together_response.side_effect = lambda prompt, **kwargs: prompt.strip().split("\n")[0]
+    pipeline = StudyGuidePipeline(llm_service)
+
+    # Run the workflow
+    result = pipeline.run(["Chunk 1"])
+
+    # Check the result
+    assert result["concept"].startswith("You are an expert knowledge mapper")
+    assert result["faq"].startswith("You are an expert educational content developer")
+    assert result["study_guide"].startswith("You are an expert educational consultant")
+    assert llm_service.get_together_response.call_count == 6
+
+def test_pipeline_stops_when_summaries_fail():
+    """Test the sections are skipped when no chunk could be summarized."""
+    pytest.importorskip("langgraph")
+    llm_service = MagicMock()
+    llm_service.get_together_response.return_value = ERROR_RESPONSE
+    pipeline = StudyGuidePipeline(llm_service)
+
+    # Run the workflow
+    result = pipeline.run(["Chunk 1", "Chunk 2"])
+
+    # Check the result
+    assert llm_service.get_together_response.call_count == 2
+    assert result["errors"] == ["summary"]
+    assert result["concept"] == ""
+    assert result["study_guide"] == "Failed to generate study guide."
@@ -2,6 +2,10 @@ import pytest
 from unittest.mock import patch, MagicMock
 
 from backend.services.summary_service import SummaryService
+from backend.services.summarizer import MapReduceSummarizer
+from backend.db.models import DocumentArtifact
+from backend.services.llm_service import LLMService, ERROR_RESPONSE
+from backend.utils.completion_cache import CompletionCache
 
 @pytest.fixture
 def summary_service():
@@ -34,6 +38,128 @@ def test_generate_document_summary(summary_service):
     assert result["document_id"] == "test_doc"
     assert result["summary"] == "This is a test summary."
 
+def test_generate_document_summary_stored(summary_service, db):
+    """Test a stored summary is reused until the document changes or force is set."""
+    summary_service.vectordb_service.get_documents.return_value = ["Chunk 1", "Chunk 2"]
+    summary_service.llm_service.get_together_response.return_value = "This is a test summary."
+
+    # Generate the summary twice
+    first = summary_service.generate_document_summary(document_id="test_doc", db=db)
+    second = summary_service.generate_document_summary(document_id="test_doc", db=db)
+
+    # Check the result
+    assert first["summary"] == second["summary"] == "This is a test summary."
+    assert summary_service.llm_service.get_together_response.call_count == 1
+    artifact = db.query(DocumentArtifact).filter(DocumentArtifact.document_id == "test_doc").one()
+    assert artifact.artifact_type == "summary"
+    assert artifact.variant == "max_length=500"
+
+    # Regenerate when forced and when the chunks change
+    summary_service.generate_document_summary(document_id="test_doc", db=db, force=True)
+    assert summary_service.llm_service.get_together_response.call_args.kwargs["use_cache"] is False
+    summary_service.vectordb_service.get_documents.return_value = ["Chunk 1", "Chunk 2 edited"]
+    summary_service.generate_document_summary(document_id="test_doc", db=db)
+    assert summary_service.llm_service.get_together_response.call_count == 3
+
+def test_generate_document_summary_force_skips_completion_cache(summary_service, db):
+    """Test forcing a summary calls the model again instead of replaying cached completions."""
+    with patch("backend.services.llm_service.get_together_client") as mock_together, \
+         patch("backend.services.llm_service.get_groq_client"), \
+         patch("backend.services.llm_service.get_together_chat"), \
+         patch("backend.services.llm_service.get_completion_cache", return_value=CompletionCache()):
+        llm_service = LLMService()
+    mock_response = MagicMock()
+    mock_response.choices[0].message.content = "This is a test summary."
+    mock_together.return_value.chat.completions.create.return_value = mock_response
+    summary_service.summarizer.llm_service = llm_service
+    summary_service.vectordb_service.get_documents.return_value = ["Chunk 1"]
+
+    # Generate, then force a regeneration
+    summary_service.generate_document_summary(document_id="test_doc", db=db)
+    summary_service.generate_document_summary(document_id="test_doc", db=db, force=True)
+
+    # Check the result
+    assert mock_together.return_value.chat.completions.create.call_count == 2
+
+def test_generate_document_summary_error_not_stored(summary_service, db):
+    """Test a failed generation is not stored."""
+    summary_service.vectordb_service.get_documents.return_value = ["Chunk 1"]
+    summary_service.llm_service.get_together_response.return_value = ERROR_RESPONSE
+
+    # Generate the summary
+    summary_service.generate_document_summary(document_id="test_doc", db=db)
+
+    # Check the result
+    assert db.query(DocumentArtifact).count() == 0
+
+def test_map_reduce_summarizer_covers_whole_document():
+    """Test long documents are summarized level by level, including the last chunk."""
+    llm_service = MagicMock()
+
+    def respond(prompt, **kwargs):
+        if "one section of a longer document" in prompt:
+            return f"summary of {prompt.count('Chunk')} chunks" + (" (last)" if "Chunk 99" in prompt else "")
+        return prompt
+
+    llm_service.get_together_response.side_effect = respond
+    summarizer = MapReduceSummarizer(llm_service, group_chars=1100, context_chars=500)
+
+    # Summarize 100 chunks of 100 characters
+    chunks = [f"Chunk {i}".ljust(100, ".") for i in range(100)]
+    final_prompt = summarizer.summarize(chunks, max_length=200)["summary"]
+
+    # Check the result
+    assert "(last)" in final_prompt
+    assert "under 200 words" in final_prompt
+    # 100 chunks -> 10 section summaries, then the final reduce
+    assert llm_service.get_together_response.call_count == 11
+
+def test_map_reduce_summarizer_failed_section():
+    """Test a section the provider failed on keeps its start instead of the error text."""
+    llm_service = MagicMock()
+    llm_service.get_together_response.side_effect = (
+        lambda prompt, **kwargs: ERROR_RESPONSE if "Chunk 1" in prompt else "A section summary."
+    )
+    summarizer = MapReduceSummarizer(llm_service, group_chars=80, context_chars=100)
+
+    # Summarize one level of two sections
+    summaries, failed = summarizer.summarize_level([f"Chunk {i}".ljust(60, ".") for i in range(2)])
+
+    # Check the result
+    assert summaries == ["A section summary.", "Chunk 1..."]
+    assert failed == [1]
+
+def test_generate_document_summary_partial_not_stored(summary_service, db):
+    """Test a summary with a failed section is returned but not stored."""
+    summary_service.summarizer = MapReduceSummarizer(summary_service.llm_service, group_chars=80, context_chars=100)
+    summary_service.vectordb_service.get_documents.return_value = [f"Chunk {i}".ljust(60, ".") for i in range(2)]
+    summary_service.llm_service.get_together_response.side_effect = (
+        lambda prompt, **kwargs: ERROR_RESPONSE if "Chunk 1" in prompt and "one section" in prompt else "A summary."
+    )
+
+    # Generate the summary
+    result = summary_service.generate_document_summary(document_id="test_doc", db=db)
+
+    # Check the result
+    assert result["summary"] == "A summary."
+    assert db.query(DocumentArtifact).count() == 0
+
+def test_map_reduce_level_timeout_scales():
+    """Test a level's deadline grows with its number of sections."""
+    summarizer = MapReduceSummarizer(MagicMock(), timeout=60)
+
+    # Check the result
+    assert summarizer.level_timeout(200) > 10 * summarizer.level_timeout(1)
+
+def test_map_reduce_level_timeout_without_rate_limit():
+    """Test a rate limit of 0 (no limit) leaves only the call rounds in the deadline."""
+    summarizer = MapReduceSummarizer(MagicMock(), timeout=60)
+
+    with patch("backend.services.summarizer.settings.TOGETHER_REQUESTS_PER_MINUTE", 0), \
+         patch("backend.services.summarizer.settings.LLM_MAX_CONCURRENCY", 4):
+        # Check the result
+        assert summarizer.level_timeout(8) == 120
+
 def test_generate_document_summary_no_chunks(summary_service):
     """Test generating a summary for a document with no chunks."""
     # Mock VectorDBService
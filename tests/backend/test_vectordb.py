@@ -3,6 +3,7 @@ import os
 import tempfile
 from unittest.mock import patch, MagicMock
 
+from backend.core.config import settings
 from backend.services.vectordb_service import VectorDBService
 
 @pytest.fixture
@@ -45,6 +46,50 @@ def test_add_document(mock_embedder, vectordb_service, sample_chunks):
     assert result == len(sample_chunks)
     assert mock_collection.add.call_count == 1
 
+@patch("backend.services.vectordb_service.Embedder")
+def test_add_document_skips_existing_chunks(mock_embedder, vectordb_service, sample_chunks):
+    """Test re-adding a document only writes the chunks that are not stored yet."""
+    document_id = "test_doc"
+    
+    # Mock the collection with the first chunk already stored
+    mock_collection = MagicMock()
+    vectordb_service.client.get_or_create_collection = MagicMock(return_value=mock_collection)
+    mock_collection.get.return_value = {
+        "ids": ["test_doc_chunk_0"],
+        "metadatas": [{"content_hash": vectordb_service._content_hash(sample_chunks[0]["text"])}]
+    }
+    mock_collection.count.return_value = len(sample_chunks)
+    
+    # Add the document again
+    result = vectordb_service.add_document(document_id, sample_chunks)
+    
+    # Check a single existence lookup was made and only the missing chunk was written
+    assert result == len(sample_chunks)
+    assert mock_collection.get.call_count == 1
+    assert mock_collection.add.call_count == 1
+    assert mock_collection.add.call_args.kwargs["ids"] == ["test_doc_chunk_1"]
+    mock_collection.upsert.assert_not_called()
+
+def test_add_pdf_streams_windows(vectordb_service, sample_chunks):
+    """Test a PDF is written window by window with continuing chunk IDs."""
+    document_id = "test_doc"
+    
+    # Mock the embedder and collection
+    vectordb_service.embedder = MagicMock()
+    vectordb_service.embedder.stream_pdf.return_value = iter([sample_chunks, sample_chunks[:1]])
+    mock_collection = MagicMock()
+    vectordb_service.client.get_or_create_collection = MagicMock(return_value=mock_collection)
+    mock_collection.get.return_value = {"ids": [], "metadatas": []}
+    mock_collection.count.return_value = 3
+    
+    # Add the PDF
+    result = vectordb_service.add_pdf("test.pdf", document_id)
+    
+    # Check the result
+    assert result == 3
+    assert mock_collection.add.call_count == 2
+    assert mock_collection.add.call_args_list[1].kwargs["ids"] == ["test_doc_chunk_2"]
+
 @patch("backend.services.vectordb_service.Embedder")
 def test_query(mock_embedder, vectordb_service):
     """Test querying the vector database."""
@@ -103,3 +148,144 @@ def test_hybrid_query(mock_embedder, vectordb_service):
     # Check the result
     assert len(docs) == 2
     assert len(metadata) == 2
+
+def test_hybrid_query_fuses_lexical_matches(vectordb_service):
+    """Test exact-term BM25 matches are fused into hybrid results."""
+    document_id = "test_doc"
+    vectordb_service.embedder = MagicMock()
+    vectordb_service.embedder.get_embedding.return_value = [0.1, 0.2, 0.3]
+    vectordb_service.corpus_index.add_chunks(document_id, [
+        ("test_doc_chunk_7", "Replace the filter with part number zx81 every year.")
+    ])
+    
+    # Mock the collection
+    mock_collection = MagicMock()
+    vectordb_service._get_collection = MagicMock(return_value=mock_collection)
+    mock_collection.count.return_value = 2
+    mock_collection.query.return_value = {
+        "documents": [["doc1", "doc2"]],
+        "metadatas": [[{"keywords": "first, chunk"}, {"keywords": "second, chunk"}]],
+        "ids": [["test_doc_chunk_0", "test_doc_chunk_1"]],
+        "distances": [[0.2, 0.4]]
+    }
+    mock_collection.get.return_value = {
+        "ids": ["test_doc_chunk_7"],
+        "documents": ["Replace the filter with part number zx81 every year."],
+        "metadatas": [{"keywords": "zx81, filter"}]
+    }
+    
+    # Query the database
+    docs, metadata = vectordb_service.hybrid_query("zx81", document_id, top_k=2, lexical_weight=2.0)
+    
+    # Check the lexical match is ranked first and fetched from the collection
+    assert docs[0] == "Replace the filter with part number zx81 every year."
+    assert docs[1] == "doc1"
+    mock_collection.get.assert_called_once()
+
+def test_hybrid_query_vector_candidates(vectordb_service):
+    """Test the vector search fetches as many candidates as the lexical search."""
+    vectordb_service.embedder = MagicMock()
+    vectordb_service.embedder.get_embedding.return_value = [0.1, 0.2, 0.3]
+    
+    # Mock the collection
+    mock_collection = MagicMock()
+    vectordb_service._get_collection = MagicMock(return_value=mock_collection)
+    mock_collection.count.return_value = 50
+    mock_collection.query.return_value = {"documents": [["doc1"]], "metadatas": [[{}]], "ids": [["id1"]]}
+    
+    # Query the database
+    vectordb_service.hybrid_query("anything", "test_doc", top_k=2)
+    
+    # Check the result
+    assert mock_collection.query.call_args.kwargs["n_results"] == settings.HYBRID_CANDIDATES
+
+def test_add_document_shared_layout(sample_chunks):
+    """Test the shared layout stores filterable metadata and counts one document's chunks."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        vectordb_service = VectorDBService(persist_dir=temp_dir, layout="shared")
+        
+        # Mock the collection
+        mock_collection = MagicMock()
+        vectordb_service.client.get_or_create_collection = MagicMock(return_value=mock_collection)
+        mock_collection.get.side_effect = [
+            {"ids": [], "metadatas": []},
+            {"ids": ["test_doc_chunk_0", "test_doc_chunk_1"]}
+        ]
+        
+        # Add the document
+        result = vectordb_service.add_document("test_doc", sample_chunks, owner_id=7)
+        
+        # Check the result
+        assert result == 2
+        vectordb_service.client.get_or_create_collection.assert_called_once_with(name="chunks")
+        metadata = mock_collection.add.call_args.kwargs["metadatas"][1]
+        assert metadata["document_id"] == "test_doc"
+        assert metadata["owner_id"] == 7
+        assert metadata["chunk_index"] == 1
+        assert mock_collection.get.call_args.kwargs["where"] == {"document_id": "test_doc"}
+
+def test_delete_document_shared_layout():
+    """Test deleting a document from a shared collection removes only its chunks."""
+    with tempfile.TemporaryDirectory() as temp_dir:
+        vectordb_service = VectorDBService(persist_dir=temp_dir, layout="sharded", shards=4)
+        
+        # Mock the collection
+        mock_collection = MagicMock()
+        vectordb_service.client.get_collection = MagicMock(return_value=mock_collection)
+        
+        # Delete the document
+        vectordb_service.delete_document("test_doc")
+        
+        # Check the result
+        assert vectordb_service.client.get_collection.call_args.args[0].startswith("chunks_")
+        mock_collection.delete.assert_called_once_with(where={"document_id": "test_doc"})
+
+def test_hybrid_query_merges_global_top_k(vectordb_service):
+    """Test library-wide search merges collections into one ranking by distance."""
+    vectordb_service.embedder = MagicMock()
+    vectordb_service.embedder.get_embedding.return_value = [0.1, 0.2, 0.3]
+    
+    # Mock two collections with interleaved distances
+    first, second = MagicMock(), MagicMock()
+    for collection, name, distances in ((first, "doc_a", [0.1, 0.4]), (second, "doc_b", [0.2, 0.3])):
+        collection.name = name
+        collection.count.return_value = 2
+        collection.query.return_value = {
+            "documents": [[f"{name}-0", f"{name}-1"]],
+            "metadatas": [[{"keywords": ""}, {"keywords": ""}]],
+            "ids": [[f"{name}_chunk_0", f"{name}_chunk_1"]],
+            "distances": [distances]
+        }
+    vectordb_service.client.list_collections = MagicMock(return_value=[first, second])
+    vectordb_service.client.get_collection = MagicMock(side_effect=lambda name: {"doc_a": first, "doc_b": second}[name])
+    
+    # Query the whole library
+    docs, metadata = vectordb_service.hybrid_query("anything", top_k=3, lexical_weight=0.0)
+    
+    # Check the result
+    assert docs == ["doc_a-0", "doc_b-0", "doc_b-1"]
+
+def test_query_reuses_collection_metadata(vectordb_service):
+    """Test repeated queries reuse the cached collection handle and count."""
+    vectordb_service.embedder = MagicMock()
+    vectordb_service.embedder.get_embedding.return_value = [0.1, 0.2, 0.3]
+    
+    # Mock the collection
+    mock_collection = MagicMock()
+    mock_collection.name = "doc_test_doc"
+    mock_collection.count.return_value = 2
+    mock_collection.query.return_value = {"documents": [["doc1"]], "metadatas": [[{}]], "ids": [["id1"]]}
+    vectordb_service.client.get_collection = MagicMock(return_value=mock_collection)
+    
+    # Query twice, then again after the document is rewritten
+    vectordb_service.query("test query", "test_doc")
+    vectordb_service.query("test query", "test_doc")
+    assert vectordb_service.client.get_collection.call_count == 1
+    assert mock_collection.count.call_count == 1
+    
+    vectordb_service.invalidate_cache("test_doc")
+    vectordb_service.query("test query", "test_doc")
+    
+    # Check the result
+    assert vectordb_service.client.get_collection.call_count == 2
+    assert mock_collection.count.call_count == 2
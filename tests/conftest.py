@@ -1,5 +1,9 @@
 import os
 import pytest
+
+# Build heavy components on first use instead of warming them up for every test client
+os.environ.setdefault("STARTUP_MODE", "lazy")
+
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker